@@ -1,5 +1,10 @@
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
+
+UPDATE_MODES = ("polling", "webhook")
+LOG_FORMATS = ("json", "text")
+STORAGE_BACKENDS = ("supabase", "sqlite")
 
 
 @dataclass(frozen=True)
@@ -8,6 +13,54 @@ class Settings:
     supabase_url: str
     supabase_key: str
     admin_id: int
+    supabase_max_workers: int = 8
+    active_event_cache_ttl: float = 30.0
+    broadcast_rate_per_second: float = 25.0
+    broadcast_concurrency: int = 8
+    broadcast_checkpoint_path: str = "broadcast_checkpoint.json"
+    leaderboard_reconcile_interval: float = 300.0
+    write_flush_interval: float = 0.5
+    write_max_batch: int = 500
+    write_spill_path: str = "write_behind_spill.jsonl"
+    update_mode: str = "polling"
+    webhook_url: str = ""
+    webhook_secret: str = ""
+    webhook_path: str = "/telegram"
+    port: int = 10000
+    workers: int = 1
+    concurrent_updates: int = 64
+    storage_backend: str = "supabase"
+    sqlite_path: str = "amazo.db"
+    snapshot_dir: str = "snapshots"
+    metrics_port: int = 0
+    health_probe_interval: float = 15.0
+    health_max_loop_lag: float = 1.0
+    log_format: str = "json"
+    read_coalesce_ttl: float = 1.0
+    backend_timeout: float = 10.0
+    backend_max_retries: int = 2
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    throttle_user_rate: float = 1.0
+    throttle_user_burst: float = 10.0
+    throttle_global_rate: float = 200.0
+    throttle_global_burst: float = 400.0
+    throttle_costs: dict[str, float] = field(default_factory=dict)
+    state_path: str = "bot_state.db"
+    state_flush_interval: float = 10.0
+    user_state_idle_ttl: float = 3600.0
+    user_state_max_users: int = 50_000
+    conversation_timeout: float = 600.0
+    bot_api_url: str = ""
+
+    @property
+    def bot_api_base_url(self) -> str:
+        # PTB appends the token to this; BOT_API_URL points at a self-hosted Bot API server.
+        return f"{self.bot_api_url or 'https://api.telegram.org'}/bot"
+
+    @property
+    def bot_api_file_url(self) -> str:
+        return f"{self.bot_api_url or 'https://api.telegram.org'}/file/bot"
 
 
 def _require_env(name: str) -> str:
@@ -17,10 +70,62 @@ def _require_env(name: str) -> str:
     return value
 
 
+def _int_env(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a valid integer.") from exc
+    if value < minimum:
+        bound = "a positive integer" if minimum == 1 else f"at least {minimum}"
+        raise ValueError(f"{name} must be {bound}.")
+    return value
+
+
+def _float_env(name: str, default: float, allow_zero: bool = True) -> float:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number.") from exc
+    if value < 0:
+        raise ValueError(f"{name} must not be negative.")
+    if value == 0 and not allow_zero:
+        raise ValueError(f"{name} must be greater than 0.")
+    return value
+
+
+def _costs_env(name: str) -> dict[str, float]:
+    # "history=3,enter=3,faq=0.5": tokens per command name or callback data.
+    raw = os.getenv(name, "").strip()
+    costs: dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        key, sep, value = item.partition("=")
+        try:
+            cost = float(value)
+        except ValueError:
+            cost = -1.0
+        if not sep or not key.strip() or cost < 0:
+            raise ValueError(f"{name} must be a comma-separated list of name=cost pairs.")
+        costs[key.strip().lstrip("/").lower()] = cost
+    return costs
+
+
 def load_settings() -> Settings:
     bot_token = _require_env("BOT_TOKEN")
-    supabase_url = _require_env("SUPABASE_URL")
-    supabase_key = _require_env("SUPABASE_KEY")
+    storage_backend = os.getenv("STORAGE_BACKEND", "").strip().lower() or "supabase"
+    if storage_backend not in STORAGE_BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND must be one of: {', '.join(STORAGE_BACKENDS)}.")
+    if storage_backend == "supabase":
+        supabase_url = _require_env("SUPABASE_URL")
+        supabase_key = _require_env("SUPABASE_KEY")
+    else:
+        supabase_url = os.getenv("SUPABASE_URL", "").strip()
+        supabase_key = os.getenv("SUPABASE_KEY", "").strip()
     admin_raw = _require_env("ADMIN_ID")
 
     try:
@@ -31,10 +136,69 @@ def load_settings() -> Settings:
     if admin_id <= 0:
         raise ValueError("ADMIN_ID must be a positive integer.")
 
+    update_mode = os.getenv("UPDATE_MODE", "").strip().lower() or "polling"
+    if update_mode not in UPDATE_MODES:
+        raise ValueError(f"UPDATE_MODE must be one of: {', '.join(UPDATE_MODES)}.")
+
+    webhook_url = os.getenv("WEBHOOK_URL", "").strip()
+    webhook_secret = os.getenv("WEBHOOK_SECRET", "").strip()
+    webhook_path = os.getenv("WEBHOOK_PATH", "").strip() or "/telegram"
+    if update_mode == "webhook":
+        webhook_url = _require_env("WEBHOOK_URL")
+        webhook_secret = _require_env("WEBHOOK_SECRET")
+        if not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", webhook_secret):
+            raise ValueError("WEBHOOK_SECRET must be 1-256 characters of A-Z, a-z, 0-9, _ or -.")
+        if not webhook_path.startswith("/"):
+            raise ValueError("WEBHOOK_PATH must start with '/'.")
+
+    log_format = os.getenv("LOG_FORMAT", "").strip().lower() or "json"
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"LOG_FORMAT must be one of: {', '.join(LOG_FORMATS)}.")
+
     return Settings(
         bot_token=bot_token,
         supabase_url=supabase_url,
         supabase_key=supabase_key,
         admin_id=admin_id,
+        supabase_max_workers=_int_env("SUPABASE_MAX_WORKERS", 8),
+        active_event_cache_ttl=_float_env("ACTIVE_EVENT_CACHE_TTL", 30.0),
+        broadcast_rate_per_second=_float_env("BROADCAST_RATE_PER_SECOND", 25.0, allow_zero=False),
+        broadcast_concurrency=_int_env("BROADCAST_CONCURRENCY", 8),
+        broadcast_checkpoint_path=os.getenv("BROADCAST_CHECKPOINT_PATH", "").strip()
+        or "broadcast_checkpoint.json",
+        leaderboard_reconcile_interval=_float_env("LEADERBOARD_RECONCILE_INTERVAL", 300.0, allow_zero=False),
+        write_flush_interval=_float_env("WRITE_FLUSH_INTERVAL", 0.5, allow_zero=False),
+        write_max_batch=_int_env("WRITE_MAX_BATCH", 500),
+        write_spill_path=os.getenv("WRITE_SPILL_PATH", "").strip() or "write_behind_spill.jsonl",
+        update_mode=update_mode,
+        webhook_url=webhook_url,
+        webhook_secret=webhook_secret,
+        webhook_path=webhook_path,
+        port=_int_env("PORT", 10000),
+        workers=_int_env("WORKERS", 1),
+        concurrent_updates=_int_env("CONCURRENT_UPDATES", 64),
+        storage_backend=storage_backend,
+        sqlite_path=os.getenv("SQLITE_PATH", "").strip() or "amazo.db",
+        snapshot_dir=os.getenv("SNAPSHOT_DIR", "").strip() or "snapshots",
+        metrics_port=_int_env("METRICS_PORT", 0, minimum=0),
+        health_probe_interval=_float_env("HEALTH_PROBE_INTERVAL", 15.0, allow_zero=False),
+        health_max_loop_lag=_float_env("HEALTH_MAX_LOOP_LAG", 1.0, allow_zero=False),
+        log_format=log_format,
+        read_coalesce_ttl=_float_env("READ_COALESCE_TTL", 1.0),
+        backend_timeout=_float_env("BACKEND_TIMEOUT", 10.0, allow_zero=False),
+        backend_max_retries=_int_env("BACKEND_MAX_RETRIES", 2, minimum=0),
+        circuit_failure_threshold=_int_env("CIRCUIT_FAILURE_THRESHOLD", 5),
+        circuit_reset_timeout=_float_env("CIRCUIT_RESET_TIMEOUT", 30.0),
+        throttle_user_rate=_float_env("THROTTLE_USER_RATE", 1.0),
+        throttle_user_burst=_float_env("THROTTLE_USER_BURST", 10.0),
+        throttle_global_rate=_float_env("THROTTLE_GLOBAL_RATE", 200.0),
+        throttle_global_burst=_float_env("THROTTLE_GLOBAL_BURST", 400.0),
+        throttle_costs=_costs_env("THROTTLE_COSTS"),
+        state_path=os.getenv("STATE_PATH", "").strip() or "bot_state.db",
+        state_flush_interval=_float_env("STATE_FLUSH_INTERVAL", 10.0, allow_zero=False),
+        user_state_idle_ttl=_float_env("USER_STATE_IDLE_TTL", 3600.0, allow_zero=False),
+        user_state_max_users=_int_env("USER_STATE_MAX_USERS", 50_000),
+        conversation_timeout=_float_env("CONVERSATION_TIMEOUT", 600.0),
+        bot_api_url=os.getenv("BOT_API_URL", "").strip().rstrip("/"),
     )
 
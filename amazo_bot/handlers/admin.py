@@ -1,25 +1,67 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from amazo_bot.handlers.common import reply_text_safe
+from amazo_bot.handlers.common import parse_broadcast_args, parse_perf_args, reply_text_safe
+from amazo_bot.profiling import MAX_PROFILE_SECONDS, LoopProfiler
+from amazo_bot.services.broadcast_service import BroadcastService
+from amazo_bot.services.draw_service import DrawEngine
 from amazo_bot.services.giveaway_service import GiveawayService
-from amazo_bot.services.supabase_service import SupabaseService
+from amazo_bot.services.repository import RecipientSegment, Repository
+from amazo_bot.services.resilience import BackendUnavailable
+from amazo_bot.services.snapshot_service import DrawSnapshot, SnapshotIntegrityError, SnapshotService
+from amazo_bot.services.write_behind import WriteBehindBuffer
+
+PICK_USAGE = "Provide an event ID. Example: /pick 1 [seed] [--snapshot]"
+BROADCAST_USAGE = "Usage: /broadcast [--active | --event=ID] [--min-refs=N] message"
+PERF_USAGE = (
+    "Usage:\n"
+    "/perf [seconds] - sample the event loop and send the hot functions\n"
+    "/perf lag on [ms] | /perf lag off - log stalls with the blocking stack\n"
+    "/perf slow on [ms] | /perf slow off - log slow asyncio callbacks\n"
+    "/perf status"
+)
+# Telegram's limit for one message.
+MAX_MESSAGE_LENGTH = 4096
+
+
+def backend_down_text(exc: BackendUnavailable, outcome: str) -> str:
+    retry = f"Retry in {exc.retry_after:.0f}s." if exc.retry_after else "Try again in a minute."
+    return f"Database unreachable ({exc.reason}). {outcome}. {retry}"
+
+
+def snapshot_source(snapshot: DrawSnapshot) -> str:
+    # The age tells the admin how many late entries a snapshot draw leaves out.
+    minutes = max(0, int(snapshot.age().total_seconds() // 60))
+    age = f"{minutes // 1440} d {minutes // 60 % 24} h" if minutes >= 1440 else f"{minutes // 60} h {minutes % 60} min"
+    return f"Snapshot: {snapshot.sha256}\nTaken {snapshot.created_at} ({age} ago)"
 
 
 class AdminHandlers:
     def __init__(
         self,
         admin_id: int,
-        supabase_service: SupabaseService,
+        repository: Repository,
         giveaway_service: GiveawayService,
+        broadcast_service: BroadcastService,
+        write_buffer: WriteBehindBuffer,
+        draw_engine: DrawEngine,
+        snapshot_service: SnapshotService,
+        profiler: LoopProfiler,
     ) -> None:
         self.admin_id = admin_id
-        self.supabase_service = supabase_service
+        self.repository = repository
         self.giveaway_service = giveaway_service
+        self.broadcast_service = broadcast_service
+        self.write_buffer = write_buffer
+        self.draw_engine = draw_engine
+        self.snapshot_service = snapshot_service
+        self.profiler = profiler
 
     def _is_admin(self, update: Update) -> bool:
         if not update.message:
@@ -30,23 +72,29 @@ class AdminHandlers:
         if not self._is_admin(update):
             return
 
-        event = self.giveaway_service.get_active_event()
-        if not event:
+        events = await self.giveaway_service.get_active_events()
+        if not events:
             await reply_text_safe(update, "No active event. Launch one with /new_event.")
             return
 
-        event_id = int(event["id"])
-        total_users = self.supabase_service.get_event_participant_count(event_id=event_id)
-        total_refs = self.supabase_service.get_event_referral_total(event_id=event_id)
+        stats = await asyncio.gather(*(self.repository.get_event_stats(event_id=int(event["id"])) for event in events))
+        writes = self.write_buffer.stats
 
-        text = (
-            "ADMIN DASHBOARD\n"
-            f"Current: {event['name']} (ID: {event_id})\n"
-            f"Participants: {total_users}\n"
-            f"Referrals: {total_refs}\n"
-            f"Total tickets: {total_users + total_refs}"
-        )
-        await reply_text_safe(update, text)
+        lines = ["ADMIN DASHBOARD", f"Running events: {len(events)}", ""]
+        for event, event_stats in zip(events, stats):
+            lines += [
+                f"{event['name']} (ID: {event['id']}, ends {str(event['end_date'])[:10]})",
+                f"Participants: {event_stats.participants}, referrals: {event_stats.referrals}, "
+                f"tickets: {event_stats.tickets}",
+            ]
+        lines += [
+            "",
+            f"Event cache: {self.giveaway_service.cache_hits} hits / {self.giveaway_service.cache_misses} misses",
+            f"Write buffer: {writes.queue_depth} queued, {writes.spilled_entries} spilled, "
+            f"{writes.rejected_entries} rejected, "
+            f"avg batch {writes.avg_batch_size:.1f}, last flush {writes.last_flush_ms:.0f} ms",
+        ]
+        await reply_text_safe(update, "\n".join(lines)[:MAX_MESSAGE_LENGTH])
 
     async def new_event(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not self._is_admin(update):
@@ -58,11 +106,26 @@ class AdminHandlers:
             name = args[1].strip()
             date_yyyy_mm_dd = args[2].strip()
 
-            self.supabase_service.deactivate_all_events()
-            self.supabase_service.new_event(event_id, name, date_yyyy_mm_dd)
-            await reply_text_safe(update, f"Event #{event_id} '{name}' is live until {date_yyyy_mm_dd}.")
+            # Runs next to the events already live; each one closes on its own end date.
+            try:
+                await self.repository.new_event(event_id, name, date_yyyy_mm_dd)
+            finally:
+                self.giveaway_service.invalidate_active_event()
+            try:
+                events = await self.giveaway_service.refresh_active_events()
+            except Exception as exc:
+                # The event exists; the invalidated cache reloads on its next read.
+                logging.warning("Event #%s created but the active list could not be reloaded: %s", event_id, exc)
+                await reply_text_safe(update, f"Event #{event_id} created; the active list will refresh shortly.")
+                return
+            await reply_text_safe(
+                update, f"Event #{event_id} '{name}' is live until {date_yyyy_mm_dd}. Running events: {len(events)}."
+            )
         except (IndexError, ValueError):
             await reply_text_safe(update, "Use format: /new_event ID | Name | YYYY-MM-DD")
+        except BackendUnavailable as exc:
+            logging.warning("Could not create event: %s", exc)
+            await reply_text_safe(update, backend_down_text(exc, "The event was not created"))
         except Exception:
             logging.exception("Failed to create new event")
             await reply_text_safe(update, "Could not create event right now. Try again.")
@@ -70,56 +133,196 @@ class AdminHandlers:
     async def pick_winners(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not self._is_admin(update):
             return
-        if not context.args:
-            await reply_text_safe(update, "Provide an event ID. Example: /pick 1")
+        # Live entries by default; a snapshot misses everyone who entered after it was
+        # taken, so it is only drawn from when the admin asks for it.
+        args = [arg for arg in context.args or [] if arg != "--snapshot"]
+        use_snapshot = len(args) != len(context.args or [])
+        if not args:
+            await reply_text_safe(update, PICK_USAGE)
             return
 
         try:
-            event_id = int(context.args[0])
+            event_id = int(args[0])
+            seed = int(args[1]) if len(args) > 1 else None
         except ValueError:
-            await reply_text_safe(update, "Event ID must be an integer.")
+            await reply_text_safe(update, "Event ID and seed must be integers.")
             return
 
         try:
-            winners = self.supabase_service.pick_winners(target_event_id=event_id)
-            if not winners:
+            snapshot = None
+            if use_snapshot:
+                # Verifying and drawing read the whole file, so both run off the event loop.
+                snapshot = await asyncio.to_thread(self.snapshot_service.latest, event_id)
+                if snapshot is None:
+                    await reply_text_safe(
+                        update, f"Event #{event_id} has no snapshot. Take one with /snapshot {event_id}."
+                    )
+                    return
+                result = await asyncio.to_thread(self.draw_engine.draw_snapshot, snapshot, seed)
+            else:
+                result = await self.draw_engine.draw(event_id, seed=seed)
+            if not result.winners:
                 await reply_text_safe(update, f"No entries found for Event #{event_id}.")
                 return
 
             lines = [f"Event #{event_id} winners", ""]
-            for i, winner in enumerate(winners, start=1):
+            for i, winner in enumerate(result.winners, start=1):
                 lines.append(
                     f"{i}. @{winner.get('username', 'unknown')} - {winner.get('wallet_address', 'n/a')}"
                 )
+            rerun = f"/pick {event_id} {result.seed}" + (" --snapshot" if snapshot is not None else "")
+            lines += [
+                "",
+                f"Drawn from {result.entries} entries / {result.tickets} tickets.",
+                snapshot_source(snapshot) if snapshot is not None else "Source: live entries",
+                f"Seed: {result.seed} (re-run with {rerun})",
+            ]
             await reply_text_safe(update, "\n".join(lines))
+        except SnapshotIntegrityError:
+            await reply_text_safe(
+                update,
+                f"The latest snapshot of Event #{event_id} is damaged (SHA-256 mismatch). No winners were drawn. "
+                f"Take a new one with /snapshot {event_id}.",
+            )
+        except BackendUnavailable as exc:
+            logging.warning("Could not draw event_id=%s: %s", event_id, exc)
+            await reply_text_safe(
+                update,
+                backend_down_text(
+                    exc, f"No winners were drawn. /pick {event_id} --snapshot draws from the latest snapshot instead"
+                ),
+            )
         except Exception:
             logging.exception("Failed to pick winners for event_id=%s", event_id)
             await reply_text_safe(update, "Could not draw winners right now. Try again.")
 
+    async def snapshot(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not self._is_admin(update):
+            return
+        try:
+            event_id = int(context.args[0])
+        except (IndexError, ValueError):
+            await reply_text_safe(update, "Provide an event ID. Example: /snapshot 1")
+            return
+
+        try:
+            snapshot = await self.snapshot_service.create(event_id)
+        except Exception:
+            logging.exception("Failed to snapshot event_id=%s", event_id)
+            await reply_text_safe(update, "Could not create the snapshot right now. Try again.")
+            return
+
+        stats = snapshot.stats()
+        text = (
+            f"Snapshot of Event #{event_id} ({snapshot.created_at})\n"
+            f"Entries: {stats.entries}\n"
+            f"Referrals: {stats.referrals}\n"
+            f"Total tickets: {stats.tickets}\n"
+            f"Top referrer: {stats.max_referrals} referrals\n"
+            f"SHA-256: {snapshot.sha256}\n\n"
+            f"Draw from it with /pick {event_id} --snapshot."
+        )
+        await reply_text_safe(update, text)
+
     async def broadcast(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not self._is_admin(update):
             return
 
-        message = " ".join(context.args).strip()
+        try:
+            active_only, event_id, min_referrals, message = parse_broadcast_args(context.args)
+        except ValueError:
+            await reply_text_safe(update, BROADCAST_USAGE)
+            return
         if not message:
-            await reply_text_safe(update, "Usage: /broadcast [message]")
+            await reply_text_safe(update, BROADCAST_USAGE)
             return
 
-        users = self.supabase_service.get_all_user_ids()
-        await reply_text_safe(update, f"Broadcasting to {len(users)} users...")
+        # Taken before the first await below; a second /broadcast arriving meanwhile is turned away here.
+        if not self.broadcast_service.reserve():
+            await reply_text_safe(update, "A broadcast is already running. Wait for it to finish.")
+            return
 
-        sent = 0
-        failed = 0
-        for user_id in users:
-            try:
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=f"AMAZO-WORLD UPDATE\n\n{message}",
-                )
-                sent += 1
-            except Exception:
-                failed += 1
-                logging.exception("Broadcast failed for user_id=%s", user_id)
+        scheduled = False
+        try:
+            if active_only and event_id is None:
+                events = await self.giveaway_service.get_active_events()
+                if not events:
+                    await reply_text_safe(update, "No active event to target.")
+                    return
+                if len(events) > 1:
+                    ids = ", ".join(str(event["id"]) for event in events)
+                    await reply_text_safe(update, f"Several events are running ({ids}). Pick one with --event=ID.")
+                    return
+                event_id = int(events[0]["id"])
+            segment = RecipientSegment(event_id=event_id, min_referrals=min_referrals)
 
-        await reply_text_safe(update, f"Broadcast done.\nSent: {sent}\nFailed: {failed}")
+            status = await update.message.reply_text("Preparing broadcast...")
+            context.application.create_task(
+                self._run_broadcast(context, message, update.message.chat_id, status.message_id, segment),
+                update=update,
+            )
+            scheduled = True
+        finally:
+            if not scheduled:
+                self.broadcast_service.release()
 
+    async def _run_broadcast(
+        self,
+        context: ContextTypes.DEFAULT_TYPE,
+        message: str,
+        chat_id: int,
+        status_message_id: int,
+        segment: RecipientSegment,
+    ) -> None:
+        try:
+            await self.broadcast_service.start(context.bot, message, chat_id, status_message_id, segment, reserved=True)
+        except Exception:
+            logging.exception("Broadcast aborted")
+            await context.bot.send_message(
+                chat_id=chat_id,
+                text="Broadcast stopped unexpectedly. It will resume from its checkpoint on restart.",
+            )
+
+    async def perf(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if not self._is_admin(update):
+            return
+        try:
+            action, value = parse_perf_args(context.args)
+        except ValueError:
+            await reply_text_safe(update, PERF_USAGE)
+            return
+
+        if action == "lag":
+            self.profiler.watch_stalls(value)
+            await reply_text_safe(update, self.profiler.status())
+            return
+        if action == "slow":
+            self.profiler.watch_slow_callbacks(value)
+            await reply_text_safe(update, self.profiler.status())
+            return
+        if action == "status":
+            await reply_text_safe(update, self.profiler.status())
+            return
+
+        if self.profiler.is_profiling:
+            await reply_text_safe(update, "A profile is already running. Wait for it to finish.")
+            return
+        seconds = min(value, MAX_PROFILE_SECONDS)
+        await reply_text_safe(update, f"Profiling the event loop for {seconds:.0f}s...")
+        context.application.create_task(
+            self._run_profile(context, update.message.chat_id, seconds), update=update
+        )
+
+    async def _run_profile(self, context: ContextTypes.DEFAULT_TYPE, chat_id: int, seconds: float) -> None:
+        try:
+            report = await self.profiler.profile(seconds)
+            await context.bot.send_message(chat_id=chat_id, text=report.summary()[:MAX_MESSAGE_LENGTH])
+            await context.bot.send_document(
+                chat_id=chat_id,
+                document=report.collapsed().encode(),
+                filename=time.strftime("perf-%Y%m%d-%H%M%S.folded", time.gmtime()),
+                caption="Collapsed stacks; open in speedscope.app or pipe to flamegraph.pl.",
+            )
+        except Exception:
+            logging.exception("Profile of %.0fs failed", seconds)
+            await context.bot.send_message(chat_id=chat_id, text="The profile failed. Check the logs.")
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import time
 from typing import Any
 
 from telegram import Message, Update
 from telegram.error import TelegramError
 from telegram.helpers import escape_markdown
 
+from amazo_bot.profiling import DEFAULT_PROFILE_SECONDS, DEFAULT_STALL_THRESHOLD
+from amazo_bot.services.resilience import stale_since
+
+BACKEND_DOWN_TEXT = "The giveaway database is not reachable right now. Please try again in a minute."
+
 
 def get_reply_message(update: Update) -> Message | None:
     if update.message:
@@ -15,14 +21,89 @@ def get_reply_message(update: Update) -> Message | None:
     return None
 
 
-def parse_referral_arg(args: list[str]) -> int | None:
+def parse_referral_arg(args: list[str]) -> tuple[int, int | None] | None:
+    # /start <referrer>_<event_id>; links made before events were encoded are just /start <referrer>.
     if not args:
         return None
+    referrer, _, event = args[0].partition("_")
     try:
-        referral_id = int(args[0])
+        referral_id = int(referrer)
+        event_id = int(event) if event else None
     except (ValueError, TypeError):
         return None
-    return referral_id if referral_id > 0 else None
+    if referral_id <= 0 or (event_id is not None and event_id <= 0):
+        return None
+    return referral_id, event_id
+
+
+def parse_event_arg(value: str | None) -> int | None:
+    # An event id from a command argument or the tail of callback data
+    # ("show_lb_7"); None when there is none.
+    if not value:
+        return None
+    try:
+        event_id = int(value)
+    except ValueError:
+        return None
+    return event_id if event_id > 0 else None
+
+
+def parse_broadcast_args(args: list[str]) -> tuple[bool, int | None, int, str]:
+    active_only = False
+    event_id = None
+    min_referrals = 0
+    index = 0
+    while index < len(args) and args[index].startswith("--"):
+        option = args[index]
+        if option == "--active":
+            active_only = True
+        elif option.startswith("--event="):
+            event_id = parse_event_arg(option.split("=", 1)[1])
+            if event_id is None:
+                raise ValueError("--event must be an event ID")
+        elif option.startswith("--min-refs="):
+            min_referrals = int(option.split("=", 1)[1])
+            if min_referrals < 0:
+                raise ValueError("--min-refs must not be negative")
+        else:
+            raise ValueError(f"Unknown option: {option}")
+        index += 1
+    return active_only, event_id, min_referrals, " ".join(args[index:]).strip()
+
+
+def parse_perf_args(args: list[str]) -> tuple[str, float | None]:
+    # /perf [seconds] | /perf lag|slow on [ms] | /perf lag|slow off | /perf status.
+    # Returns the action and its seconds: profile length, or threshold (None = off).
+    if not args:
+        return "profile", DEFAULT_PROFILE_SECONDS
+    action = args[0].lower()
+    if action == "status" and len(args) == 1:
+        return "status", None
+    if action in ("lag", "slow") and len(args) in (2, 3):
+        switch = args[1].lower()
+        if switch == "off" and len(args) == 2:
+            return action, None
+        if switch == "on":
+            threshold = float(args[2]) / 1000 if len(args) == 3 else DEFAULT_STALL_THRESHOLD
+            if not threshold > 0:
+                raise ValueError("threshold must be positive")
+            return action, threshold
+        raise ValueError(f"Unknown switch: {switch}")
+    if len(args) == 1:
+        seconds = float(args[0])
+        if not seconds > 0:
+            raise ValueError("seconds must be positive")
+        return "profile", seconds
+    raise ValueError(f"Unknown /perf arguments: {args}")
+
+
+def with_stale_note(text: str) -> str:
+    # Appends a notice when this update was answered from last known values.
+    since = stale_since()
+    if since is None:
+        return text
+    minutes = max(1, round((time.time() - since) / 60))
+    return f"{text}\n\n(The database is not reachable; this is how things looked {minutes} min ago.)"
 
 
 def escape_markdown_text(text: str) -> str:
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+from telegram.ext import ContextTypes, JobQueue
+
+from amazo_bot.services.giveaway_service import GiveawayService, parse_end_date
+from amazo_bot.services.leaderboard_service import LeaderboardService
+
+EXPIRY_RETRY_SECONDS = 30.0
+
+
+def expiry_job_name(event_id: int) -> str:
+    return f"expire_event_{event_id}"
+
+
+class EventJobs:
+    def __init__(
+        self,
+        giveaway_service: GiveawayService,
+        leaderboard_service: LeaderboardService,
+        job_queue: JobQueue,
+    ) -> None:
+        self.giveaway_service = giveaway_service
+        self.leaderboard_service = leaderboard_service
+        self.job_queue = job_queue
+
+    def schedule_expiry(self, event: dict[str, Any]) -> None:
+        event_id = int(event["id"])
+        name = expiry_job_name(event_id)
+        for job in self.job_queue.get_jobs_by_name(name):
+            job.schedule_removal()
+
+        delay = (parse_end_date(event) - datetime.now(timezone.utc)).total_seconds()
+        self.job_queue.run_once(self.expire_event, when=max(0.0, delay), data=event_id, name=name)
+        logging.info("Scheduled expiry of event_id=%s in %.0fs", event_id, max(0.0, delay))
+
+    async def expire_event(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        event_id = int(context.job.data)
+        try:
+            await self.giveaway_service.expire_event(event_id)
+        except Exception:
+            logging.exception("Failed to expire event_id=%s; retrying in %.0fs", event_id, EXPIRY_RETRY_SECONDS)
+            self.job_queue.run_once(
+                self.expire_event,
+                when=EXPIRY_RETRY_SECONDS,
+                data=event_id,
+                name=expiry_job_name(event_id),
+            )
+            return
+        self.leaderboard_service.drop(event_id)
+        logging.info("Event_id=%s expired and closed", event_id)
+
+    async def reconcile_leaderboard(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        # One event at a time, so the job never holds more than one fresh index on top of the live ones.
+        for event in await self.giveaway_service.get_active_events():
+            try:
+                await self.leaderboard_service.reconcile(int(event["id"]))
+            except Exception:
+                logging.exception("Leaderboard reconcile failed for event_id=%s", event["id"])
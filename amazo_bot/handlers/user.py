@@ -1,32 +1,59 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from typing import Any
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.constants import ParseMode
 from telegram.ext import ContextTypes, ConversationHandler
 
-from amazo_bot.handlers.common import escape_markdown_text, parse_referral_arg, reply_text_safe
+from amazo_bot.handlers.common import (
+    BACKEND_DOWN_TEXT,
+    escape_markdown_text,
+    parse_event_arg,
+    parse_referral_arg,
+    reply_text_safe,
+    with_stale_note,
+)
+from amazo_bot.runtime import BotRuntime
 from amazo_bot.services.giveaway_service import GiveawayService
-from amazo_bot.services.supabase_service import SupabaseService
+from amazo_bot.services.leaderboard_service import LeaderboardService
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.resilience import BackendUnavailable
+from amazo_bot.services.write_behind import WriteBehindBuffer
 
 TERMS = 0
 WALLET = 1
 
 
 class UserHandlers:
-    def __init__(self, supabase_service: SupabaseService, giveaway_service: GiveawayService) -> None:
-        self.supabase_service = supabase_service
+    def __init__(
+        self,
+        repository: Repository,
+        giveaway_service: GiveawayService,
+        leaderboard_service: LeaderboardService,
+        write_buffer: WriteBehindBuffer,
+        runtime: BotRuntime,
+    ) -> None:
+        self.repository = repository
         self.giveaway_service = giveaway_service
+        self.leaderboard_service = leaderboard_service
+        self.write_buffer = write_buffer
+        self.runtime = runtime
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message:
             return
 
         user = update.message.from_user
-        referral_id = parse_referral_arg(context.args)
-        if referral_id and referral_id != user.id:
-            context.user_data["referred_by"] = referral_id
+        referral = parse_referral_arg(context.args)
+        event_id = None
+        if referral and referral[0] != user.id:
+            referrer, event_id = referral
+            context.user_data["referred_by"] = referrer
+            # None for links without an event: the referral then counts for whichever event the user enters.
+            context.user_data["referred_event_id"] = event_id
 
         welcome_text = (
             f"Welcome to Amazo-World, {escape_markdown_text(user.first_name)}\\!\n\n"
@@ -34,10 +61,12 @@ class UserHandlers:
             "Use the buttons below to begin\\."
         )
 
+        # A link for one event leads straight to that event.
+        suffix = f"_{event_id}" if event_id else ""
         keyboard = [
-            [InlineKeyboardButton("Enter Giveaway", callback_data="start_entry")],
+            [InlineKeyboardButton("Enter Giveaway", callback_data=f"start_entry{suffix}")],
             [InlineKeyboardButton("FAQ and Rules", callback_data="show_faq")],
-            [InlineKeyboardButton("Leaderboard", callback_data="show_lb")],
+            [InlineKeyboardButton("Leaderboard", callback_data=f"show_lb{suffix}")],
         ]
         markup = InlineKeyboardMarkup(keyboard)
 
@@ -48,12 +77,51 @@ class UserHandlers:
             reply_markup=markup,
         )
 
+    async def _choose_event(
+        self,
+        update: Update,
+        context: ContextTypes.DEFAULT_TYPE,
+        action: str,
+        prompt: str,
+        preferred: int | None = None,
+    ) -> dict[str, Any] | None:
+        # The event asked for by a "<action>_<id>" button or the command's
+        # argument, else `preferred`, else the only running one. When that
+        # leaves a choice, the user gets a button per event and None is returned.
+        events = await self.giveaway_service.get_active_events()
+        if not events:
+            await reply_text_safe(update, "No active giveaway at the moment.")
+            return None
+
+        if update.callback_query:
+            requested = parse_event_arg(update.callback_query.data.rpartition("_")[2])
+        else:
+            requested = parse_event_arg(context.args[0] if context.args else None)
+        wanted = requested or preferred
+        for event in events:
+            if int(event["id"]) == wanted:
+                return event
+        if wanted is None and len(events) == 1:
+            return events[0]
+
+        keyboard = [
+            [InlineKeyboardButton(str(event["name"]), callback_data=f"{action}_{event['id']}")] for event in events
+        ]
+        text = f"Event #{requested} is not running. {prompt}" if requested else prompt
+        await reply_text_safe(update, text, reply_markup=InlineKeyboardMarkup(keyboard))
+        return None
+
     async def enter_giveaway(
         self, update: Update, context: ContextTypes.DEFAULT_TYPE
     ) -> int:
-        event = self.giveaway_service.get_active_event()
+        event = await self._choose_event(
+            update,
+            context,
+            "start_entry",
+            "Which giveaway do you want to enter?",
+            preferred=context.user_data.get("referred_event_id"),
+        )
         if not event:
-            await reply_text_safe(update, "No active giveaway at the moment.")
             return ConversationHandler.END
 
         context.user_data["current_event_id"] = int(event["id"])
@@ -99,30 +167,38 @@ class UserHandlers:
         user = update.message.from_user
         event_id = int(context.user_data.get("current_event_id", 0))
         referrer = context.user_data.get("referred_by")
-        if referrer == user.id:
+        referred_event_id = context.user_data.get("referred_event_id")
+        if referrer == user.id or referred_event_id not in (None, event_id):
+            # A link for another event does not count here.
             referrer = None
 
+        username = user.username or f"User_{user.id}"
         try:
-            self.supabase_service.register_entry(
+            if await self.leaderboard_service.is_registered(event_id, user.id):
+                await reply_text_safe(update, f"You are already registered for Event #{event_id}.")
+                return ConversationHandler.END
+
+            # Persisted asynchronously by the write-behind buffer; the reply does not wait on Supabase.
+            self.write_buffer.enqueue_entry(
                 user_id=user.id,
                 event_id=event_id,
-                username=user.username or f"User_{user.id}",
+                username=username,
                 wallet_address=wallet,
                 referred_by=referrer,
             )
-            if referrer:
-                self.supabase_service.increment_referral(
-                    referrer_id=int(referrer),
-                    target_event_id=event_id,
-                )
-
-            bot_name = (await context.bot.get_me()).username
-            ref_link = f"https://t.me/{bot_name}?start={user.id}"
+            self.leaderboard_service.record_entry(event_id, user.id, username, int(referrer) if referrer else None)
+
+            ref_link = self.runtime.referral_link(user.id, event_id)
             text = (
                 f"Successfully registered for Event #{event_id}.\n\n"
                 f"Your referral link:\n{ref_link}"
             )
             await reply_text_safe(update, text)
+        except BackendUnavailable as exc:
+            # Nothing was queued; let the user send the same wallet again.
+            logging.warning("Registration of user_id=%s deferred: %s", user.id, exc)
+            await reply_text_safe(update, f"{BACKEND_DOWN_TEXT} Send your wallet address again to retry.")
+            return WALLET
         except Exception:
             logging.exception("Failed to register wallet for user_id=%s event_id=%s", user.id, event_id)
             await reply_text_safe(
@@ -140,35 +216,57 @@ class UserHandlers:
         if not update.message:
             return
         user_id = update.message.from_user.id
-        event = self.giveaway_service.get_active_event()
-        if not event:
+        events = await self.giveaway_service.get_active_events()
+        if not events:
             await reply_text_safe(update, "No active event. Use /history to see previous entries.")
             return
 
-        entry = self.supabase_service.get_user_entry_for_event(user_id=user_id, event_id=int(event["id"]))
-        if not entry:
-            await reply_text_safe(update, f"You have not joined {event['name']} yet. Use /enter.")
-            return
+        requested = parse_event_arg(context.args[0] if context.args else None)
+        if requested:
+            events = [event for event in events if int(event["id"]) == requested]
+            if not events:
+                await reply_text_safe(update, f"Event #{requested} is not running. Use /history for past events.")
+                return
 
-        bot_name = (await context.bot.get_me()).username
-        ref_link = f"https://t.me/{bot_name}?start={user_id}"
-        referrals = int(entry.get("referral_count", 0))
-        text = (
-            f"Current event: {event['name']}\n"
-            f"Wallet: {entry['wallet_address']}\n"
-            f"Referrals: {referrals}\n"
-            f"Total tickets: {referrals + 1}\n\n"
-            f"Your link: {ref_link}"
+        # The leaderboard indexes are in memory; only events the user joined cost a query.
+        joined = [
+            event for event in events if await self.leaderboard_service.is_registered(int(event["id"]), user_id)
+        ]
+        entries = await asyncio.gather(
+            *(self.repository.get_user_entry_for_event(user_id=user_id, event_id=int(event["id"])) for event in joined)
         )
-        await reply_text_safe(update, text)
+        blocks = []
+        for event, entry in zip(joined, entries):
+            event_id = int(event["id"])
+            if entry:
+                referrals = int(entry.get("referral_count", 0))
+                wallet = entry["wallet_address"]
+            else:
+                # Registered, but still in the write-behind buffer: the index is all we have.
+                referrals = await self.leaderboard_service.referral_count(event_id, user_id) or 0
+                wallet = "registration pending"
+            rank, participants = await self.leaderboard_service.rank(event_id, user_id)
+            rank_text = f"#{rank} of {participants}" if rank else "unranked"
+            blocks.append(
+                f"Event: {event['name']} (#{event_id})\n"
+                f"Wallet: {wallet}\n"
+                f"Referrals: {referrals}\n"
+                f"Total tickets: {referrals + 1}\n"
+                f"Rank: {rank_text}\n"
+                f"Your link: {self.runtime.referral_link(user_id, event_id)}"
+            )
+        if not blocks:
+            name = events[0]["name"] if len(events) == 1 else "any running giveaway"
+            await reply_text_safe(update, f"You have not joined {name} yet. Use /enter.")
+            return
+        await reply_text_safe(update, with_stale_note("\n\n".join(blocks)))
 
     async def leaderboard(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-        event = self.giveaway_service.get_active_event()
+        event = await self._choose_event(update, context, "show_lb", "Which leaderboard do you want to see?")
         if not event:
-            await reply_text_safe(update, "No active event.")
             return
 
-        leaderboard = self.supabase_service.get_leaderboard(event_id=int(event["id"]), limit=10)
+        leaderboard = await self.leaderboard_service.top(int(event["id"]), limit=10)
         if not leaderboard:
             await reply_text_safe(update, "Leaderboard is empty. Be the first to invite someone.")
             return
@@ -178,13 +276,13 @@ class UserHandlers:
             username = row.get("username") or "unknown_user"
             refs = int(row.get("referral_count", 0))
             lines.append(f"{index}. @{username} - {refs} referrals")
-        await reply_text_safe(update, "\n".join(lines))
+        await reply_text_safe(update, with_stale_note("\n".join(lines)))
 
     async def history(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not update.message:
             return
         user_id = update.message.from_user.id
-        rows = self.supabase_service.get_user_history(user_id=user_id)
+        rows = await self.repository.get_user_history(user_id=user_id)
         if not rows:
             await reply_text_safe(update, "You have not participated in any events yet.")
             return
@@ -195,13 +293,14 @@ class UserHandlers:
             name = giveaway.get("name", "Unknown")
             status = "Active" if giveaway.get("is_active") else "Closed"
             lines.append(f"- {name} ({status}): {row.get('referral_count', 0)} referrals")
-        await reply_text_safe(update, "\n".join(lines))
+        await reply_text_safe(update, with_stale_note("\n".join(lines)))
 
     async def faq_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         text = (
             "Amazo-World FAQ\n\n"
             "How to enter: Use /enter and follow the steps.\n"
-            "Referrals: Get your link with /balance.\n"
+            "Several giveaways can run at once: /enter, /leaderboard and /balance take an event ID.\n"
+            "Referrals: Get your link with /balance; each event has its own.\n"
             "Winners: Drawn per event using weighted tickets.\n"
             "Wallets: SOL and ETH format accepted.\n\n"
             "Need help? Contact an admin."
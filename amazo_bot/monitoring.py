@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from amazo_bot.metrics import BACKEND_UP, EVENT_LOOP_LAG
+from amazo_bot.services.repository import Repository
+
+
+class HealthMonitor:
+    # Background checks behind /health: a heartbeat that measures how late the
+    # event loop wakes up, and a periodic cheap backend query. /health reports
+    # the last results instead of running checks on the request path.
+
+    def __init__(
+        self,
+        repository: Repository,
+        probe_interval: float = 15.0,
+        probe_timeout: float = 5.0,
+        lag_interval: float = 0.5,
+        max_lag: float = 1.0,
+    ) -> None:
+        self.repository = repository
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.lag_interval = lag_interval
+        self.max_lag = max_lag
+        self.backend_up: bool | None = None
+        self.backend_latency: float | None = None
+        self.backend_error = ""
+        self.last_probe_at: float | None = None
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._watch_loop_lag(), name="health_loop_lag"),
+            asyncio.create_task(self._probe_backend_forever(), name="health_backend_probe"),
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _watch_loop_lag(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag = max(0.0, time.perf_counter() - expected)
+            self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+            EVENT_LOOP_LAG.set(self.loop_lag)
+
+    async def _probe_backend_forever(self) -> None:
+        while True:
+            await self.probe_backend()
+            await asyncio.sleep(self.probe_interval)
+
+    async def probe_backend(self) -> bool:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.repository.fetch_active_event_record(), self.probe_timeout)
+        except Exception as exc:
+            if self.backend_up is not False:
+                logging.warning("Backend health probe failed: %r", exc)
+            self.backend_up = False
+            self.backend_error = repr(exc)
+        else:
+            if self.backend_up is False:
+                logging.info("Backend health probe recovered")
+            self.backend_up = True
+            self.backend_error = ""
+        self.backend_latency = time.perf_counter() - started
+        self.last_probe_at = time.time()
+        BACKEND_UP.set(1 if self.backend_up else 0)
+        return self.backend_up
+
+    @property
+    def healthy(self) -> bool:
+        return bool(self.backend_up) and self.loop_lag <= self.max_lag
+
+    def status(self) -> dict[str, Any]:
+        if self.backend_up is None:
+            status = "starting"
+        else:
+            status = "ok" if self.healthy else "degraded"
+        return {
+            "status": status,
+            "backend": {
+                "up": self.backend_up,
+                "latency_ms": None if self.backend_latency is None else round(self.backend_latency * 1000, 1),
+                "checked_at": self.last_probe_at,
+                "error": self.backend_error or None,
+            },
+            "event_loop": {
+                "lag_ms": round(self.loop_lag * 1000, 1),
+                "max_lag_ms": round(self.max_loop_lag * 1000, 1),
+                "threshold_ms": round(self.max_lag * 1000, 1),
+            },
+        }
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from telegram.ext import Application, BasePersistence, ContextTypes, PersistenceInput
+
+from amazo_bot.metrics import REGISTRY
+
+ConversationKey = tuple[int | str, ...]
+T = TypeVar("T")
+
+# How often build_application runs SQLitePersistence.evict_job.
+EVICT_INTERVAL = 60.0
+
+SCHEMA = """
+create table if not exists user_data (
+    user_id integer primary key,
+    data text not null,
+    updated_at real not null
+);
+create table if not exists conversations (
+    name text not null,
+    key text not null,
+    state text not null,
+    updated_at real not null,
+    primary key (name, key)
+);
+"""
+
+USER_STATE_RESIDENT = REGISTRY.gauge(
+    "amazo_user_state_resident", "Users whose user_data is currently held in memory."
+)
+USER_STATE_EVICTED = REGISTRY.counter(
+    "amazo_user_state_evicted_total", "user_data entries moved out of memory, by reason (idle or cap).", ("reason",)
+)
+
+
+class SQLitePersistence(BasePersistence):
+    # Keeps context.user_data and ConversationHandler states in a local SQLite
+    # file. PTB hands over changed entries every `update_interval` seconds;
+    # they are written in one transaction, so handlers never wait on disk.
+    #
+    # user_data is loaded lazily: nothing at boot, and a user's row when an
+    # update of theirs arrives (refresh_user_data runs before the handlers).
+    # evict() drops users idle for `idle_ttl` seconds, or the least recently
+    # seen beyond `max_users`, from memory only; their row stays on disk and
+    # is loaded again on their next update. Conversations older than
+    # `conversation_ttl` are not restored, matching the handler's timeout.
+    #
+    # Every SQLite call runs on one dedicated thread, never on the event loop:
+    # a WAL checkpoint or a slow disk then delays only that thread. Being a
+    # single thread also keeps writes in order and reads behind earlier writes.
+
+    def __init__(
+        self,
+        path: str,
+        update_interval: float = 10.0,
+        idle_ttl: float = 3600.0,
+        max_users: int = 50_000,
+        conversation_ttl: float = 600.0,
+    ) -> None:
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_users = max_users
+        self.conversation_ttl = conversation_ttl
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-db")
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.executescript(SCHEMA)
+        # Users resident in Application.user_data, least recently seen first.
+        self._last_seen: OrderedDict[int, float] = OrderedDict()
+        # Evicted users whose deletion PTB has not handed back yet, and the live
+        # dicts of those that came back in the meantime.
+        self._evicting: set[int] = set()
+        self._revived: dict[int, dict[Any, Any]] = {}
+        self._pending_users: dict[int, str | None] = {}
+        self._pending_conversations: dict[tuple[str, str], str | None] = {}
+        self._commit_scheduled = False
+
+    @property
+    def resident_users(self) -> int:
+        return len(self._last_seen)
+
+    async def get_user_data(self) -> dict[int, dict[Any, Any]]:
+        return {}
+
+    async def get_chat_data(self) -> dict[int, Any]:
+        return {}
+
+    async def get_bot_data(self) -> Any:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _load_conversations(self, name: str) -> list[tuple[str, str]]:
+        return self._conn.execute(
+            "select key, state from conversations where name = ? and updated_at >= ?",
+            (name, time.time() - self.conversation_ttl),
+        ).fetchall()
+
+    def _load_user(self, user_id: int) -> tuple[str] | None:
+        return self._conn.execute("select data from user_data where user_id = ?", (user_id,)).fetchone()
+
+    async def get_conversations(self, name: str) -> dict[ConversationKey, object]:
+        rows = await self._run(self._load_conversations, name)
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def refresh_user_data(self, user_id: int, user_data: dict[Any, Any]) -> None:
+        if user_id in self._last_seen:
+            self._last_seen[user_id] = time.monotonic()
+            self._last_seen.move_to_end(user_id)
+            return
+        self._last_seen[user_id] = time.monotonic()
+        USER_STATE_RESIDENT.set(len(self._last_seen))
+        if user_id in self._evicting:
+            self._revived[user_id] = user_data
+        row = await self._run(self._load_user, user_id)
+        if row is not None:
+            for key, value in json.loads(row[0]).items():
+                user_data.setdefault(key, value)
+
+    async def update_user_data(self, user_id: int, data: dict[Any, Any]) -> None:
+        self._stage_user(user_id, json.dumps(data) if data else None)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        if user_id in self._evicting:
+            # Our own eviction: keep the row. If the user came back before PTB
+            # got here, their changes were skipped in favour of this drop.
+            self._evicting.discard(user_id)
+            revived = self._revived.pop(user_id, None)
+            if revived:
+                self._stage_user(user_id, json.dumps(revived))
+            return
+        self._stage_user(user_id, None)
+
+    async def update_conversation(self, name: str, key: ConversationKey, new_state: object | None) -> None:
+        state = None if new_state is None else json.dumps(new_state)
+        self._pending_conversations[(name, json.dumps(list(key)))] = state
+        self._schedule_commit()
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        return None
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        return None
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        return None
+
+    async def update_bot_data(self, data: Any) -> None:
+        return None
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        return None
+
+    async def update_callback_data(self, data: Any) -> None:
+        return None
+
+    async def wait_written(self) -> None:
+        # Returns once every change handed over so far is on disk.
+        self._commit()
+        await self._run(lambda: None)
+
+    async def flush(self) -> None:
+        await self.wait_written()
+        await self._run(self._conn.close)
+        self._executor.shutdown()
+
+    def _stage_user(self, user_id: int, data: str | None) -> None:
+        self._pending_users[user_id] = data
+        self._schedule_commit()
+
+    def _schedule_commit(self) -> None:
+        # PTB gathers all update_* calls of one persistence run; the callback
+        # queued by the first runs after the rest, so a run is one transaction.
+        if not self._commit_scheduled:
+            self._commit_scheduled = True
+            asyncio.get_running_loop().call_soon(self._commit)
+
+    def _commit(self) -> None:
+        # Takes the staged changes on the loop and queues them for the database thread.
+        self._commit_scheduled = False
+        if not self._pending_users and not self._pending_conversations:
+            return
+        users, self._pending_users = self._pending_users, {}
+        conversations, self._pending_conversations = self._pending_conversations, {}
+        self._executor.submit(self._write, users, conversations)
+
+    def _write(self, users: dict[int, str | None], conversations: dict[tuple[str, str], str | None]) -> None:
+        now = time.time()
+        conn = self._conn
+        try:
+            conn.execute("begin")
+            conn.executemany(
+                "insert into user_data (user_id, data, updated_at) values (?, ?, ?) "
+                "on conflict (user_id) do update set data = excluded.data, updated_at = excluded.updated_at",
+                [(user_id, data, now) for user_id, data in users.items() if data is not None],
+            )
+            conn.executemany(
+                "delete from user_data where user_id = ?",
+                [(user_id,) for user_id, data in users.items() if data is None],
+            )
+            conn.executemany(
+                "insert into conversations (name, key, state, updated_at) values (?, ?, ?, ?) "
+                "on conflict (name, key) do update set state = excluded.state, updated_at = excluded.updated_at",
+                [(name, key, state, now) for (name, key), state in conversations.items() if state is not None],
+            )
+            conn.executemany(
+                "delete from conversations where name = ? and key = ?",
+                [(name, key) for (name, key), state in conversations.items() if state is None],
+            )
+            conn.execute("commit")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("rollback")
+            logging.exception(
+                "Could not persist state for %s users and %s conversations", len(users), len(conversations)
+            )
+
+    def evict(self, application: Application, now: float | None = None) -> int:
+        if now is None:
+            now = time.monotonic()
+        last_seen = self._last_seen
+        evicted = 0
+        while last_seen:
+            user_id, seen = next(iter(last_seen.items()))
+            if now - seen >= self.idle_ttl:
+                reason = "idle"
+            elif len(last_seen) > self.max_users:
+                reason = "cap"
+            else:
+                break
+            del last_seen[user_id]
+            self._evicting.add(user_id)
+            application.drop_user_data(user_id)
+            USER_STATE_EVICTED.inc(reason=reason)
+            evicted += 1
+        USER_STATE_RESIDENT.set(len(last_seen))
+        return evicted
+
+    async def evict_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if self.evict(context.application):
+            # Hand the drops to this persistence right away, which keeps the
+            # window for a returning user's changes to be skipped short.
+            await context.application.update_persistence()
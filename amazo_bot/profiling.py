@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+
+from amazo_bot.metrics import REGISTRY
+
+DEFAULT_PROFILE_SECONDS = 10.0
+MAX_PROFILE_SECONDS = 300.0
+DEFAULT_SAMPLE_INTERVAL = 0.01
+# asyncio's own default for slow callbacks in debug mode.
+DEFAULT_STALL_THRESHOLD = 0.1
+
+EVENT_LOOP_STALLS = REGISTRY.counter(
+    "amazo_event_loop_stalls_total", "Event loop stalls over the threshold while /perf lag is on."
+)
+
+# Leaf frames that mean the loop was waiting for I/O, not running Python code.
+_IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "poll")}
+
+
+def _short_path(filename: str) -> str:
+    # The longest sys.path entry that contains the file, e.g. telegram/ext/_application.py.
+    best = ""
+    for entry in sys.path:
+        if entry and filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best):].lstrip(os.sep) if best else filename
+
+
+@dataclass
+class ProfileReport:
+    seconds: float
+    interval: float
+    # Collapsed stacks (root first, ';'-separated) -> samples.
+    stacks: Counter[str] = field(default_factory=Counter)
+    idle_samples: int = 0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    @property
+    def busy_share(self) -> float:
+        samples = self.samples
+        return (samples - self.idle_samples) / samples if samples else 0.0
+
+    def top(self, limit: int = 15) -> list[tuple[str, int, int]]:
+        # (function, self samples, total samples), hottest first. Idle samples are left out.
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            if not frames or frames[-1] == "<idle>":
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        ranked = sorted(total, key=lambda name: (own[name], total[name]), reverse=True)
+        return [(name, own[name], total[name]) for name in ranked[:limit]]
+
+    def collapsed(self) -> str:
+        # Brendan Gregg's folded format: flamegraph.pl, speedscope and inferno read it.
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = 15) -> str:
+        samples = self.samples
+        lines = [
+            f"Profile: {self.seconds:.0f}s, {samples} samples every {self.interval * 1000:.0f} ms",
+            f"Event loop busy: {self.busy_share:.0%}",
+            "",
+            "Hot functions (self% / total% of samples):",
+        ]
+        for name, own, total in self.top(limit):
+            lines.append(f"{own / samples:6.1%} {total / samples:6.1%}  {name}")
+        return "\n".join(lines)
+
+
+class LoopProfiler:
+    # Diagnostics for the event loop thread, all off until the admin asks:
+    # - profile(): a background thread samples the loop thread's stack every
+    #   `interval` seconds via sys._current_frames(), for a fixed time;
+    # - stall watch: a heartbeat task plus a watchdog thread; a stall longer
+    #   than the threshold is logged with the stack that was blocking;
+    # - slow callbacks: asyncio debug mode, which logs every callback that
+    #   runs longer than loop.slow_callback_duration.
+    # Nothing runs and nothing is patched while they are off.
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.stall_threshold: float | None = None
+        self.slow_callback_threshold: float | None = None
+        self._labels: dict[CodeType, str] = {}
+        self._profiling = False
+        self._heartbeat: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._watchdog_stop = threading.Event()
+        self._beat = 0.0
+        self._stall_stack: str | None = None
+
+    @property
+    def is_profiling(self) -> bool:
+        return self._profiling
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame: FrameType | None) -> str:
+        leaf = frame.f_code if frame is not None else None
+        if leaf is not None and (os.path.basename(leaf.co_filename), leaf.co_name) in _IDLE_FRAMES:
+            return "<idle>"
+        frames = []
+        while frame is not None:
+            frames.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+    async def profile(self, seconds: float) -> ProfileReport:
+        if self._profiling:
+            raise RuntimeError("A profile is already running")
+        seconds = min(max(seconds, 1.0), MAX_PROFILE_SECONDS)
+        report = ProfileReport(seconds=seconds, interval=self.interval)
+        loop_thread = threading.get_ident()
+        stop = threading.Event()
+
+        def sample() -> None:
+            stacks = report.stacks
+            while not stop.wait(self.interval):
+                stack = self._stack(sys._current_frames().get(loop_thread))
+                stacks[stack] += 1
+                if stack == "<idle>":
+                    report.idle_samples += 1
+
+        sampler = threading.Thread(target=sample, name="perf-sampler", daemon=True)
+        self._profiling = True
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            # At most the sampler's current stack walk is left.
+            sampler.join()
+            self._profiling = False
+        return report
+
+    def watch_stalls(self, threshold: float | None) -> None:
+        # None turns the watch off.
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+            # The watchdog exits on its next check; no need to wait for it here.
+            self._watchdog_stop.set()
+            self._watchdog = None
+        self.stall_threshold = threshold
+        if threshold is None:
+            return
+        self._beat = time.perf_counter()
+        self._watchdog_stop = threading.Event()
+        self._heartbeat = asyncio.create_task(self._beat_forever(threshold), name="perf_stall_heartbeat")
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(threading.get_ident(), threshold, self._watchdog_stop),
+            name="perf-stall-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def _beat_forever(self, threshold: float) -> None:
+        tick = threshold / 2
+        while True:
+            expected = time.perf_counter() + tick
+            self._beat = expected
+            await asyncio.sleep(tick)
+            late = time.perf_counter() - expected
+            stack, self._stall_stack = self._stall_stack, None
+            if late > threshold:
+                EVENT_LOOP_STALLS.inc()
+                logging.warning(
+                    "Event loop blocked for %.0f ms (threshold %.0f ms); stack while blocked:\n%s",
+                    late * 1000,
+                    threshold * 1000,
+                    stack or "(not caught, stall ended between watchdog checks)",
+                )
+
+    def _watch(self, loop_thread: int, threshold: float, stop: threading.Event) -> None:
+        # Grabs the loop thread's stack while it is still blocked, once per stall.
+        tick = threshold / 2
+        caught_beat = None
+        while not stop.wait(tick):
+            beat = self._beat
+            if beat == caught_beat or time.perf_counter() - beat <= threshold:
+                continue
+            frame = sys._current_frames().get(loop_thread)
+            if frame is not None:
+                self._stall_stack = "".join(traceback.format_stack(frame))
+                caught_beat = beat
+
+    def watch_slow_callbacks(self, threshold: float | None) -> None:
+        loop = asyncio.get_running_loop()
+        self.slow_callback_threshold = threshold
+        if threshold is None:
+            loop.set_debug(False)
+            return
+        loop.slow_callback_duration = threshold
+        loop.set_debug(True)
+
+    def status(self) -> str:
+        def describe(threshold: float | None) -> str:
+            return "off" if threshold is None else f"on, {threshold * 1000:.0f} ms"
+
+        return (
+            f"Profile: {'running' if self._profiling else 'idle'}\n"
+            f"Stall watch: {describe(self.stall_threshold)}\n"
+            f"Slow callbacks: {describe(self.slow_callback_threshold)}"
+        )
+
+    async def close(self) -> None:
+        heartbeat = self._heartbeat
+        self.watch_stalls(None)
+        if heartbeat is not None:
+            await asyncio.gather(heartbeat, return_exceptions=True)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+
+@dataclass
+class BotRuntime:
+    # Process-wide values resolved once during warm-up and read by handlers.
+    boot_started: float = field(default_factory=time.perf_counter)
+    bot_username: str = ""
+    warm_up_phases_ms: dict[str, float] = field(default_factory=dict)
+    polling_at: float | None = None
+    ready_at: float | None = None
+    first_update_at: float | None = None
+    _link_prefix: str = field(default="https://t.me/?start=", init=False, repr=False)
+
+    def set_bot_username(self, username: str) -> None:
+        self.bot_username = username
+        self._link_prefix = f"https://t.me/{username}?start="
+
+    def referral_link(self, user_id: int, event_id: int | None = None) -> str:
+        # Start parameters allow [A-Za-z0-9_-], hence <referrer>_<event_id>.
+        if event_id is None:
+            return f"{self._link_prefix}{user_id}"
+        return f"{self._link_prefix}{user_id}_{event_id}"
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.warm_up_phases_ms[name] = (time.perf_counter() - started) * 1000
+
+    def mark_polling(self) -> None:
+        self.polling_at = time.perf_counter()
+        logging.info("Taking updates %.0f ms after boot; caches warm up in the background", self.boot_to_polling_ms)
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        phases = ", ".join(f"{name}={ms:.0f}ms" for name, ms in self.warm_up_phases_ms.items())
+        logging.info("Warm-up finished %.0f ms after boot (%s)", self.boot_to_ready_ms, phases)
+
+    @property
+    def boot_to_polling_ms(self) -> float | None:
+        if self.polling_at is None:
+            return None
+        return (self.polling_at - self.boot_started) * 1000
+
+    @property
+    def boot_to_ready_ms(self) -> float | None:
+        if self.ready_at is None:
+            return None
+        return (self.ready_at - self.boot_started) * 1000
+
+    @property
+    def cold_start_ms(self) -> float | None:
+        if self.first_update_at is None:
+            return None
+        return (self.first_update_at - self.boot_started) * 1000
+
+    async def record_update_served(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        if self.first_update_at is not None:
+            return
+        self.first_update_at = time.perf_counter()
+        logging.info("Cold start: first update served %.0f ms after boot", self.cold_start_ms)
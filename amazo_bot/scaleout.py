@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import contextlib
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from telegram import Bot, Update
+from telegram.error import Conflict, TelegramError
+from telegram.ext import Application
+
+from amazo_bot.config import Settings
+from amazo_bot.logging_config import configure_logging
+
+WORKER_READY_TIMEOUT = 120.0
+SUPERVISE_INTERVAL = 1.0
+
+# Builds the Application inside a worker process: (worker_id, run_singletons, *factory_args).
+AppFactory = Callable[..., Application]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    def __init__(self, nodes: int, replicas: int = 128) -> None:
+        if nodes <= 0:
+            raise ValueError("nodes must be positive")
+        points = sorted((_hash(f"{node}:{replica}"), node) for node in range(nodes) for replica in range(replicas))
+        self._keys = [key for key, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: int) -> int:
+        index = bisect.bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._nodes[index]
+
+
+def update_partition_key(payload: dict[str, Any]) -> int:
+    # Route by the acting user so ConversationHandler state and per-user order stay
+    # on one worker; fall back to the chat, then the update id.
+    for key, value in payload.items():
+        if key == "update_id" or not isinstance(value, dict):
+            continue
+        sender = value.get("from") or value.get("user")
+        if isinstance(sender, dict) and "id" in sender:
+            return int(sender["id"])
+        chat = value.get("chat") or (value.get("message") or {}).get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return int(chat["id"])
+    return int(payload.get("update_id", 0))
+
+
+def build_worker_application(worker_id: int, run_singletons: bool) -> Application:
+    from amazo_bot.telegram_app import build_application
+
+    return build_application(worker_id=worker_id, run_singletons=run_singletons)
+
+
+async def _serve_worker(
+    worker_id: int,
+    run_singletons: bool,
+    inbox: multiprocessing.Queue,
+    ready: multiprocessing.Queue,
+    changes: multiprocessing.Queue,
+    app_factory: AppFactory,
+    factory_args: tuple[Any, ...],
+) -> None:
+    app = app_factory(worker_id, run_singletons, *factory_args)
+    # Cache changes made here go to the dispatcher, which relays them to every
+    # other worker; relayed ones arrive on the inbox as ("change", change).
+    peers = getattr(app, "peer_services", ())
+    for service in peers:
+        service.on_change = lambda change: changes.put((worker_id, change))
+    loop = asyncio.get_running_loop()
+    await app.initialize()
+    try:
+        if app.post_init:
+            await app.post_init(app)
+        await app.start()
+        ready.put(worker_id)
+        try:
+            while (payload := await loop.run_in_executor(None, inbox.get)) is not None:
+                if isinstance(payload, tuple):
+                    for service in peers:
+                        service.apply_change(payload[1])
+                    continue
+                await app.update_queue.put(Update.de_json(payload, app.bot))
+        finally:
+            # stop() lets the update fetcher drain everything queued before it.
+            await app.stop()
+            if app.post_stop:
+                await app.post_stop(app)
+    finally:
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+def _worker_main(*args: Any) -> None:
+    # The dispatcher owns shutdown: workers drain their queue after the sentinel.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(_serve_worker(*args))
+
+
+class UpdateDispatcher:
+    def __init__(
+        self,
+        workers: int,
+        app_factory: AppFactory = build_worker_application,
+        factory_args: tuple[Any, ...] = (),
+        singleton_key: int | None = None,
+    ) -> None:
+        self.workers = workers
+        self.ring = ConsistentHashRing(workers)
+        self.app_factory = app_factory
+        self.factory_args = factory_args
+        # Once-per-deployment work runs on the worker that owns this key (the admin),
+        # so it never races with that admin's own commands.
+        self.singleton_worker = self.ring.node_for(singleton_key) if singleton_key is not None else 0
+        self.dispatched = [0] * workers
+        self.restarts = [0] * workers
+        self._context = multiprocessing.get_context("spawn")
+        self._ready = self._context.Queue()
+        self._changes = self._context.Queue()
+        self._queues: list[multiprocessing.Queue] = []
+        self._processes: list[multiprocessing.Process] = []
+        # Guards the queue and process lists: dispatch() runs on the front's event
+        # loop, relaying and supervision on the relay thread.
+        self._lock = threading.Lock()
+        self._relay: threading.Thread | None = None
+        self._stopping = False
+
+    def _spawn(self, worker_id: int) -> tuple[multiprocessing.Queue, multiprocessing.Process]:
+        # A fresh queue every time: a worker killed inside queue.get() leaves the
+        # old queue's read lock held for good.
+        inbox = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                worker_id,
+                worker_id == self.singleton_worker,
+                inbox,
+                self._ready,
+                self._changes,
+                self.app_factory,
+                self.factory_args,
+            ),
+            name=f"amazo-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        return inbox, process
+
+    def start(self, timeout: float = WORKER_READY_TIMEOUT) -> None:
+        for worker_id in range(self.workers):
+            inbox, process = self._spawn(worker_id)
+            self._queues.append(inbox)
+            self._processes.append(process)
+        for _ in range(self.workers):
+            self._ready.get(timeout=timeout)
+        self._relay = threading.Thread(target=self._relay_changes, name="peer-relay", daemon=True)
+        self._relay.start()
+        logging.info("Started %s update workers", self.workers)
+
+    def _ensure_alive(self, worker_id: int) -> None:
+        # Called with the lock held. The replacement is not waited for: updates
+        # queue up on its inbox while it boots. Updates still queued to the dead
+        # worker, or taken by it and not yet handled, are lost.
+        process = self._processes[worker_id]
+        if self._stopping or process.is_alive():
+            return
+        logging.error("Worker %s exited with code %s; restarting it", process.name, process.exitcode)
+        self.restarts[worker_id] += 1
+        self._queues[worker_id], self._processes[worker_id] = self._spawn(worker_id)
+
+    def supervise(self) -> None:
+        with self._lock:
+            for worker_id in range(self.workers):
+                self._ensure_alive(worker_id)
+
+    def _relay_changes(self) -> None:
+        while True:
+            try:
+                message = self._changes.get(timeout=SUPERVISE_INTERVAL)
+            except queue.Empty:
+                self.supervise()
+                continue
+            if message is None:
+                return
+            source, change = message
+            with self._lock:
+                if self._stopping:
+                    continue
+                for worker_id, inbox in enumerate(self._queues):
+                    if worker_id != source:
+                        inbox.put(("change", change))
+
+    def dispatch(self, payload: dict[str, Any]) -> int:
+        worker_id = self.ring.node_for(update_partition_key(payload))
+        with self._lock:
+            self._ensure_alive(worker_id)
+            self._queues[worker_id].put(payload)
+        self.dispatched[worker_id] += 1
+        return worker_id
+
+    def stop(self, timeout: float = 30.0) -> None:
+        with self._lock:
+            self._stopping = True
+        for inbox in self._queues:
+            inbox.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                logging.error("Worker %s did not stop in %.0fs; terminating", process.name, timeout)
+                process.terminate()
+        # The relay keeps draining changes until the workers are gone, so none
+        # of them blocks on exit flushing a full queue.
+        if self._relay is not None:
+            self._changes.put(None)
+            self._relay.join(timeout)
+            self._relay = None
+        self._queues.clear()
+        self._processes.clear()
+
+
+async def poll_updates(dispatcher: UpdateDispatcher, bot: Bot, poll_timeout: int = 30) -> None:
+    # Runs until cancelled.
+    offset = 0
+    await bot.delete_webhook()
+    try:
+        while True:
+            try:
+                updates = await bot.get_updates(
+                    offset=offset, timeout=poll_timeout, allowed_updates=Update.ALL_TYPES
+                )
+            except Conflict:
+                logging.error("Another process is polling with the same BOT_TOKEN. Keep exactly one dispatcher.")
+                await asyncio.sleep(5)
+                continue
+            except TelegramError:
+                logging.warning("getUpdates failed; retrying", exc_info=True)
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                dispatcher.dispatch(update.to_dict())
+                offset = update.update_id + 1
+    except asyncio.CancelledError:
+        # Confirm what was dispatched, so the next front does not fetch it again.
+        if offset:
+            with contextlib.suppress(TelegramError):
+                await bot.get_updates(offset=offset, timeout=0, limit=1)
+        raise
+
+
+async def _serve_until(stopping: asyncio.Event, task: asyncio.Task) -> None:
+    waiter = asyncio.create_task(stopping.wait())
+    await asyncio.wait((waiter, task), return_when=asyncio.FIRST_COMPLETED)
+    waiter.cancel()
+
+
+async def _run_front(dispatcher: UpdateDispatcher, settings: Settings) -> None:
+    from amazo_bot.webhook import create_server, create_web_app, register_webhook
+
+    # SIGTERM (a deploy or container stop) and SIGINT end the front cleanly, so
+    # run_scaled still stops the dispatcher and every worker flushes its state.
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+
+    async with Bot(
+        settings.bot_token, base_url=settings.bot_api_base_url, base_file_url=settings.bot_api_file_url
+    ) as bot:
+        if settings.update_mode == "webhook":
+
+            async def submit(payload: dict[str, Any]) -> None:
+                dispatcher.dispatch(payload)
+
+            web_app = create_web_app(submit, settings.webhook_secret, settings.webhook_path)
+            await register_webhook(bot, settings.webhook_url, settings.webhook_path, settings.webhook_secret)
+            server = create_server(web_app, "0.0.0.0", settings.port, handle_signals=False)
+            serving = asyncio.create_task(server.serve())
+            await _serve_until(stopping, serving)
+            server.should_exit = True
+            await serving
+        else:
+            polling = asyncio.create_task(poll_updates(dispatcher, bot))
+            await _serve_until(stopping, polling)
+            polling.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await polling
+    logging.info("Front stopped; draining workers")
+
+
+def run_scaled(settings: Settings) -> None:
+    configure_logging(settings.log_format)
+    # Until the front installs its handlers, SIGTERM interrupts start-up like Ctrl+C.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    dispatcher = UpdateDispatcher(settings.workers, singleton_key=settings.admin_id)
+    try:
+        dispatcher.start()
+        asyncio.run(_run_front(dispatcher, settings))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from telegram import Bot
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import ContextTypes
+
+from amazo_bot.services.rate_limit import TokenBucket
+from amazo_bot.services.repository import RecipientSegment, Repository
+
+BROADCAST_PREFIX = "AMAZO-WORLD UPDATE\n\n"
+
+
+@dataclass
+class BroadcastCheckpoint:
+    message: str
+    chat_id: int
+    status_message_id: int | None
+    event_id: int | None = None
+    min_referrals: int = 0
+    # Every recipient with user_id <= watermark is finished; done_above holds
+    # finished ids past the watermark (at most one per in-flight sender).
+    watermark: int = 0
+    done_above: list[int] = field(default_factory=list)
+    sent: int = 0
+    failed: int = 0
+
+    @property
+    def segment(self) -> RecipientSegment:
+        return RecipientSegment(event_id=self.event_id, min_referrals=self.min_referrals)
+
+
+def _retry_after_seconds(exc: RetryAfter) -> float:
+    delay = exc.retry_after
+    if isinstance(delay, timedelta):
+        return delay.total_seconds()
+    return float(delay)
+
+
+class BroadcastService:
+    def __init__(
+        self,
+        repository: Repository,
+        checkpoint_path: str,
+        rate_per_second: float = 25.0,
+        concurrency: int = 8,
+        progress_interval: float = 5.0,
+        max_retries: int = 3,
+        checkpoint_interval: float = 1.0,
+        page_size: int = 1000,
+    ) -> None:
+        self.repository = repository
+        self.checkpoint_path = checkpoint_path
+        self.limiter = TokenBucket(rate_per_second)
+        self.concurrency = concurrency
+        self.progress_interval = progress_interval
+        self.max_retries = max_retries
+        self.checkpoint_interval = checkpoint_interval
+        self.page_size = page_size
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def reserve(self) -> bool:
+        # Check and set with no await in between, so of two callers racing through
+        # their own awaits only one gets the broadcast slot.
+        if self._running:
+            return False
+        self._running = True
+        return True
+
+    def release(self) -> None:
+        self._running = False
+
+    def load_checkpoint(self) -> BroadcastCheckpoint | None:
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as fh:
+                return BroadcastCheckpoint(**json.load(fh))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError):
+            logging.exception("Ignoring unreadable broadcast checkpoint at %s", self.checkpoint_path)
+            return None
+
+    def _save_checkpoint(self, checkpoint: BroadcastCheckpoint) -> None:
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(asdict(checkpoint), fh)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self) -> None:
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+    async def start(
+        self,
+        bot: Bot,
+        message: str,
+        chat_id: int,
+        status_message_id: int | None,
+        segment: RecipientSegment | None = None,
+        reserved: bool = False,
+    ) -> BroadcastCheckpoint:
+        # reserved: the caller already holds the slot from reserve().
+        if not reserved and not self.reserve():
+            raise RuntimeError("A broadcast is already running")
+        segment = segment or RecipientSegment()
+        checkpoint = BroadcastCheckpoint(
+            message=message,
+            chat_id=chat_id,
+            status_message_id=status_message_id,
+            event_id=segment.event_id,
+            min_referrals=segment.min_referrals,
+        )
+        return await self._run(bot, checkpoint)
+
+    async def resume(self, bot: Bot) -> BroadcastCheckpoint | None:
+        checkpoint = self.load_checkpoint()
+        if checkpoint is None or not self.reserve():
+            return None
+        logging.info(
+            "Resuming broadcast after user_id=%s (%s sent, %s failed)",
+            checkpoint.watermark,
+            checkpoint.sent,
+            checkpoint.failed,
+        )
+        return await self._run(bot, checkpoint)
+
+    async def resume_job(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        await self.resume(context.bot)
+
+    async def _send_one(self, bot: Bot, user_id: int, text: str) -> bool:
+        for _ in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                await bot.send_message(chat_id=user_id, text=text)
+                return True
+            except RetryAfter as exc:
+                delay = _retry_after_seconds(exc)
+                logging.warning("Broadcast hit flood control; pausing for %.1fs", delay)
+                self.limiter.pause(delay)
+            except Exception:
+                logging.exception("Broadcast failed for user_id=%s", user_id)
+                return False
+        logging.error("Broadcast gave up on user_id=%s after %s retries", user_id, self.max_retries)
+        return False
+
+    async def _report_progress(self, bot: Bot, checkpoint: BroadcastCheckpoint, final: bool = False) -> None:
+        done = checkpoint.sent + checkpoint.failed
+        headline = "Broadcast done." if final else f"Broadcasting... {done} processed"
+        text = f"{headline}\nSent: {checkpoint.sent}\nFailed: {checkpoint.failed}"
+        try:
+            if checkpoint.status_message_id is None:
+                status = await bot.send_message(chat_id=checkpoint.chat_id, text=text)
+                checkpoint.status_message_id = status.message_id
+            else:
+                await bot.edit_message_text(
+                    text=text,
+                    chat_id=checkpoint.chat_id,
+                    message_id=checkpoint.status_message_id,
+                )
+        except TelegramError:
+            logging.warning("Could not update broadcast status message", exc_info=True)
+
+    async def _run(self, bot: Bot, checkpoint: BroadcastCheckpoint) -> BroadcastCheckpoint:
+        text = f"{BROADCAST_PREFIX}{checkpoint.message}"
+        already_done = set(checkpoint.done_above)
+        queue: asyncio.Queue[int | None] = asyncio.Queue(maxsize=self.concurrency * 2)
+        dispatched: deque[int] = deque()
+        finished: set[int] = set(already_done)
+
+        def advance_watermark() -> None:
+            while dispatched and dispatched[0] in finished:
+                checkpoint.watermark = dispatched.popleft()
+            finished.difference_update([uid for uid in finished if uid <= checkpoint.watermark])
+            checkpoint.done_above = sorted(finished)
+
+        async def sender() -> None:
+            while (user_id := await queue.get()) is not None:
+                if await self._send_one(bot, user_id, text):
+                    checkpoint.sent += 1
+                else:
+                    checkpoint.failed += 1
+                finished.add(user_id)
+                advance_watermark()
+
+        async def reporter() -> None:
+            last_progress = time.monotonic()
+            while True:
+                await asyncio.sleep(self.checkpoint_interval)
+                self._save_checkpoint(checkpoint)
+                if time.monotonic() - last_progress >= self.progress_interval:
+                    last_progress = time.monotonic()
+                    await self._report_progress(bot, checkpoint)
+
+        tasks: list[asyncio.Task] = []
+        try:
+            self._save_checkpoint(checkpoint)
+            await self._report_progress(bot, checkpoint)
+            senders = [asyncio.create_task(sender()) for _ in range(self.concurrency)]
+            tasks = [*senders, asyncio.create_task(reporter())]
+            async for chunk in self.repository.iter_recipient_ids(
+                checkpoint.segment,
+                after=checkpoint.watermark,
+                page_size=self.page_size,
+            ):
+                for user_id in chunk:
+                    if user_id in already_done:
+                        continue
+                    dispatched.append(user_id)
+                    await queue.put(user_id)
+            for _ in senders:
+                await queue.put(None)
+            await asyncio.gather(*senders)
+        except BaseException:
+            self._save_checkpoint(checkpoint)
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.release()
+
+        self._clear_checkpoint()
+        await self._report_progress(bot, checkpoint, final=True)
+        return checkpoint
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import logging
+import secrets
+from dataclasses import dataclass
+from typing import Any
+
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.snapshot_service import DrawSnapshot
+
+DEFAULT_WINNERS = 3
+CHUNK_SIZE = 65_536
+
+
+def new_seed() -> int:
+    return secrets.randbits(63)
+
+
+class WeightedSampler:
+    # One-pass weighted sampling without replacement (Efraimidis-Spirakis A-ES):
+    # each ticket holder gets key log(u) / (1 + referrals) and the k largest keys
+    # win. Only the current top k survive between chunks, so memory is bounded by
+    # the chunk size. One uniform is drawn per entry in stream order, so for a
+    # given seed and entry order the result does not depend on how it is chunked.
+
+    def __init__(self, winners: int, seed: int) -> None:
+        import numpy as np
+
+        if winners <= 0:
+            raise ValueError("winners must be positive")
+        self.winners = winners
+        self.seed = seed
+        self.entries = 0
+        self.tickets = 0
+        self._rng = np.random.default_rng(seed)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.float64)
+
+    def add(self, user_ids: Any, referral_counts: Any) -> None:
+        import numpy as np
+
+        ids = np.asarray(user_ids, dtype=np.int64)
+        weights = np.maximum(np.asarray(referral_counts, dtype=np.int64), 0) + 1
+        if not len(ids):
+            return
+        keys = np.log(self._rng.random(len(ids))) / weights
+        self.entries += len(ids)
+        self.tickets += int(weights.sum())
+
+        ids = np.concatenate((self._ids, ids))
+        keys = np.concatenate((self._keys, keys))
+        if len(keys) > self.winners:
+            keep = np.argpartition(keys, -self.winners)[-self.winners :]
+            ids, keys = ids[keep], keys[keep]
+        self._ids, self._keys = ids, keys
+
+    def result(self) -> list[int]:
+        import numpy as np
+
+        order = np.argsort(self._keys)[::-1]
+        return [int(user_id) for user_id in self._ids[order]]
+
+
+def draw_arrays(
+    user_ids: Any,
+    referral_counts: Any,
+    winners: int = DEFAULT_WINNERS,
+    seed: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> WeightedSampler:
+    sampler = WeightedSampler(winners, seed)
+    for start in range(0, len(user_ids), chunk_size):
+        sampler.add(user_ids[start : start + chunk_size], referral_counts[start : start + chunk_size])
+    return sampler
+
+
+@dataclass(frozen=True)
+class DrawResult:
+    event_id: int
+    seed: int
+    entries: int
+    tickets: int
+    winners: list[dict[str, Any]]
+    snapshot_sha256: str | None = None
+
+
+class DrawEngine:
+    def __init__(self, repository: Repository, winners: int = DEFAULT_WINNERS, chunk_size: int = CHUNK_SIZE) -> None:
+        self.repository = repository
+        self.winners = winners
+        self.chunk_size = chunk_size
+
+    async def draw(self, event_id: int, seed: int | None = None) -> DrawResult:
+        seed = new_seed() if seed is None else seed
+        sampler = WeightedSampler(self.winners, seed)
+        # iter_event_entries streams in user_id order, which makes the draw
+        # reproducible from (event, seed) as long as the entries are unchanged.
+        ids: list[int] = []
+        counts: list[int] = []
+        async for rows in self.repository.iter_event_entries(event_id):
+            for row in rows:
+                ids.append(int(row["user_id"]))
+                counts.append(int(row.get("referral_count") or 0))
+            if len(ids) >= self.chunk_size:
+                sampler.add(ids, counts)
+                ids, counts = [], []
+        sampler.add(ids, counts)
+
+        winners = []
+        for user_id in sampler.result():
+            entry = await self.repository.get_user_entry_for_event(user_id=user_id, event_id=event_id)
+            winners.append(entry or {"user_id": user_id})
+        return self._finish(DrawResult(event_id, seed, sampler.entries, sampler.tickets, winners))
+
+    def draw_snapshot(self, snapshot: DrawSnapshot, seed: int | None = None) -> DrawResult:
+        # Same stream order (user_id) as draw(), so a snapshot of unchanged
+        # entries yields the same winners for the same seed, with no queries.
+        seed = new_seed() if seed is None else seed
+        sampler = draw_arrays(snapshot.user_ids, snapshot.referral_counts, self.winners, seed, self.chunk_size)
+        winners = [snapshot.find(user_id) or {"user_id": user_id} for user_id in sampler.result()]
+        return self._finish(
+            DrawResult(snapshot.event_id, seed, sampler.entries, sampler.tickets, winners, snapshot.sha256)
+        )
+
+    def _finish(self, result: DrawResult) -> DrawResult:
+        logging.info(
+            "Draw event_id=%s seed=%s entries=%s tickets=%s snapshot=%s winners=%s",
+            result.event_id,
+            result.seed,
+            result.entries,
+            result.tickets,
+            result.snapshot_sha256,
+            [winner["user_id"] for winner in result.winners],
+        )
+        return result
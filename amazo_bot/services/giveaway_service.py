@@ -1,23 +1,101 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import asyncio
+import time
+from collections.abc import Callable
+from datetime import datetime
 from typing import Any
 
-from amazo_bot.services.supabase_service import SupabaseService
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.resilience import mark_stale, with_staleness
+
+
+def parse_end_date(event: dict[str, Any]) -> datetime:
+    return datetime.fromisoformat(event["end_date"].replace("Z", "+00:00"))
 
 
 class GiveawayService:
-    def __init__(self, supabase_service: SupabaseService) -> None:
-        self.supabase_service = supabase_service
+    # Caches every running event from one query, under one TTL. Events are
+    # kept by id in the order the backend returns them, soonest to end first.
+
+    def __init__(self, repository: Repository, cache_ttl: float = 30.0) -> None:
+        self.repository = repository
+        self.cache_ttl = cache_ttl
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Called for each newly seen active event when it is loaded, e.g. to schedule its expiry.
+        self.on_event_loaded: Callable[[dict[str, Any]], None] | None = None
+        # Called with each change other processes caching the same events must
+        # apply (scale-out workers); they pass it to apply_change().
+        self.on_change: Callable[[dict[str, Any]], None] | None = None
+        self._cached_events: dict[int, dict[str, Any]] = {}
+        self._cached_at: float | None = None
+        # Set when the cached events are a fallback value served during an outage.
+        self._cached_stale_since: float | None = None
+        self._loaded_ids: set[int] = set()
+        self._expired_event_ids: set[int] = set()
+        self._refresh_lock = asyncio.Lock()
+
+    def invalidate_active_event(self) -> None:
+        self._cached_at = None
+        if self.on_change:
+            self.on_change({"op": "events_changed"})
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        if change["op"] == "events_changed":
+            self._cached_at = None
+
+    def _cache_is_fresh(self) -> bool:
+        return self._cached_at is not None and time.monotonic() - self._cached_at < self.cache_ttl
+
+    async def _load_active_events(self) -> None:
+        events, self._cached_stale_since = await with_staleness(self.repository.fetch_active_event_records())
+        self._cached_events = {
+            int(event["id"]): event for event in events if int(event["id"]) not in self._expired_event_ids
+        }
+        self._cached_at = time.monotonic()
+
+        if self.on_event_loaded:
+            for event_id, event in self._cached_events.items():
+                if event_id not in self._loaded_ids:
+                    self.on_event_loaded(event)
+        self._loaded_ids = set(self._cached_events)
+
+    async def refresh_active_events(self) -> list[dict[str, Any]]:
+        async with self._refresh_lock:
+            self.cache_misses += 1
+            await self._load_active_events()
+        mark_stale(self._cached_stale_since)
+        return list(self._cached_events.values())
+
+    async def get_active_events(self) -> list[dict[str, Any]]:
+        if self._cache_is_fresh():
+            self.cache_hits += 1
+            mark_stale(self._cached_stale_since)
+            return list(self._cached_events.values())
+
+        async with self._refresh_lock:
+            if self._cache_is_fresh():
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+                await self._load_active_events()
+        mark_stale(self._cached_stale_since)
+        return list(self._cached_events.values())
 
-    def get_active_event(self) -> dict[str, Any] | None:
-        event = self.supabase_service.fetch_active_event_record()
-        if not event:
-            return None
+    async def refresh_active_event(self) -> dict[str, Any] | None:
+        events = await self.refresh_active_events()
+        return events[0] if events else None
 
-        end_time = datetime.fromisoformat(event["end_date"].replace("Z", "+00:00"))
-        if datetime.now(timezone.utc) > end_time:
-            self.supabase_service.set_event_active_state(int(event["id"]), False)
-            return None
-        return event
+    async def get_active_event(self, event_id: int | None = None) -> dict[str, Any] | None:
+        # The given event if it is running; without an id, the one ending soonest.
+        events = await self.get_active_events()
+        if event_id is None:
+            return events[0] if events else None
+        return self._cached_events.get(event_id)
 
+    async def expire_event(self, event_id: int) -> dict[str, Any] | None:
+        if event_id not in self._expired_event_ids:
+            await self.repository.set_event_active_state(event_id, False)
+            self._expired_event_ids.add(event_id)
+        return await self.refresh_active_event()
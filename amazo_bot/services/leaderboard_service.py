@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.resilience import BackendUnavailable, mark_stale
+
+
+# Referral standings for one event. Users are bucketed by referral count; a
+# Fenwick tree over the counts answers "how many users are ahead of me" in
+# O(log max_count), and the sorted distinct counts let top-K walk down from the leader.
+class LeaderboardIndex:
+    def __init__(self) -> None:
+        self._counts: dict[int, int] = {}
+        self._names: dict[int, str] = {}
+        self._buckets: dict[int, dict[int, None]] = {}
+        self._distinct: list[int] = []
+        self._freq: list[int] = [0] * 64
+        self._tree: list[int] = [0] * 65
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._counts
+
+    def _tree_add(self, count: int, delta: int) -> None:
+        if count >= len(self._freq):
+            self._grow(count)
+        self._freq[count] += delta
+        index = count + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def _grow(self, count: int) -> None:
+        size = len(self._freq)
+        while size <= count:
+            size *= 2
+        self._freq.extend([0] * (size - len(self._freq)))
+        self._tree = [0] * (size + 1)
+        for position, value in enumerate(self._freq, start=1):
+            if not value:
+                continue
+            index = position
+            while index <= size:
+                self._tree[index] += value
+                index += index & -index
+
+    def _at_most(self, count: int) -> int:
+        index = min(count + 1, len(self._tree) - 1)
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def _place(self, user_id: int, count: int) -> None:
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+            bisect.insort(self._distinct, count)
+        bucket[user_id] = None
+        self._counts[user_id] = count
+        self._tree_add(count, 1)
+
+    def _remove(self, user_id: int) -> int:
+        count = self._counts.pop(user_id)
+        bucket = self._buckets[count]
+        del bucket[user_id]
+        if not bucket:
+            del self._buckets[count]
+            del self._distinct[bisect.bisect_left(self._distinct, count)]
+        self._tree_add(count, -1)
+        return count
+
+    def set(self, user_id: int, username: str | None, referral_count: int) -> None:
+        if user_id in self._counts:
+            self._remove(user_id)
+        if username:
+            self._names[user_id] = username
+        self._place(user_id, max(0, int(referral_count)))
+
+    def add_referrals(self, user_id: int, amount: int = 1) -> None:
+        if user_id not in self._counts:
+            return
+        self._place(user_id, self._remove(user_id) + amount)
+
+    def referral_count(self, user_id: int) -> int | None:
+        return self._counts.get(user_id)
+
+    def rank(self, user_id: int) -> int | None:
+        count = self._counts.get(user_id)
+        if count is None:
+            return None
+        return 1 + len(self._counts) - self._at_most(count)
+
+    def top(self, limit: int) -> list[dict[str, Any]]:
+        rows: list[dict[str, Any]] = []
+        for count in reversed(self._distinct):
+            for user_id in self._buckets[count]:
+                rows.append({"user_id": user_id, "username": self._names.get(user_id), "referral_count": count})
+                if len(rows) >= limit:
+                    return rows
+        return rows
+
+    def snapshot(self) -> dict[int, int]:
+        return dict(self._counts)
+
+
+# Reads the rows accepted for an event but not yet in the database (WriteBehindBuffer.pending_entries).
+PendingEntries = Callable[[int], Awaitable[list[dict[str, Any]]]]
+
+
+def _apply(index: LeaderboardIndex, change: dict[str, Any]) -> None:
+    # An entry credits its referrer only when it is new to the index, so the same
+    # entry seen twice (database scan, write buffer, relayed change) counts once.
+    if change["op"] == "entry":
+        if change["user_id"] not in index:
+            index.set(change["user_id"], change["username"], 0)
+            if change.get("referrer_id"):
+                index.add_referrals(change["referrer_id"])
+    elif change["op"] == "referral":
+        index.add_referrals(change["referrer_id"], change["amount"])
+
+
+class LeaderboardService:
+    def __init__(self, repository: Repository, pending_entries: PendingEntries | None = None) -> None:
+        self.repository = repository
+        self.pending_entries = pending_entries
+        self._indexes: dict[int, LeaderboardIndex] = {}
+        self._seed_locks: dict[int, asyncio.Lock] = {}
+        # When each index was last rebuilt from the database, and since when
+        # that has been failing.
+        self._built_at: dict[int, float] = {}
+        self._stale_since: dict[int, float] = {}
+        # One log per build in progress: changes recorded while it scans the
+        # database, replayed onto the new index before it goes live.
+        self._recording: dict[int, list[list[dict[str, Any]]]] = {}
+        # Called with each entry or referral recorded here, for other processes
+        # holding the same indexes (scale-out workers); they pass it to apply_change().
+        self.on_change: Callable[[dict[str, Any]], None] | None = None
+
+    async def _build(self, event_id: int) -> LeaderboardIndex:
+        # The database as of the scan, plus what it does not hold yet: rows still
+        # in the write buffer (read before the scan, so a row flushed meanwhile is
+        # in one or the other) and entries recorded while the scan runs.
+        log: list[dict[str, Any]] = []
+        self._recording.setdefault(event_id, []).append(log)
+        try:
+            pending = await self.pending_entries(event_id) if self.pending_entries else []
+            index = LeaderboardIndex()
+            async for rows in self.repository.iter_event_entries(event_id):
+                for row in rows:
+                    index.set(int(row["user_id"]), row.get("username"), int(row.get("referral_count") or 0))
+            for row in pending:
+                _apply(
+                    index,
+                    {
+                        "op": "entry",
+                        "user_id": int(row["user_id"]),
+                        "username": row.get("username"),
+                        "referrer_id": row.get("referred_by"),
+                    },
+                )
+            for change in log:
+                _apply(index, change)
+        finally:
+            self._recording[event_id].remove(log)
+        return index
+
+    async def get_index(self, event_id: int) -> LeaderboardIndex:
+        index = self._indexes.get(event_id)
+        if index is not None:
+            return index
+        lock = self._seed_locks.setdefault(event_id, asyncio.Lock())
+        async with lock:
+            if event_id not in self._indexes:
+                self._indexes[event_id] = await self._build(event_id)
+                self._built_at[event_id] = time.time()
+                logging.info("Seeded leaderboard for event_id=%s with %s entries", event_id, len(self._indexes[event_id]))
+        return self._indexes[event_id]
+
+    async def top(self, event_id: int, limit: int = 10) -> list[dict[str, Any]]:
+        index = await self.get_index(event_id)
+        mark_stale(self._stale_since.get(event_id))
+        return index.top(limit)
+
+    async def rank(self, event_id: int, user_id: int) -> tuple[int | None, int]:
+        index = await self.get_index(event_id)
+        mark_stale(self._stale_since.get(event_id))
+        return index.rank(user_id), len(index)
+
+    async def referral_count(self, event_id: int, user_id: int) -> int | None:
+        index = await self.get_index(event_id)
+        mark_stale(self._stale_since.get(event_id))
+        return index.referral_count(user_id)
+
+    async def is_registered(self, event_id: int, user_id: int) -> bool:
+        return user_id in await self.get_index(event_id)
+
+    def _record(self, event_id: int, change: dict[str, Any]) -> None:
+        for log in self._recording.get(event_id, ()):
+            log.append(change)
+        index = self._indexes.get(event_id)
+        if index is not None:
+            _apply(index, change)
+
+    def record_entry(self, event_id: int, user_id: int, username: str, referrer_id: int | None = None) -> None:
+        change = {
+            "op": "entry",
+            "event_id": event_id,
+            "user_id": user_id,
+            "username": username,
+            "referrer_id": referrer_id,
+        }
+        self._record(event_id, change)
+        if self.on_change:
+            self.on_change(change)
+
+    def record_referral(self, event_id: int, referrer_id: int, amount: int = 1) -> None:
+        change = {"op": "referral", "event_id": event_id, "referrer_id": referrer_id, "amount": amount}
+        self._record(event_id, change)
+        if self.on_change:
+            self.on_change(change)
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        # Only indexes already held, or being built, are updated; one seeded later reads the database.
+        if change["op"] in ("entry", "referral"):
+            self._record(change["event_id"], change)
+
+    def drop(self, event_id: int) -> None:
+        self._indexes.pop(event_id, None)
+        self._built_at.pop(event_id, None)
+        self._stale_since.pop(event_id, None)
+
+    async def reconcile(self, event_id: int) -> int:
+        # Rebuild and swap; returns how many users had drifted. Entries not yet
+        # written are part of the rebuild, so they are neither lost nor drift.
+        try:
+            fresh = await self._build(event_id)
+        except BackendUnavailable:
+            # Keep serving the last index; readers see it as of its last rebuild.
+            if event_id in self._built_at:
+                self._stale_since.setdefault(event_id, self._built_at[event_id])
+            raise
+        self._built_at[event_id] = time.time()
+        self._stale_since.pop(event_id, None)
+        current = self._indexes.get(event_id)
+        drift = 0
+        if current is not None:
+            before = current.snapshot()
+            after = fresh.snapshot()
+            drift = sum(1 for user_id in before.keys() | after.keys() if before.get(user_id) != after.get(user_id))
+        self._indexes[event_id] = fresh
+        if drift:
+            logging.warning("Leaderboard for event_id=%s drifted on %s users; reconciled", event_id, drift)
+        return drift
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class RecipientSegment:
+    event_id: int | None = None
+    min_referrals: int = 0
+
+
+@dataclass(frozen=True)
+class EventStats:
+    participants: int = 0
+    referrals: int = 0
+
+    @property
+    def tickets(self) -> int:
+        return self.participants + self.referrals
+
+
+class Repository(ABC):
+    # Storage used by the services and handlers. Rows are plain dicts shaped like
+    # the Supabase tables: giveaways (id, name, end_date, is_active) and entries
+    # (user_id, event_id, username, wallet_address, referred_by, referral_count).
+
+    @abstractmethod
+    def close(self) -> None: ...
+
+    @abstractmethod
+    async def fetch_active_event_record(self) -> dict[str, Any] | None: ...
+
+    async def fetch_active_event_records(self) -> list[dict[str, Any]]:
+        # Every running event, soonest to end first. Backends override this;
+        # the fallback only knows about one.
+        event = await self.fetch_active_event_record()
+        return [event] if event else []
+
+    @abstractmethod
+    async def set_event_active_state(self, event_id: int, is_active: bool) -> None: ...
+
+    async def get_active_event(self) -> dict[str, Any] | None:
+        return await self.fetch_active_event_record()
+
+    @abstractmethod
+    async def register_entry(
+        self,
+        user_id: int,
+        event_id: int,
+        username: str,
+        wallet_address: str,
+        referred_by: int | None,
+    ) -> None: ...
+
+    @abstractmethod
+    async def increment_referral(self, referrer_id: int, target_event_id: int) -> None: ...
+
+    @abstractmethod
+    async def register_entries(self, entries: list[dict[str, Any]]) -> int: ...
+
+    @abstractmethod
+    async def get_user_entry_for_event(self, user_id: int, event_id: int) -> dict[str, Any] | None: ...
+
+    @abstractmethod
+    def iter_event_entries(
+        self,
+        event_id: int,
+        page_size: int = 1000,
+        include_wallets: bool = False,
+    ) -> AsyncIterator[list[dict[str, Any]]]: ...
+
+    @abstractmethod
+    async def get_user_history(self, user_id: int) -> list[dict[str, Any]]: ...
+
+    @abstractmethod
+    async def get_event_stats(self, event_id: int) -> EventStats: ...
+
+    @abstractmethod
+    async def deactivate_all_events(self) -> None: ...
+
+    @abstractmethod
+    async def new_event(self, event_id: int, name: str, date_yyyy_mm_dd: str) -> None: ...
+
+    @abstractmethod
+    async def pick_winners(self, target_event_id: int) -> list[dict[str, Any]]: ...
+
+    @abstractmethod
+    def iter_recipient_ids(
+        self,
+        segment: RecipientSegment | None = None,
+        after: int = 0,
+        page_size: int = 1000,
+    ) -> AsyncIterator[list[int]]: ...
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import logging
+import random
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from contextvars import ContextVar
+from typing import Any, TypeVar, cast
+
+import httpx
+
+from amazo_bot.metrics import REGISTRY
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.single_flight import READ_METHODS, call_key
+
+T = TypeVar("T")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Failures that say nothing about the request itself: the backend was slow,
+# unreachable or briefly locked. Anything else (a constraint violation, a bad
+# query) is the caller's problem and is neither retried nor held against the
+# backend.
+TRANSIENT_ERRORS: tuple[type[BaseException], ...] = (
+    TimeoutError,
+    # What asyncio.wait_for raises on Python 3.10; an alias of TimeoutError from 3.11.
+    asyncio.TimeoutError,
+    OSError,
+    httpx.TransportError,
+    sqlite3.OperationalError,
+)
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "amazo_backend_circuit_state", "Storage backend circuit breaker: 0 closed, 1 half-open, 2 open."
+)
+BACKEND_RETRIES = REGISTRY.counter(
+    "amazo_backend_retries_total", "Repository calls retried after a transient failure.", ("method",)
+)
+BACKEND_REJECTED = REGISTRY.counter(
+    "amazo_backend_rejected_total",
+    "Repository calls failed fast, by reason (circuit_open or retry_budget).",
+    ("method", "reason"),
+)
+STALE_READS = REGISTRY.counter(
+    "amazo_backend_stale_reads_total", "Reads answered from the last known value.", ("method",)
+)
+
+# Argument names that identify the event a read is about.
+EVENT_PARAMS = frozenset({"event_id", "target_event_id"})
+
+_stale_since: ContextVar[float | None] = ContextVar("stale_since", default=None)
+
+
+def mark_stale(since: float | None) -> None:
+    # Records, for the current update, that a value shown to the user dates
+    # from `since` (epoch seconds) because the backend could not be reached.
+    if since is None:
+        return
+    current = _stale_since.get()
+    if current is None or since < current:
+        _stale_since.set(since)
+
+
+def stale_since() -> float | None:
+    return _stale_since.get()
+
+
+async def with_staleness(call: Awaitable[T]) -> tuple[T, float | None]:
+    # Runs `call` in a child task so the marks it makes are returned instead of
+    # being merged into the caller's update.
+    async def run() -> tuple[T, float | None]:
+        _stale_since.set(None)
+        result = await call
+        return result, _stale_since.get()
+
+    return await asyncio.ensure_future(run())
+
+
+class BackendUnavailable(Exception):
+    def __init__(self, method: str, reason: str, retry_after: float | None = None) -> None:
+        self.method = method
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{method}: {reason}")
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive transient failures and fails
+    # calls fast for `reset_timeout` seconds. Then a single trial call is let
+    # through (half-open): success closes the circuit, failure re-opens it.
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == OPEN and self.retry_after() == 0:
+            self._set_state(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def release(self) -> None:
+        self._trial_running = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_running = False
+        if self.state != CLOSED:
+            logging.info("Backend circuit closed")
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            logging.warning(
+                "Backend circuit opened after %s consecutive failures; failing fast for %.0fs",
+                self.failures,
+                self.reset_timeout,
+            )
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        CIRCUIT_STATE.set(_STATE_VALUES[state])
+
+
+class RetryBudget:
+    # Retries may add at most `ratio` extra load on top of first attempts,
+    # plus a small reserve so an idle process can still retry. Every first
+    # attempt deposits `ratio` tokens, every retry withdraws one.
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0) -> None:
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = reserve
+
+    def deposit(self) -> None:
+        self.tokens = min(self.tokens + self.ratio, self.reserve + 100 * self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def backoff_delay(attempt: int, base: float = 0.1, cap: float = 2.0) -> float:
+    # Full jitter: spreads retries of a burst of failed calls over the window.
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def event_partition(key: Hashable) -> Hashable:
+    # The event a call_key() is about, or None for reads that span events.
+    for param, value in key[1]:
+        if param in EVENT_PARAMS:
+            return value
+    return None
+
+
+class _ResilientRepository:
+    # Proxy in front of a Repository. Every coroutine call gets a timeout and
+    # goes through the circuit breaker. READ_METHODS are also retried with
+    # jittered backoff while the retry budget allows, and fall back to the
+    # last value they returned for the same arguments (marked stale) when the
+    # backend stays unreachable. Writes are not retried here: the write-behind
+    # buffer already replays them idempotently.
+    #
+    # Last known values are kept in one LRU per event (reads without an event
+    # share another), each holding up to `stale_capacity` results, so the
+    # per-user reads of a busy event never push a quiet event's out.
+
+    def __init__(
+        self,
+        repository: Repository,
+        timeout: float,
+        max_retries: int,
+        breaker: CircuitBreaker,
+        budget: RetryBudget,
+        stale_capacity: int,
+    ) -> None:
+        self._repository = repository
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self.budget = budget
+        self.stale_capacity = stale_capacity
+        self._last_known: dict[Hashable, OrderedDict[Hashable, tuple[float, Any]]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._repository, name)
+        if inspect.iscoroutinefunction(attr):
+            wrapped = self._wrap_read(name, attr) if name in READ_METHODS else self._wrap_call(name, attr)
+        elif inspect.isasyncgenfunction(attr):
+            wrapped = self._wrap_iterator(name, attr)
+        else:
+            return attr
+        setattr(self, name, wrapped)
+        return wrapped
+
+    async def _attempt(self, name: str, call: Callable[[], Awaitable[T]]) -> T:
+        if not self.breaker.allow():
+            BACKEND_REJECTED.inc(method=name, reason="circuit_open")
+            raise BackendUnavailable(name, "circuit open", self.breaker.retry_after())
+        try:
+            result = await asyncio.wait_for(call(), self.timeout)
+        except TRANSIENT_ERRORS:
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            # The backend answered, just not with a result; not a backend fault.
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            # Cancelled: no verdict either way.
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _with_retries(self, name: str, call: Callable[[], Awaitable[T]]) -> T:
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await self._attempt(name, call)
+            except TRANSIENT_ERRORS as exc:
+                if attempt >= self.max_retries:
+                    raise BackendUnavailable(name, f"gave up after {attempt + 1} attempts: {exc!r}") from exc
+                if not self.budget.withdraw():
+                    BACKEND_REJECTED.inc(method=name, reason="retry_budget")
+                    raise BackendUnavailable(name, f"retry budget exhausted: {exc!r}") from exc
+            BACKEND_RETRIES.inc(method=name)
+            await asyncio.sleep(backoff_delay(attempt))
+            attempt += 1
+
+    def _wrap_call(self, name: str, method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(method)
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await self._attempt(name, lambda: method(*args, **kwargs))
+            except TRANSIENT_ERRORS as exc:
+                raise BackendUnavailable(name, repr(exc)) from exc
+
+        return call
+
+    def _wrap_read(self, name: str, method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def read(*args: Any, **kwargs: Any) -> Any:
+            key = call_key(name, signature, args, kwargs)
+            partition = event_partition(key)
+            try:
+                result = await self._with_retries(name, lambda: method(*args, **kwargs))
+            except BackendUnavailable:
+                known = self._last_known.get(partition, {}).get(key)
+                if known is None:
+                    raise
+                STALE_READS.inc(method=name)
+                mark_stale(known[0])
+                return known[1]
+            self._remember(partition, key, result)
+            return result
+
+        return read
+
+    def _remember(self, partition: Hashable, key: Hashable, value: Any) -> None:
+        known = self._last_known.setdefault(partition, OrderedDict())
+        known[key] = (time.time(), value)
+        known.move_to_end(key)
+        while len(known) > self.stale_capacity:
+            known.popitem(last=False)
+
+    def _wrap_iterator(self, name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        async def pages(*args: Any, **kwargs: Any) -> Any:
+            inner = method(*args, **kwargs)
+            try:
+                while True:
+                    try:
+                        page = await self._attempt(name, inner.__anext__)
+                    except StopAsyncIteration:
+                        return
+                    except TRANSIENT_ERRORS as exc:
+                        raise BackendUnavailable(name, repr(exc)) from exc
+                    yield page
+            finally:
+                await inner.aclose()
+
+        return pages
+
+
+def make_resilient(
+    repository: Repository,
+    timeout: float = 10.0,
+    max_retries: int = 2,
+    breaker: CircuitBreaker | None = None,
+    budget: RetryBudget | None = None,
+    stale_capacity: int = 10_000,
+) -> Repository:
+    return cast(
+        Repository,
+        _ResilientRepository(
+            repository,
+            timeout=timeout,
+            max_retries=max_retries,
+            breaker=breaker or CircuitBreaker(),
+            budget=budget or RetryBudget(),
+            stale_capacity=stale_capacity,
+        ),
+    )
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar, cast
+
+from amazo_bot.metrics import REGISTRY
+from amazo_bot.services.repository import Repository
+
+T = TypeVar("T")
+
+# Repository reads that are safe to share between callers.
+READ_METHODS = frozenset(
+    {
+        "fetch_active_event_record",
+        "fetch_active_event_records",
+        "get_active_event",
+        "get_user_entry_for_event",
+        "get_user_history",
+        "get_event_stats",
+    }
+)
+# Writes that can change what those reads return.
+WRITE_METHODS = frozenset(
+    {
+        "set_event_active_state",
+        "register_entry",
+        "increment_referral",
+        "register_entries",
+        "deactivate_all_events",
+        "new_event",
+    }
+)
+
+COALESCED_READS = REGISTRY.counter(
+    "amazo_repository_coalesced_total",
+    "Repository reads answered without a backend call, by method and source (inflight or cache).",
+    ("method", "source"),
+)
+
+
+def call_key(name: str, signature: inspect.Signature, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable:
+    # The same call spelled with positional or keyword arguments gets one key.
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    items: list[tuple[str, Any]] = []
+    for param, value in bound.arguments.items():
+        if signature.parameters[param].kind is inspect.Parameter.VAR_KEYWORD:
+            items.extend(sorted(value.items()))
+        else:
+            items.append((param, value))
+    return (name, tuple(items))
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one in-flight task, and its
+    # result is reused for `ttl` seconds. Failures are shared with the callers
+    # already waiting but never cached. Each waiter awaits a shield, so one
+    # caller being cancelled does not cancel the call for the others.
+
+    def __init__(self, ttl: float = 1.0) -> None:
+        self.ttl = ttl
+        self.calls = 0
+        self.shared = 0
+        self.cached = 0
+        self._inflight: dict[Hashable, asyncio.Task[Any]] = {}
+        self._results: dict[Hashable, tuple[float, Any]] = {}
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        # Results of flights that started before now are not stored either.
+        self._generation += 1
+        self._results.clear()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> tuple[T, str]:
+        cached = self._results.get(key)
+        if cached is not None:
+            if time.monotonic() < cached[0]:
+                self.cached += 1
+                return cached[1], "cache"
+            del self._results[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            return await asyncio.shield(task), "inflight"
+
+        self.calls += 1
+        task = asyncio.ensure_future(call())
+        self._inflight[key] = task
+        task.add_done_callback(functools.partial(self._finish, key, self._generation))
+        return await asyncio.shield(task), "backend"
+
+    def _finish(self, key: Hashable, generation: int, task: asyncio.Task[Any]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if self.ttl > 0 and generation == self._generation and not task.cancelled() and task.exception() is None:
+            self._results[key] = (time.monotonic() + self.ttl, task.result())
+
+
+class _CoalescingRepository:
+    # Proxy in front of a Repository: READ_METHODS go through SingleFlight,
+    # keyed by method name and normalized arguments; WRITE_METHODS drop cached
+    # results once they complete. Callers share result objects, so they must
+    # treat them as read-only.
+
+    def __init__(self, repository: Repository, flight: SingleFlight) -> None:
+        self._repository = repository
+        self.single_flight = flight
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._repository, name)
+        if name in READ_METHODS:
+            wrapped = self._wrap_read(name, attr)
+        elif name in WRITE_METHODS:
+            wrapped = self._wrap_write(attr)
+        else:
+            return attr
+        setattr(self, name, wrapped)
+        return wrapped
+
+    def _wrap_read(self, name: str, method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def read(*args: Any, **kwargs: Any) -> Any:
+            key = call_key(name, signature, args, kwargs)
+            result, source = await self.single_flight.do(key, lambda: method(*args, **kwargs))
+            if source != "backend":
+                COALESCED_READS.inc(method=name, source=source)
+            return result
+
+        return read
+
+    def _wrap_write(self, method: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(method)
+        async def write(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.single_flight.invalidate()
+
+        return write
+
+
+def coalesce_reads(repository: Repository, ttl: float = 1.0) -> Repository:
+    return cast(Repository, _CoalescingRepository(repository, SingleFlight(ttl)))
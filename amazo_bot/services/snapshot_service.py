@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+from amazo_bot.services.repository import Repository
+
+if TYPE_CHECKING:
+    # Imported where used: NumPy costs ~0.1 s at boot and only snapshots and draws need it.
+    import numpy as np
+
+MAGIC = b"AMZSNAP1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+COPY_BLOCK = 1 << 20
+
+# Fixed-width columns, stored back to back in user_id order. Wallets are
+# validated to at most 50 characters and Telegram usernames to 32.
+COLUMNS: tuple[tuple[str, str], ...] = (
+    ("user_id", "<i8"),
+    ("referral_count", "<i8"),
+    ("wallet_address", "S64"),
+    ("username", "S32"),
+)
+
+
+def _padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+def snapshot_file_name(event_id: int, sha256: str) -> str:
+    return f"event_{event_id}_{sha256[:16]}.snap"
+
+
+class SnapshotIntegrityError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SnapshotStats:
+    entries: int
+    referrals: int
+    max_referrals: int
+
+    @property
+    def tickets(self) -> int:
+        return self.entries + self.referrals
+
+
+class DrawSnapshot:
+    # Read-only view of a snapshot file. Columns are np.memmap slices of the
+    # file, so opening costs one header read and draws page data in on demand.
+
+    def __init__(self, path: str | Path) -> None:
+        import numpy as np
+
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a draw snapshot")
+            header_size = int.from_bytes(fh.read(8), "little")
+            header = json.loads(fh.read(header_size))
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+
+        self.event_id: int = header["event_id"]
+        self.created_at: str = header["created_at"]
+        self.entries: int = header["entries"]
+        self.sha256: str = header["sha256"]
+        self._data_offset = len(MAGIC) + 8 + header_size
+        self._data_size: int = header["data_size"]
+        self.columns: dict[str, np.ndarray] = {}
+        for column in header["columns"]:
+            dtype = np.dtype(column["dtype"])
+            if not self.entries:
+                # mmap cannot map zero bytes.
+                self.columns[column["name"]] = np.empty(0, dtype=dtype)
+                continue
+            self.columns[column["name"]] = np.memmap(
+                self.path,
+                dtype=dtype,
+                mode="r",
+                offset=self._data_offset + column["offset"],
+                shape=(self.entries,),
+            )
+
+    def age(self) -> timedelta:
+        return datetime.now(timezone.utc) - datetime.fromisoformat(self.created_at)
+
+    @property
+    def user_ids(self) -> np.ndarray:
+        return self.columns["user_id"]
+
+    @property
+    def referral_counts(self) -> np.ndarray:
+        return self.columns["referral_count"]
+
+    def row(self, index: int) -> dict[str, Any]:
+        return {
+            "user_id": int(self.user_ids[index]),
+            "referral_count": int(self.referral_counts[index]),
+            "wallet_address": self.columns["wallet_address"][index].decode(errors="replace"),
+            "username": self.columns["username"][index].decode(errors="replace"),
+        }
+
+    def find(self, user_id: int) -> dict[str, Any] | None:
+        import numpy as np
+
+        index = int(np.searchsorted(self.user_ids, user_id))
+        if index < self.entries and self.user_ids[index] == user_id:
+            return self.row(index)
+        return None
+
+    def stats(self) -> SnapshotStats:
+        counts = self.referral_counts
+        return SnapshotStats(
+            entries=self.entries,
+            referrals=int(counts.sum()) if self.entries else 0,
+            max_referrals=int(counts.max()) if self.entries else 0,
+        )
+
+    def verify(self) -> bool:
+        digest = hashlib.sha256()
+        with open(self.path, "rb") as fh:
+            fh.seek(self._data_offset)
+            remaining = self._data_size
+            while remaining:
+                block = fh.read(min(COPY_BLOCK, remaining))
+                if not block:
+                    return False
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest() == self.sha256
+
+
+class _ColumnSpool:
+    # Streams one column to a temporary file while rows arrive, so building a
+    # snapshot never holds the whole event in memory.
+
+    def __init__(self, name: str, dtype: str, directory: Path) -> None:
+        import numpy as np
+
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.file: BinaryIO = tempfile.TemporaryFile(dir=directory)
+        self.size = 0
+
+    def write(self, values: list[Any]) -> None:
+        import numpy as np
+
+        data = np.asarray(values, dtype=self.dtype).tobytes()
+        self.file.write(data)
+        self.size += len(data)
+
+
+def _data_blocks(spool: _ColumnSpool) -> Iterator[bytes]:
+    spool.file.seek(0)
+    while block := spool.file.read(COPY_BLOCK):
+        yield block
+    if pad := _padding(spool.size):
+        yield b"\0" * pad
+
+
+def _text(value: Any, width: int) -> bytes:
+    return str(value or "").encode("utf-8")[:width]
+
+
+class SnapshotService:
+    def __init__(self, repository: Repository, directory: str, page_size: int = 1000) -> None:
+        self.repository = repository
+        self.directory = Path(directory)
+        self.page_size = page_size
+
+    async def create(self, event_id: int) -> DrawSnapshot:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        spools = [_ColumnSpool(name, dtype, self.directory) for name, dtype in COLUMNS]
+        try:
+            entries = 0
+            async for rows in self.repository.iter_event_entries(
+                event_id, page_size=self.page_size, include_wallets=True
+            ):
+                user_ids, counts, wallets, names = [], [], [], []
+                for row in rows:
+                    user_ids.append(int(row["user_id"]))
+                    counts.append(int(row.get("referral_count") or 0))
+                    wallets.append(_text(row.get("wallet_address"), 64))
+                    names.append(_text(row.get("username"), 32))
+                for spool, values in zip(spools, (user_ids, counts, wallets, names)):
+                    spool.write(values)
+                entries += len(rows)
+            path = await asyncio.to_thread(self._assemble, event_id, entries, spools)
+        finally:
+            for spool in spools:
+                spool.file.close()
+        return DrawSnapshot(path)
+
+    def _assemble(self, event_id: int, entries: int, spools: list[_ColumnSpool]) -> Path:
+        columns = []
+        offset = 0
+        for spool in spools:
+            columns.append({"name": spool.name, "dtype": spool.dtype.str, "offset": offset})
+            offset += spool.size + _padding(spool.size)
+
+        # The content hash covers exactly the bytes after the header, so it can be
+        # re-checked from the file alone (DrawSnapshot.verify).
+        digest = hashlib.sha256()
+        for spool in spools:
+            for block in _data_blocks(spool):
+                digest.update(block)
+        sha256 = digest.hexdigest()
+
+        header = {
+            "version": FORMAT_VERSION,
+            "event_id": event_id,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "entries": entries,
+            "sha256": sha256,
+            "data_size": offset,
+            "columns": columns,
+        }
+        header_bytes = json.dumps(header).encode()
+        # Pad the header so the column data starts on an aligned offset.
+        header_bytes += b" " * _padding(len(MAGIC) + 8 + len(header_bytes))
+
+        final_path = self.directory / snapshot_file_name(event_id, sha256)
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as out:
+            try:
+                out.write(MAGIC)
+                out.write(len(header_bytes).to_bytes(8, "little"))
+                out.write(header_bytes)
+                for spool in spools:
+                    for block in _data_blocks(spool):
+                        out.write(block)
+                out.flush()
+                os.fsync(out.fileno())
+            except BaseException:
+                os.unlink(out.name)
+                raise
+        os.replace(out.name, final_path)
+        return final_path
+
+    def latest(self, event_id: int) -> DrawSnapshot | None:
+        # Re-hashes the whole file before it is used, so call it off the event loop.
+        # A damaged newest snapshot is an error: drawing from an older one or from
+        # live entries instead would silently change the winners.
+        candidates = sorted(
+            self.directory.glob(f"event_{event_id}_*.snap"),
+            key=lambda path: path.stat().st_mtime_ns,
+        )
+        if not candidates:
+            return None
+        try:
+            snapshot = DrawSnapshot(candidates[-1])
+            intact = snapshot.verify()
+        except (KeyError, ValueError):
+            intact = False
+        if not intact:
+            logging.error("Snapshot %s failed its SHA-256 check", candidates[-1])
+            raise SnapshotIntegrityError(f"{candidates[-1]} failed its SHA-256 check")
+        return snapshot
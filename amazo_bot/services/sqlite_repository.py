@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import sqlite3
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from amazo_bot.services.repository import EventStats, RecipientSegment, Repository
+
+T = TypeVar("T")
+
+# Matches the pick_winners_by_event RPC used with Supabase.
+WINNER_COUNT = 3
+
+# Same tables as the Supabase project, plus the event_stats triggers from
+# docs/sql/event_stats.sql, so both backends answer every query identically.
+SCHEMA = """
+create table if not exists giveaways (
+    id integer primary key,
+    name text not null,
+    end_date text not null,
+    is_active integer not null default 0
+);
+create index if not exists giveaways_active on giveaways (is_active);
+
+create table if not exists entries (
+    id integer primary key autoincrement,
+    user_id integer not null,
+    event_id integer not null references giveaways (id),
+    username text,
+    wallet_address text,
+    referred_by integer,
+    referral_count integer not null default 0,
+    created_at text not null default current_timestamp,
+    unique (user_id, event_id)
+);
+create index if not exists entries_event_user on entries (event_id, user_id);
+create index if not exists entries_user on entries (user_id);
+
+create table if not exists event_stats (
+    event_id integer primary key,
+    participants integer not null default 0,
+    referrals integer not null default 0
+);
+
+create trigger if not exists entries_stats_insert after insert on entries begin
+    insert into event_stats (event_id, participants, referrals) values (new.event_id, 1, new.referral_count)
+    on conflict (event_id) do update set
+        participants = participants + 1,
+        referrals = referrals + new.referral_count;
+end;
+create trigger if not exists entries_stats_update after update of referral_count on entries begin
+    update event_stats set referrals = referrals + new.referral_count - old.referral_count
+    where event_id = new.event_id;
+end;
+create trigger if not exists entries_stats_delete after delete on entries begin
+    update event_stats set participants = participants - 1, referrals = referrals - old.referral_count
+    where event_id = old.event_id;
+end;
+"""
+
+ENTRY_COLUMNS = ("user_id", "event_id", "username", "wallet_address", "referred_by")
+
+
+def _in_transaction(fn: Callable[[sqlite3.Connection], T]) -> Callable[[sqlite3.Connection], T]:
+    def run(conn: sqlite3.Connection) -> T:
+        conn.execute("begin immediate")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("rollback")
+            raise
+        conn.execute("commit")
+        return result
+
+    return run
+
+
+def _event_row(row: sqlite3.Row) -> dict[str, Any]:
+    event = dict(row)
+    event["is_active"] = bool(event["is_active"])
+    return event
+
+
+class SQLiteRepository(Repository):
+    def __init__(self, path: str) -> None:
+        # One connection, one thread: sqlite3 serializes writers anyway, and the
+        # dedicated thread keeps the event loop free while queries run.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode = wal")
+        self._conn.execute("pragma synchronous = normal")
+        self._conn.execute("pragma foreign_keys = on")
+        self._conn.executescript(SCHEMA)
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, self._conn)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._conn.close()
+
+    async def fetch_active_event_record(self) -> dict[str, Any] | None:
+        row = await self._run(
+            lambda conn: conn.execute("select * from giveaways where is_active = 1 limit 1").fetchone()
+        )
+        return _event_row(row) if row else None
+
+    async def fetch_active_event_records(self) -> list[dict[str, Any]]:
+        rows = await self._run(
+            lambda conn: conn.execute("select * from giveaways where is_active = 1 order by end_date, id").fetchall()
+        )
+        return [_event_row(row) for row in rows]
+
+    async def set_event_active_state(self, event_id: int, is_active: bool) -> None:
+        await self._run(
+            lambda conn: conn.execute("update giveaways set is_active = ? where id = ?", (int(is_active), event_id))
+        )
+
+    async def register_entry(
+        self,
+        user_id: int,
+        event_id: int,
+        username: str,
+        wallet_address: str,
+        referred_by: int | None,
+    ) -> None:
+        await self._run(
+            lambda conn: conn.execute(
+                "insert into entries (user_id, event_id, username, wallet_address, referred_by) values (?, ?, ?, ?, ?)",
+                (user_id, event_id, username, wallet_address, referred_by),
+            )
+        )
+
+    async def increment_referral(self, referrer_id: int, target_event_id: int) -> None:
+        await self._run(
+            lambda conn: conn.execute(
+                "update entries set referral_count = referral_count + 1 where user_id = ? and event_id = ?",
+                (referrer_id, target_event_id),
+            )
+        )
+
+    async def register_entries(self, entries: list[dict[str, Any]]) -> int:
+        # Mirrors docs/sql/register_entries.sql: skip existing (user_id, event_id),
+        # then credit each referrer once with +N for the rows actually inserted.
+        def register(conn: sqlite3.Connection) -> int:
+            credits: dict[tuple[int, int], int] = {}
+            inserted = 0
+            for entry in entries:
+                cursor = conn.execute(
+                    "insert into entries (user_id, event_id, username, wallet_address, referred_by) "
+                    "values (?, ?, ?, ?, ?) on conflict (user_id, event_id) do nothing",
+                    tuple(entry.get(column) for column in ENTRY_COLUMNS),
+                )
+                if cursor.rowcount:
+                    inserted += 1
+                    if entry.get("referred_by"):
+                        key = (int(entry["referred_by"]), int(entry["event_id"]))
+                        credits[key] = credits.get(key, 0) + 1
+            conn.executemany(
+                "update entries set referral_count = referral_count + ? where user_id = ? and event_id = ?",
+                [(count, user_id, event_id) for (user_id, event_id), count in credits.items()],
+            )
+            return inserted
+
+        return await self._run(_in_transaction(register))
+
+    async def get_user_entry_for_event(self, user_id: int, event_id: int) -> dict[str, Any] | None:
+        row = await self._run(
+            lambda conn: conn.execute(
+                "select * from entries where user_id = ? and event_id = ?", (user_id, event_id)
+            ).fetchone()
+        )
+        return dict(row) if row else None
+
+    async def iter_event_entries(
+        self,
+        event_id: int,
+        page_size: int = 1000,
+        include_wallets: bool = False,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        columns = "user_id, username, referral_count" + (", wallet_address" if include_wallets else "")
+        cursor = 0
+        while True:
+            rows = await self._run(
+                lambda conn: conn.execute(
+                    f"select {columns} from entries "
+                    "where event_id = ? and user_id > ? order by user_id limit ?",
+                    (event_id, cursor, page_size),
+                ).fetchall()
+            )
+            if not rows:
+                return
+            cursor = int(rows[-1]["user_id"])
+            yield [dict(row) for row in rows]
+
+    async def get_user_history(self, user_id: int) -> list[dict[str, Any]]:
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "select e.referral_count, g.name, g.is_active from entries e "
+                "join giveaways g on g.id = e.event_id where e.user_id = ? order by e.event_id",
+                (user_id,),
+            ).fetchall()
+        )
+        return [
+            {
+                "referral_count": row["referral_count"],
+                "giveaways": {"name": row["name"], "is_active": bool(row["is_active"])},
+            }
+            for row in rows
+        ]
+
+    async def get_event_stats(self, event_id: int) -> EventStats:
+        row = await self._run(
+            lambda conn: conn.execute(
+                "select participants, referrals from event_stats where event_id = ?", (event_id,)
+            ).fetchone()
+        )
+        if not row:
+            return EventStats()
+        return EventStats(participants=int(row["participants"]), referrals=int(row["referrals"]))
+
+    async def deactivate_all_events(self) -> None:
+        await self._run(lambda conn: conn.execute("update giveaways set is_active = 0 where is_active = 1"))
+
+    async def new_event(self, event_id: int, name: str, date_yyyy_mm_dd: str) -> None:
+        await self._run(
+            lambda conn: conn.execute(
+                "insert into giveaways (id, name, end_date, is_active) values (?, ?, ?, 1)",
+                (event_id, name, f"{date_yyyy_mm_dd}T23:59:59Z"),
+            )
+        )
+
+    async def pick_winners(self, target_event_id: int) -> list[dict[str, Any]]:
+        rows = await self._run(
+            lambda conn: conn.execute(
+                "select user_id, username, wallet_address, referral_count from entries where event_id = ?",
+                (target_event_id,),
+            ).fetchall()
+        )
+        # Weighted draw without replacement, one ticket per entry plus one per
+        # referral: keep the WINNER_COUNT largest u ** (1 / tickets) keys.
+        rng = random.SystemRandom()
+        keyed = [(rng.random() ** (1.0 / (int(row["referral_count"]) + 1)), dict(row)) for row in rows]
+        keyed.sort(key=lambda pair: pair[0], reverse=True)
+        return [row for _, row in keyed[:WINNER_COUNT]]
+
+    async def iter_recipient_ids(
+        self,
+        segment: RecipientSegment | None = None,
+        after: int = 0,
+        page_size: int = 1000,
+    ) -> AsyncIterator[list[int]]:
+        segment = segment or RecipientSegment()
+        sql = "select distinct user_id from entries where user_id > ?"
+        filters: list[Any] = []
+        if segment.event_id is not None:
+            sql += " and event_id = ?"
+            filters.append(segment.event_id)
+        if segment.min_referrals > 0:
+            sql += " and referral_count >= ?"
+            filters.append(segment.min_referrals)
+        sql += " order by user_id limit ?"
+
+        cursor = after
+        while True:
+            rows = await self._run(
+                lambda conn: conn.execute(sql, (cursor, *filters, page_size)).fetchall()
+            )
+            if not rows:
+                return
+            chunk = [int(row["user_id"]) for row in rows]
+            cursor = chunk[-1]
+            yield chunk
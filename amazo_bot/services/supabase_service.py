@@ -1,27 +1,70 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any
 
-from supabase import Client, create_client
+from amazo_bot.services.repository import EventStats, RecipientSegment, Repository
 
+if TYPE_CHECKING:
+    from supabase import Client
 
-class SupabaseService:
-    def __init__(self, supabase_url: str, supabase_key: str) -> None:
-        self.client: Client = create_client(supabase_url, supabase_key)
 
-    def fetch_active_event_record(self) -> dict[str, Any] | None:
-        res = self.client.table("giveaways").select("*").eq("is_active", True).execute()
+def create_client(supabase_url: str, supabase_key: str) -> Client:
+    # The supabase package takes ~0.3 s to import; it is imported here, on a
+    # pool thread, instead of on the boot path.
+    import supabase
+
+    return supabase.create_client(supabase_url, supabase_key)
+
+
+class SupabaseService(Repository):
+    def __init__(self, supabase_url: str, supabase_key: str, max_workers: int = 8) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+        self._url = supabase_url
+        self._key = supabase_key
+        self._client: Future[Client] | None = None
+
+    def _connect(self) -> Future[Client]:
+        # The client is built on the pool by the first query, which at boot runs
+        # while the bot waits on its first Bot API calls, not before them.
+        if self._client is None:
+            self._client = self._executor.submit(create_client, self._url, self._key)
+        return self._client
+
+    @property
+    def client(self) -> Client:
+        return self._connect().result()
+
+    async def _execute(self, build: Callable[[Client], Any]) -> Any:
+        # Each execute() is a blocking HTTP round trip; keep it off the event loop.
+        # The query is built on the pool too, where waiting for the client is fine.
+        client = self._connect()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: build(client.result()).execute())
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def fetch_active_event_record(self) -> dict[str, Any] | None:
+        res = await self._execute(lambda client: client.table("giveaways").select("*").eq("is_active", True))
         if not res.data:
             return None
         return res.data[0]
 
-    def set_event_active_state(self, event_id: int, is_active: bool) -> None:
-        self.client.table("giveaways").update({"is_active": is_active}).eq("id", event_id).execute()
+    async def fetch_active_event_records(self) -> list[dict[str, Any]]:
+        res = await self._execute(
+            lambda client: client.table("giveaways").select("*").eq("is_active", True).order("end_date").order("id")
+        )
+        return res.data or []
 
-    def get_active_event(self) -> dict[str, Any] | None:
-        return self.fetch_active_event_record()
+    async def set_event_active_state(self, event_id: int, is_active: bool) -> None:
+        await self._execute(
+            lambda client: client.table("giveaways").update({"is_active": is_active}).eq("id", event_id)
+        )
 
-    def register_entry(
+    async def register_entry(
         self,
         user_id: int,
         event_id: int,
@@ -36,77 +79,126 @@ class SupabaseService:
             "wallet_address": wallet_address,
             "referred_by": referred_by,
         }
-        self.client.table("entries").insert(payload).execute()
+        await self._execute(lambda client: client.table("entries").insert(payload))
+
+    async def increment_referral(self, referrer_id: int, target_event_id: int) -> None:
+        await self._execute(
+            lambda client: client.rpc(
+                "increment_referral",
+                {"row_id": referrer_id, "target_event_id": target_event_id},
+            )
+        )
 
-    def increment_referral(self, referrer_id: int, target_event_id: int) -> None:
-        self.client.rpc(
-            "increment_referral",
-            {"row_id": referrer_id, "target_event_id": target_event_id},
-        ).execute()
+    async def register_entries(self, entries: list[dict[str, Any]]) -> int:
+        res = await self._execute(lambda client: client.rpc("register_entries", {"entries": entries}))
+        return int(res.data or 0)
 
-    def get_user_entry_for_event(self, user_id: int, event_id: int) -> dict[str, Any] | None:
-        res = (
-            self.client.table("entries")
+    async def get_user_entry_for_event(self, user_id: int, event_id: int) -> dict[str, Any] | None:
+        res = await self._execute(
+            lambda client: client.table("entries")
             .select("*")
             .eq("user_id", user_id)
             .eq("event_id", event_id)
-            .execute()
         )
         if not res.data:
             return None
         return res.data[0]
 
-    def get_leaderboard(self, event_id: int, limit: int = 10) -> list[dict[str, Any]]:
-        res = (
-            self.client.table("entries")
-            .select("username, referral_count")
-            .eq("event_id", event_id)
-            .order("referral_count", desc=True)
-            .limit(limit)
-            .execute()
-        )
-        return res.data or []
-
-    def get_user_history(self, user_id: int) -> list[dict[str, Any]]:
-        res = (
-            self.client.table("entries")
+    async def iter_event_entries(
+        self,
+        event_id: int,
+        page_size: int = 1000,
+        include_wallets: bool = False,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        columns = "user_id, username, referral_count" + (", wallet_address" if include_wallets else "")
+        cursor = 0
+        while True:
+            res = await self._execute(
+                lambda client: client.table("entries")
+                .select(columns)
+                .eq("event_id", event_id)
+                .gt("user_id", cursor)
+                .order("user_id")
+                .limit(page_size)
+            )
+            rows = res.data or []
+            if not rows:
+                return
+            cursor = int(rows[-1]["user_id"])
+            yield rows
+
+    async def get_user_history(self, user_id: int) -> list[dict[str, Any]]:
+        res = await self._execute(
+            lambda client: client.table("entries")
             .select("referral_count, giveaways(name, is_active)")
             .eq("user_id", user_id)
-            .execute()
         )
         return res.data or []
 
-    def get_event_participant_count(self, event_id: int) -> int:
-        res = (
-            self.client.table("entries")
-            .select("user_id", count="exact")
-            .eq("event_id", event_id)
-            .execute()
+    async def get_event_stats(self, event_id: int) -> EventStats:
+        res = await self._execute(lambda client: client.rpc("get_event_stats", {"target_event_id": event_id}))
+        rows = res.data or []
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not rows:
+            return EventStats()
+        return EventStats(
+            participants=int(rows[0].get("participants") or 0),
+            referrals=int(rows[0].get("referrals") or 0),
         )
-        return int(res.count or 0)
-
-    def get_event_referral_total(self, event_id: int) -> int:
-        res = self.client.table("entries").select("referral_count").eq("event_id", event_id).execute()
-        return sum(item.get("referral_count", 0) for item in (res.data or []))
-
-    def deactivate_all_events(self) -> None:
-        self.client.table("giveaways").update({"is_active": False}).eq("is_active", True).execute()
-
-    def new_event(self, event_id: int, name: str, date_yyyy_mm_dd: str) -> None:
-        self.client.table("giveaways").insert(
-            {
-                "id": event_id,
-                "name": name,
-                "end_date": f"{date_yyyy_mm_dd}T23:59:59Z",
-                "is_active": True,
-            }
-        ).execute()
-
-    def pick_winners(self, target_event_id: int) -> list[dict[str, Any]]:
-        res = self.client.rpc("pick_winners_by_event", {"target_event_id": target_event_id}).execute()
-        return res.data or []
 
-    def get_all_user_ids(self) -> set[int]:
-        res = self.client.table("entries").select("user_id").execute()
-        return {int(row["user_id"]) for row in (res.data or [])}
+    async def deactivate_all_events(self) -> None:
+        await self._execute(
+            lambda client: client.table("giveaways").update({"is_active": False}).eq("is_active", True)
+        )
 
+    async def new_event(self, event_id: int, name: str, date_yyyy_mm_dd: str) -> None:
+        await self._execute(
+            lambda client: client.table("giveaways").insert(
+                {
+                    "id": event_id,
+                    "name": name,
+                    "end_date": f"{date_yyyy_mm_dd}T23:59:59Z",
+                    "is_active": True,
+                }
+            )
+        )
+
+    async def pick_winners(self, target_event_id: int) -> list[dict[str, Any]]:
+        res = await self._execute(
+            lambda client: client.rpc("pick_winners_by_event", {"target_event_id": target_event_id})
+        )
+        return res.data or []
+
+    async def iter_recipient_ids(
+        self,
+        segment: RecipientSegment | None = None,
+        after: int = 0,
+        page_size: int = 1000,
+    ) -> AsyncIterator[list[int]]:
+        # Keyset pagination on user_id: rows arrive ordered, so a user who joined
+        # several events is skipped by the strictly-greater cursor.
+        segment = segment or RecipientSegment()
+        cursor = after
+
+        def page(client: Client) -> Any:
+            query = client.table("entries").select("user_id").gt("user_id", cursor)
+            if segment.event_id is not None:
+                query = query.eq("event_id", segment.event_id)
+            if segment.min_referrals > 0:
+                query = query.gte("referral_count", segment.min_referrals)
+            return query.order("user_id").limit(page_size)
+
+        while True:
+            res = await self._execute(page)
+            rows = res.data or []
+            if not rows:
+                return
+
+            chunk: list[int] = []
+            for row in rows:
+                user_id = int(row["user_id"])
+                if user_id > cursor:
+                    chunk.append(user_id)
+                    cursor = user_id
+            yield chunk
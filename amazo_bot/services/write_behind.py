@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.resilience import TRANSIENT_ERRORS, BackendUnavailable
+
+
+@dataclass
+class WriteBehindStats:
+    queue_depth: int = 0
+    spilled_entries: int = 0
+    rejected_entries: int = 0
+    flushes: int = 0
+    entries_flushed: int = 0
+    referrals_flushed: int = 0
+    referrer_updates: int = 0
+    last_batch_size: int = 0
+    last_flush_ms: float = 0.0
+    max_flush_ms: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.entries_flushed / self.flushes if self.flushes else 0.0
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        repository: Repository,
+        spill_path: str,
+        flush_interval: float = 0.5,
+        max_batch: int = 500,
+    ) -> None:
+        self.repository = repository
+        self.spill_path = spill_path
+        # Rows the backend refused outright (e.g. an unknown event_id), kept for an operator to inspect.
+        self.rejected_path = f"{spill_path}.rejected"
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stats = WriteBehindStats()
+        self._pending: list[dict[str, Any]] = []
+        # Rows taken by the flush in progress, until they are written or spilled.
+        self._in_flight: list[dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    def enqueue_entry(
+        self,
+        user_id: int,
+        event_id: int,
+        username: str,
+        wallet_address: str,
+        referred_by: int | None,
+    ) -> None:
+        self._pending.append(
+            {
+                "user_id": user_id,
+                "event_id": event_id,
+                "username": username,
+                "wallet_address": wallet_address,
+                "referred_by": referred_by,
+            }
+        )
+        self.stats.queue_depth = len(self._pending)
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+
+    async def pending_entries(self, event_id: int) -> list[dict[str, Any]]:
+        # Rows accepted for the event but not known to be in the database: queued,
+        # being flushed or spilled. A row may appear twice.
+        rows = self._in_flight + self._pending
+        rows += await asyncio.to_thread(self._read_spill)
+        return [row for row in rows if row["event_id"] == event_id]
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        # Let the loop finish its current flush instead of cancelling it mid-write.
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush(force=True)
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Write-behind flush loop error")
+
+    def _read_spill(self) -> list[dict[str, Any]]:
+        try:
+            with open(self.spill_path, encoding="utf-8") as fh:
+                return [row for line in fh if line.strip() for row in json.loads(line)]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _append(path: str, batch: list[dict[str, Any]]) -> None:
+        with open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(batch) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    async def _spill(self, batch: list[dict[str, Any]]) -> None:
+        # fsync can take tens of milliseconds; keep it off the event loop.
+        await asyncio.to_thread(self._append, self.spill_path, batch)
+
+    async def _register(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        # Returns the rows the backend rejected. A transient failure propagates so
+        # the whole flush is retried; any other error is the data's fault, so the
+        # batch is halved until the offending rows stand alone and are set aside.
+        try:
+            await self.repository.register_entries(rows)
+            return []
+        except (BackendUnavailable, *TRANSIENT_ERRORS):
+            raise
+        except Exception as exc:
+            if len(rows) == 1:
+                row = rows[0]
+                logging.error(
+                    "Write-behind entry rejected, quarantined in %s: user_id=%s event_id=%s: %r",
+                    self.rejected_path,
+                    row.get("user_id"),
+                    row.get("event_id"),
+                    exc,
+                )
+                return rows
+        middle = len(rows) // 2
+        return await self._register(rows[:middle]) + await self._register(rows[middle:])
+
+    async def flush(self, force: bool = False) -> int:
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            self._in_flight = batch
+            self.stats.queue_depth = 0
+            try:
+                return await self._flush(batch, force)
+            finally:
+                self._in_flight = []
+
+    async def _flush(self, batch: list[dict[str, Any]], force: bool) -> int:
+        if not force and time.monotonic() < self._retry_at:
+            # Backend recently failed: keep new rows durable locally until the backoff ends.
+            if batch:
+                await self._spill(batch)
+                self.stats.spilled_entries += len(batch)
+            return 0
+
+        spilled = await asyncio.to_thread(self._read_spill)
+        rows = spilled + batch
+        if not rows:
+            return 0
+
+        started = time.perf_counter()
+        rejected: list[dict[str, Any]] = []
+        try:
+            # register_entries inserts with ON CONFLICT DO NOTHING and applies one
+            # coalesced +N referral update per referrer, so replaying spill is safe.
+            for start in range(0, len(rows), self.max_batch):
+                rejected += await self._register(rows[start : start + self.max_batch])
+        except Exception:
+            logging.exception("Write-behind flush of %s entries failed; spilling to %s", len(rows), self.spill_path)
+            if batch:
+                await self._spill(batch)
+            self.stats.spilled_entries = len(spilled) + len(batch)
+            self._backoff = min(max(self._backoff * 2, self.flush_interval), 30.0)
+            self._retry_at = time.monotonic() + self._backoff
+            return 0
+
+        if rejected:
+            await asyncio.to_thread(self._append, self.rejected_path, rejected)
+            self.stats.rejected_entries += len(rejected)
+            rows = [row for row in rows if row not in rejected]
+        if spilled:
+            await asyncio.to_thread(os.remove, self.spill_path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        referrals = [(row["referred_by"], row["event_id"]) for row in rows if row.get("referred_by")]
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.stats.spilled_entries = 0
+        self.stats.flushes += 1
+        self.stats.entries_flushed += len(rows)
+        self.stats.referrals_flushed += len(referrals)
+        self.stats.referrer_updates += len(set(referrals))
+        self.stats.last_batch_size = len(rows)
+        self.stats.last_flush_ms = elapsed_ms
+        self.stats.max_flush_ms = max(self.stats.max_flush_ms, elapsed_ms)
+        return len(rows)
@@ -1,25 +1,52 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 
+import httpx
+from telegram import Update
 from telegram.error import Conflict
+from telegram.request import HTTPXRequest
 from telegram.ext import (
     Application,
     CallbackQueryHandler,
     CommandHandler,
     ConversationHandler,
     MessageHandler,
+    TypeHandler,
     filters,
     ContextTypes,
 )
 
-from amazo_bot.config import load_settings
+from amazo_bot.config import Settings, load_settings
 from amazo_bot.handlers.admin import AdminHandlers
+from amazo_bot.handlers.common import BACKEND_DOWN_TEXT, reply_text_safe
+from amazo_bot.handlers.jobs import EventJobs
 from amazo_bot.handlers.user import TERMS, WALLET, UserHandlers
 from amazo_bot.logging_config import configure_logging
+from amazo_bot.metrics import REGISTRY, InstrumentedRequest, instrument_handler, instrument_repository
+from amazo_bot.monitoring import HealthMonitor
+from amazo_bot.persistence import EVICT_INTERVAL, SQLitePersistence
+from amazo_bot.profiling import LoopProfiler
+from amazo_bot.runtime import BotRuntime
+from amazo_bot.services.broadcast_service import BroadcastService
+from amazo_bot.services.draw_service import DrawEngine
 from amazo_bot.services.giveaway_service import GiveawayService
+from amazo_bot.services.leaderboard_service import LeaderboardService
+from amazo_bot.services.repository import Repository
+from amazo_bot.services.resilience import BackendUnavailable, CircuitBreaker, make_resilient
+from amazo_bot.services.single_flight import coalesce_reads
+from amazo_bot.services.snapshot_service import SnapshotService
+from amazo_bot.services.sqlite_repository import SQLiteRepository
 from amazo_bot.services.supabase_service import SupabaseService
+from amazo_bot.services.write_behind import WriteBehindBuffer
+from amazo_bot.throttle import UpdateThrottle
+from amazo_bot.update_processor import PerUserUpdateProcessor
+
+# Same pool sizes as ApplicationBuilder's defaults.
+CONNECTION_POOL_SIZE = 256
+GET_UPDATES_POOL_SIZE = 1
 
 
 def log_boot_fingerprint() -> None:
@@ -48,50 +75,267 @@ async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
             update_id,
         )
         return
+    if isinstance(context.error, BackendUnavailable):
+        # Expected during an outage; no traceback, and the user gets an answer.
+        logging.warning("Backend unavailable for update_id=%s: %s", update_id, context.error)
+        if isinstance(update, Update):
+            await reply_text_safe(update, BACKEND_DOWN_TEXT)
+        return
     logging.exception("Unhandled exception for update_id=%s", update_id, exc_info=context.error)
 
 
-def build_application() -> Application:
-    configure_logging()
-    log_boot_fingerprint()
-    settings = load_settings()
-
-    supabase_service = SupabaseService(
+def create_repository(settings: Settings) -> Repository:
+    if settings.storage_backend == "sqlite":
+        return SQLiteRepository(settings.sqlite_path)
+    return SupabaseService(
         supabase_url=settings.supabase_url,
         supabase_key=settings.supabase_key,
+        max_workers=settings.supabase_max_workers,
+    )
+
+
+class AmazoApplication(Application):
+    # Carries the process-wide runtime and health monitor, so entrypoints that
+    # serve HTTP (webhook mode) can expose the same /health as the bot uses.
+    __slots__ = ("health_monitor", "peer_services", "runtime")
+
+    def __init__(
+        self,
+        *,
+        runtime: BotRuntime,
+        health_monitor: HealthMonitor,
+        peer_services: tuple[GiveawayService | LeaderboardService, ...] = (),
+        **kwargs: object,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.runtime = runtime
+        self.health_monitor = health_monitor
+        # Services whose caches scale-out workers keep in step (see scaleout._serve_worker).
+        self.peer_services = peer_services
+
+
+def build_application(
+    worker_id: int | None = None, run_singletons: bool = True, boot_started: float | None = None
+) -> AmazoApplication:
+    # worker_id is set when running as one of several scale-out workers: such a
+    # worker gets updates pushed by the dispatcher (no Updater) and its own spill
+    # file. run_singletons=False skips once-per-deployment work like broadcast resume.
+    # boot_started is the entrypoint's perf_counter() before its imports.
+    runtime = BotRuntime() if boot_started is None else BotRuntime(boot_started=boot_started)
+    settings = load_settings()
+    configure_logging(settings.log_format)
+    log_boot_fingerprint()
+    spill_path = settings.write_spill_path
+    state_path = settings.state_path
+    if worker_id is not None:
+        # The dispatcher routes a user to the same worker every time, so each
+        # worker's state file holds all the state of its users.
+        spill_path = f"{spill_path}.{worker_id}"
+        state_path = f"{state_path}.{worker_id}"
+
+    backend = create_repository(settings)
+    # Services call through, outermost first: timeouts / retries / circuit
+    # breaker / stale fallback, then coalescing of identical reads, then
+    # per-call timing. The health probe uses the raw backend so its queries
+    # stay out of the metrics and always reach the database.
+    repository = make_resilient(
+        coalesce_reads(instrument_repository(backend), ttl=settings.read_coalesce_ttl),
+        timeout=settings.backend_timeout,
+        max_retries=settings.backend_max_retries,
+        breaker=CircuitBreaker(settings.circuit_failure_threshold, settings.circuit_reset_timeout),
+    )
+    health_monitor = HealthMonitor(
+        backend,
+        probe_interval=settings.health_probe_interval,
+        max_lag=settings.health_max_loop_lag,
+    )
+    # In single-process webhook mode /health and /metrics share the webhook
+    # port; otherwise they get their own when METRICS_PORT is set. Scale-out
+    # workers use METRICS_PORT + worker_id.
+    monitoring_server = None
+    if settings.metrics_port and (worker_id is not None or settings.update_mode == "polling"):
+        # Starlette and uvicorn are only loaded when there is something to serve.
+        from amazo_bot.webhook import MonitoringServer
+
+        monitoring_server = MonitoringServer(
+            health_monitor, host="0.0.0.0", port=settings.metrics_port + (worker_id or 0)
+        )
+    giveaway_service = GiveawayService(repository, cache_ttl=settings.active_event_cache_ttl)
+
+    write_buffer = WriteBehindBuffer(
+        repository,
+        spill_path=spill_path,
+        flush_interval=settings.write_flush_interval,
+        max_batch=settings.write_max_batch,
     )
-    giveaway_service = GiveawayService(supabase_service)
+    # Indexes are built from the database plus the rows still in the write buffer.
+    leaderboard_service = LeaderboardService(repository, pending_entries=write_buffer.pending_entries)
+    broadcast_service = BroadcastService(
+        repository,
+        checkpoint_path=settings.broadcast_checkpoint_path,
+        rate_per_second=settings.broadcast_rate_per_second,
+        concurrency=settings.broadcast_concurrency,
+    )
+
+    profiler = LoopProfiler()
+    user_handlers = UserHandlers(repository, giveaway_service, leaderboard_service, write_buffer, runtime)
+    admin_handlers = AdminHandlers(
+        settings.admin_id,
+        repository,
+        giveaway_service,
+        broadcast_service,
+        write_buffer,
+        DrawEngine(repository),
+        SnapshotService(repository, settings.snapshot_dir),
+        profiler,
+    )
+
+    async def warm_caches(_: ContextTypes.DEFAULT_TYPE) -> None:
+        # Runs as a job next to the first updates. A handler that needs one of these
+        # waits for the load in flight (both services serialize their loads)
+        # instead of starting a second one.
+        with runtime.phase("active_event"):
+            events = await giveaway_service.refresh_active_events()
+        event_ids = [int(event["id"]) for event in events]
+        # Each event's index is seeded under its own lock, so all of them load at once.
+        with runtime.phase("leaderboard"):
+            await asyncio.gather(*(leaderboard_service.get_index(event_id) for event_id in event_ids))
+        with runtime.phase("dashboard_stats"):
+            stats = await asyncio.gather(*(repository.get_event_stats(event_id=event_id) for event_id in event_ids))
+        for event_id, event_stats in zip(event_ids, stats):
+            logging.info(
+                "Active event_id=%s: %s participants, %s referrals",
+                event_id,
+                event_stats.participants,
+                event_stats.referrals,
+            )
+        runtime.mark_ready()
+
+    async def warm_up(application: Application) -> None:
+        # Runs before the first update is fetched. Only local work here, so
+        # boot to first poll depends neither on the backend nor on event size.
+        write_buffer.start()
+        health_monitor.start()
+        if monitoring_server is not None:
+            monitoring_server.start()
+        REGISTRY.gauge(
+            "amazo_update_queue_depth",
+            "Updates received but not yet picked up by the update processor.",
+            callback=application.update_queue.qsize,
+        )
+        with runtime.phase("bot_identity"):
+            # Application.initialize() already called getMe; reuse its result.
+            runtime.set_bot_username(application.bot.username)
+        if run_singletons and broadcast_service.load_checkpoint() is not None:
+            application.job_queue.run_once(broadcast_service.resume_job, when=0)
+        application.job_queue.run_once(warm_caches, when=0, name="warm_caches")
+        runtime.mark_polling()
 
-    user_handlers = UserHandlers(supabase_service, giveaway_service)
-    admin_handlers = AdminHandlers(settings.admin_id, supabase_service, giveaway_service)
+    async def close_services(_: Application) -> None:
+        if monitoring_server is not None:
+            await monitoring_server.stop()
+        await health_monitor.stop()
+        await profiler.close()
+        await write_buffer.close()
+        repository.close()
 
-    app = Application.builder().token(settings.bot_token).build()
+    persistence = SQLitePersistence(
+        state_path,
+        update_interval=settings.state_flush_interval,
+        idle_ttl=settings.user_state_idle_ttl,
+        max_users=settings.user_state_max_users,
+        conversation_ttl=settings.conversation_timeout,
+    )
+
+    # One CA bundle load (~40 ms) shared by both Bot API transports.
+    tls = {"verify": httpx.create_ssl_context()}
+    builder = (
+        Application.builder()
+        .application_class(
+            AmazoApplication,
+            {
+                "runtime": runtime,
+                "health_monitor": health_monitor,
+                "peer_services": (giveaway_service, leaderboard_service),
+            },
+        )
+        .token(settings.bot_token)
+        .base_url(settings.bot_api_base_url)
+        .base_file_url(settings.bot_api_file_url)
+        .request(InstrumentedRequest(HTTPXRequest(connection_pool_size=CONNECTION_POOL_SIZE, httpx_kwargs=tls)))
+        .get_updates_request(
+            InstrumentedRequest(HTTPXRequest(connection_pool_size=GET_UPDATES_POOL_SIZE, httpx_kwargs=tls))
+        )
+        .concurrent_updates(PerUserUpdateProcessor(settings.concurrent_updates))
+        .persistence(persistence)
+        .post_init(warm_up)
+        .post_shutdown(close_services)
+    )
+    if worker_id is not None:
+        builder = builder.updater(None)
+    app = builder.build()
+    event_jobs = EventJobs(giveaway_service, leaderboard_service, app.job_queue)
+    giveaway_service.on_event_loaded = event_jobs.schedule_expiry
+    app.job_queue.run_repeating(
+        event_jobs.reconcile_leaderboard,
+        interval=settings.leaderboard_reconcile_interval,
+        first=settings.leaderboard_reconcile_interval,
+        name="reconcile_leaderboard",
+    )
+    app.job_queue.run_repeating(
+        persistence.evict_job, interval=EVICT_INTERVAL, first=EVICT_INTERVAL, name="evict_user_state"
+    )
+
+    # Every handler reports to amazo_handler_duration_seconds{handler=...}.
+    timed = instrument_handler
+
+    # First group: floods are dropped before any handler touches the backend.
+    throttle = UpdateThrottle(
+        user_rate=settings.throttle_user_rate,
+        user_burst=settings.throttle_user_burst,
+        global_rate=settings.throttle_global_rate,
+        global_burst=settings.throttle_global_burst,
+        costs=settings.throttle_costs,
+        exempt=(settings.admin_id,),
+    )
+    app.add_handler(TypeHandler(Update, throttle.check), group=-1)
 
     conversation = ConversationHandler(
-        entry_points=[CommandHandler("enter", user_handlers.enter_giveaway)],
+        entry_points=[
+            CommandHandler("enter", timed(user_handlers.enter_giveaway)),
+            # "start_entry" from /start, "start_entry_<event_id>" from an event picker or an event's referral link.
+            CallbackQueryHandler(timed(user_handlers.enter_giveaway), pattern=r"^start_entry(_\d+)?$"),
+        ],
         states={
-            TERMS: [CallbackQueryHandler(user_handlers.terms_accepted, pattern="^accept_terms$")],
-            WALLET: [MessageHandler(filters.TEXT & ~filters.COMMAND, user_handlers.save_wallet)],
+            TERMS: [CallbackQueryHandler(timed(user_handlers.terms_accepted), pattern="^accept_terms$")],
+            WALLET: [MessageHandler(filters.TEXT & ~filters.COMMAND, timed(user_handlers.save_wallet))],
         },
-        fallbacks=[CommandHandler("cancel", user_handlers.cancel_entry)],
+        fallbacks=[CommandHandler("cancel", timed(user_handlers.cancel_entry))],
+        name="enter",
+        persistent=True,
+        conversation_timeout=settings.conversation_timeout or None,
     )
 
-    app.add_handler(CommandHandler("start", user_handlers.start))
+    app.add_handler(CommandHandler("start", timed(user_handlers.start)))
     app.add_handler(conversation)
-    app.add_handler(CommandHandler("balance", user_handlers.balance))
-    app.add_handler(CommandHandler("leaderboard", user_handlers.leaderboard))
-    app.add_handler(CommandHandler("history", user_handlers.history))
-    app.add_handler(CommandHandler("help", user_handlers.faq_command))
-    app.add_handler(CommandHandler("faq", user_handlers.faq_command))
-
-    app.add_handler(CommandHandler("admin", admin_handlers.admin_panel))
-    app.add_handler(CommandHandler("new_event", admin_handlers.new_event))
-    app.add_handler(CommandHandler("pick", admin_handlers.pick_winners))
-    app.add_handler(CommandHandler("broadcast", admin_handlers.broadcast))
-
-    app.add_handler(CallbackQueryHandler(user_handlers.enter_giveaway, pattern="^start_entry$"))
-    app.add_handler(CallbackQueryHandler(user_handlers.faq_command, pattern="^show_faq$"))
-    app.add_handler(CallbackQueryHandler(user_handlers.leaderboard, pattern="^show_lb$"))
+    app.add_handler(CommandHandler("balance", timed(user_handlers.balance)))
+    app.add_handler(CommandHandler("leaderboard", timed(user_handlers.leaderboard)))
+    app.add_handler(CommandHandler("history", timed(user_handlers.history)))
+    app.add_handler(CommandHandler("help", timed(user_handlers.faq_command)))
+    app.add_handler(CommandHandler("faq", timed(user_handlers.faq_command)))
+
+    app.add_handler(CommandHandler("admin", timed(admin_handlers.admin_panel)))
+    app.add_handler(CommandHandler("new_event", timed(admin_handlers.new_event)))
+    app.add_handler(CommandHandler("pick", timed(admin_handlers.pick_winners)))
+    app.add_handler(CommandHandler("snapshot", timed(admin_handlers.snapshot)))
+    app.add_handler(CommandHandler("broadcast", timed(admin_handlers.broadcast)))
+    app.add_handler(CommandHandler("perf", timed(admin_handlers.perf)))
+
+    app.add_handler(CallbackQueryHandler(timed(user_handlers.faq_command), pattern="^show_faq$"))
+    app.add_handler(CallbackQueryHandler(timed(user_handlers.leaderboard), pattern=r"^show_lb(_\d+)?$"))
+
+    # Last group, so it runs after the update's real handler has replied.
+    app.add_handler(TypeHandler(Update, runtime.record_update_served), group=100)
 
     app.add_error_handler(on_error)
     return app
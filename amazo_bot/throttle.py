@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Collection, Mapping
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+
+from amazo_bot.metrics import REGISTRY
+from amazo_bot.update_processor import update_ordering_key
+
+# Tokens an update costs, by command name or callback data. Commands that hit
+# the database cost more than ones answered from memory or static text.
+DEFAULT_COSTS: dict[str, float] = {
+    "start": 1.0,
+    "enter": 3.0,
+    "start_entry": 3.0,
+    "history": 3.0,
+    "balance": 2.0,
+    "leaderboard": 2.0,
+    "show_lb": 2.0,
+    "help": 0.5,
+    "faq": 0.5,
+    "show_faq": 0.5,
+}
+DEFAULT_COST = 1.0
+
+THROTTLED_UPDATES = REGISTRY.counter(
+    "amazo_updates_throttled_total",
+    "Updates dropped before any handler ran, by the bucket that was empty (user or global).",
+    ("scope",),
+)
+
+
+def update_cost_key(update: Update) -> str | None:
+    message = update.message
+    if message is not None and message.text and message.text.startswith("/"):
+        # "/balance@amazo_bot args" -> "balance"
+        return message.text[1:].split(maxsplit=1)[0].partition("@")[0].lower()
+    if update.callback_query is not None and update.callback_query.data:
+        # "show_lb_7" (an event's button) costs the same as "show_lb".
+        data = update.callback_query.data
+        head, _, tail = data.rpartition("_")
+        return head if head and tail.isdigit() else data
+    return None
+
+
+class UpdateThrottle:
+    # Token buckets checked before any handler runs: one per user (per chat for
+    # updates without a user) and one shared by everybody. An update is
+    # admitted only if both hold its cost; otherwise it is dropped without a
+    # reply, so a flood costs neither a backend query nor a Bot API call.
+    #
+    # User buckets are (tokens, last_seen) pairs in an OrderedDict kept in
+    # last-seen order. A bucket idle long enough to refill completely holds no
+    # information, so those are evicted from the front as new users arrive,
+    # and `max_users` bounds the dict even when every bucket is busy.
+
+    def __init__(
+        self,
+        user_rate: float = 1.0,
+        user_burst: float = 10.0,
+        global_rate: float = 200.0,
+        global_burst: float = 400.0,
+        costs: Mapping[str, float] | None = None,
+        exempt: Collection[int] = (),
+        max_users: int = 100_000,
+    ) -> None:
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_rate = global_rate
+        self.global_burst = global_burst
+        self.costs = {**DEFAULT_COSTS, **(costs or {})}
+        self.exempt = frozenset(exempt)
+        self.max_users = max_users
+        self._idle_after = user_burst / user_rate if user_rate > 0 else float("inf")
+        self._users: OrderedDict[int, tuple[float, float]] = OrderedDict()
+        self._global_tokens = global_burst
+        self._global_updated = 0.0
+
+    @property
+    def tracked_users(self) -> int:
+        return len(self._users)
+
+    def cost(self, update: Update) -> float:
+        key = update_cost_key(update)
+        if key is None:
+            return DEFAULT_COST
+        return self.costs.get(key, DEFAULT_COST)
+
+    def admit(self, key: int | None, cost: float, now: float | None = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+
+        user_tokens = 0.0
+        if key is not None and self.user_rate > 0:
+            entry = self._users.get(key)
+            if entry is None:
+                user_tokens = self.user_burst
+            else:
+                user_tokens = min(self.user_burst, entry[0] + (now - entry[1]) * self.user_rate)
+            if user_tokens < cost:
+                self._store(key, user_tokens, now)
+                THROTTLED_UPDATES.inc(scope="user")
+                return False
+
+        if self.global_rate > 0:
+            global_tokens = min(
+                self.global_burst, self._global_tokens + (now - self._global_updated) * self.global_rate
+            )
+            self._global_updated = now
+            if global_tokens < cost:
+                self._global_tokens = global_tokens
+                if key is not None and self.user_rate > 0:
+                    self._store(key, user_tokens, now)
+                THROTTLED_UPDATES.inc(scope="global")
+                return False
+            self._global_tokens = global_tokens - cost
+
+        if key is not None and self.user_rate > 0:
+            self._store(key, user_tokens - cost, now)
+        return True
+
+    def _store(self, key: int, tokens: float, now: float) -> None:
+        users = self._users
+        users[key] = (tokens, now)
+        users.move_to_end(key)
+        # Amortised O(1): each bucket is evicted at most once per insertion.
+        while users:
+            oldest_key, (_, last_seen) = next(iter(users.items()))
+            if now - last_seen < self._idle_after and len(users) <= self.max_users:
+                break
+            del users[oldest_key]
+
+    async def check(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        user = update.effective_user
+        if user is not None and user.id in self.exempt:
+            return
+        if not self.admit(update_ordering_key(update), self.cost(update)):
+            raise ApplicationHandlerStop
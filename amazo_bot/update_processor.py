@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def update_ordering_key(update: object) -> int | None:
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+# Handed to BaseUpdateProcessor so its semaphore, taken before do_process_update,
+# never holds an update back; the processor enforces its own limit.
+UNLIMITED = 2**31 - 1
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    # Runs up to max_concurrent_updates at once, but updates from the same user (or
+    # chat, for updates without a user) run one at a time in arrival order, so a
+    # ConversationHandler step never starts before the previous one finished.
+    #
+    # The user's lock is taken before a concurrency slot: only the head of each
+    # user's queue competes for a slot, so one user with a backlog cannot fill
+    # every slot with updates that are just waiting on their own lock.
+    __slots__ = ("_limit", "_locks", "_running", "_slots", "_waiters")
+
+    def __init__(self, max_concurrent_updates: int) -> None:
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(UNLIMITED)
+        self._limit = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._running = 0
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiters: dict[int, int] = {}
+
+    # max_concurrent_updates (and so Application.concurrent_updates) reports UNLIMITED;
+    # the base constructor sizes its semaphore from it, so it is not overridden.
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def current_concurrent_updates(self) -> int:
+        return self._running
+
+    @property
+    def active_keys(self) -> int:
+        return len(self._locks)
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self._running += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = update_ordering_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, which preserves arrival order.
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        return None
+
+    async def shutdown(self) -> None:
+        return None
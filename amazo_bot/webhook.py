@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hmac
+import logging
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+from telegram import Bot, Update
+from telegram.ext import Application
+
+from amazo_bot.metrics import REGISTRY
+from amazo_bot.monitoring import HealthMonitor
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+UpdateSink = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+async def home(_: Request) -> Response:
+    return PlainTextResponse("Amazo-World optional health endpoint is running.")
+
+
+async def health(_: Request) -> Response:
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics(_: Request) -> Response:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def monitored_health(monitor: HealthMonitor) -> Callable[[Request], Awaitable[Response]]:
+    async def health(_: Request) -> Response:
+        return JSONResponse(monitor.status(), status_code=200 if monitor.healthy else 503)
+
+    return health
+
+
+def monitoring_routes(monitor: HealthMonitor | None) -> list[Route]:
+    return [
+        Route("/", home),
+        Route("/health", health if monitor is None else monitored_health(monitor)),
+        Route("/metrics", metrics),
+    ]
+
+
+def create_monitoring_app(monitor: HealthMonitor | None) -> Starlette:
+    return Starlette(routes=monitoring_routes(monitor))
+
+
+def application_sink(application: Application) -> UpdateSink:
+    async def submit(payload: dict[str, Any]) -> None:
+        await application.update_queue.put(Update.de_json(payload, application.bot))
+
+    return submit
+
+
+def create_web_app(
+    submit: UpdateSink,
+    secret_token: str,
+    webhook_path: str,
+    monitor: HealthMonitor | None = None,
+) -> Starlette:
+    async def telegram_webhook(request: Request) -> Response:
+        provided = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(provided, secret_token):
+            return Response(status_code=403)
+        try:
+            payload = await request.json()
+        except ValueError:
+            return Response(status_code=400)
+        await submit(payload)
+        return Response(status_code=200)
+
+    return Starlette(
+        routes=[
+            *monitoring_routes(monitor),
+            Route(webhook_path, telegram_webhook, methods=["POST"]),
+        ]
+    )
+
+
+async def register_webhook(bot: Bot, webhook_url: str, webhook_path: str, secret_token: str) -> None:
+    await bot.set_webhook(
+        url=f"{webhook_url.rstrip('/')}{webhook_path}",
+        secret_token=secret_token,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=False,
+    )
+
+
+def create_server(web_app: Starlette, host: str, port: int, handle_signals: bool = True) -> uvicorn.Server:
+    # handle_signals=False when the caller owns SIGINT/SIGTERM and stops the
+    # server itself through should_exit.
+    server_class = uvicorn.Server if handle_signals else EmbeddedServer
+    return server_class(uvicorn.Config(web_app, host=host, port=port, log_level="warning"))
+
+
+class EmbeddedServer(uvicorn.Server):
+    # Runs beside something that owns SIGINT/SIGTERM (run_polling, the scale-out
+    # front); uvicorn must not replace those handlers.
+
+    @contextlib.contextmanager
+    def capture_signals(self) -> Iterator[None]:
+        yield
+
+
+class MonitoringServer:
+    # /health and /metrics on their own port, for modes without a webhook server.
+
+    def __init__(self, monitor: HealthMonitor | None, host: str, port: int) -> None:
+        config = uvicorn.Config(create_monitoring_app(monitor), host=host, port=port, log_level="warning")
+        self.server = EmbeddedServer(config)
+        self.port = port
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.server.serve(), name="monitoring_server")
+        logging.info("Monitoring endpoints listening on port %s (/health, /metrics)", self.port)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self.server.should_exit = True
+        await self._task
+        self._task = None
+
+
+async def serve_webhook(
+    application: Application,
+    *,
+    webhook_url: str,
+    secret_token: str,
+    webhook_path: str,
+    host: str,
+    port: int,
+    monitor: HealthMonitor | None = None,
+) -> None:
+    # Mirrors Application.run_webhook's lifecycle, but with our own ASGI server so
+    # the webhook shares a port with /health and /metrics.
+    web_app = create_web_app(application_sink(application), secret_token, webhook_path, monitor)
+    server = create_server(web_app, host, port)
+
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        await register_webhook(application.bot, webhook_url, webhook_path, secret_token)
+        await application.start()
+        logging.info("Webhook server listening on %s:%s%s", host, port, webhook_path)
+        try:
+            await server.serve()
+        finally:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
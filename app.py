@@ -1,19 +1,37 @@
-from flask import Flask
+import json
 import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-app = Flask(__name__)
+# Optional health endpoint for a separate Render web service. Standard library
+# only: it starts in milliseconds and never loads the bot stack.
 
 
-@app.route('/')
-def home():
-    return "Amazo-World optional health endpoint is running."
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/":
+            self._send(200, "text/plain; charset=utf-8", b"Amazo-World optional health endpoint is running.")
+        elif path == "/health":
+            self._send(200, "application/json", json.dumps({"status": "ok"}).encode())
+        else:
+            self._send(404, "text/plain; charset=utf-8", b"Not Found")
 
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-@app.route('/health')
-def health():
-    return {"status": "ok"}
+    def log_message(self, format: str, *args: object) -> None:
+        # Platform health checks hit this every few seconds; keep them out of the logs.
+        return None
+
+
+def create_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), HealthHandler)
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 10000))
-    app.run(host="0.0.0.0", port=port)
+    create_server(port).serve_forever()
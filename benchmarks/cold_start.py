@@ -0,0 +1,134 @@
+"""Cold start: process boot to first served update.
+
+Run with ``python -m benchmarks.cold_start [--rtt-ms N] [--entries N]``. Builds
+the real application via ``build_application`` against a fake Supabase and a
+local Bot API whose calls each cost one simulated round trip, pushes a
+``/balance`` update as soon as the bot has started and reports when it could
+take updates, when the background cache warm-up finished and when the first
+reply was sent. It also counts
+``getMe`` calls, which should stay at one (from initialize) no matter how many
+``/balance`` updates are served.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from telegram import Update
+
+from amazo_bot.config import Settings
+from amazo_bot.services.repository import EventStats
+from amazo_bot.telegram_app import build_application
+from benchmarks.local_bot_api import LocalBotRequest, message_update
+
+ACTIVE_EVENT = {"id": 1, "name": "Benchmark", "end_date": "2999-12-31T23:59:59Z", "is_active": True}
+
+
+def fake_supabase_service(latency: float, entries: int) -> type:
+    class FakeSupabaseService:
+        def __init__(self, supabase_url: str, supabase_key: str, max_workers: int = 8) -> None:
+            return None
+
+        async def fetch_active_event_record(self) -> dict[str, Any]:
+            await asyncio.sleep(latency)
+            return ACTIVE_EVENT
+
+        async def fetch_active_event_records(self) -> list[dict[str, Any]]:
+            await asyncio.sleep(latency)
+            return [ACTIVE_EVENT]
+
+        async def iter_event_entries(self, event_id: int, page_size: int = 1000):
+            for start in range(1, entries + 1, page_size):
+                await asyncio.sleep(latency)
+                yield [
+                    {"user_id": user_id, "username": f"user{user_id}", "referral_count": user_id % 7}
+                    for user_id in range(start, min(entries, start + page_size - 1) + 1)
+                ]
+
+        async def get_event_stats(self, event_id: int) -> EventStats:
+            await asyncio.sleep(latency)
+            return EventStats(participants=entries, referrals=entries * 3)
+
+        async def get_user_entry_for_event(self, user_id: int, event_id: int) -> dict[str, Any]:
+            await asyncio.sleep(latency)
+            return {"user_id": user_id, "wallet_address": "0x" + "a" * 40, "referral_count": 2}
+
+        async def register_entries(self, rows: list[dict[str, Any]]) -> int:
+            await asyncio.sleep(latency)
+            return len(rows)
+
+        def close(self) -> None:
+            return None
+
+    return FakeSupabaseService
+
+
+async def run(rtt: float, latency: float, entries: int, updates: int, workdir: Path) -> dict[str, float]:
+    # One instance serves both the bot and getUpdates, so its counters see every call.
+    request = LocalBotRequest(rtt)
+    settings = Settings(
+        bot_token="1:BENCH",
+        supabase_url="https://bench.invalid",
+        supabase_key="key",
+        admin_id=1,
+        broadcast_checkpoint_path=str(workdir / "checkpoint.json"),
+        write_spill_path=str(workdir / "spill.jsonl"),
+        state_path=str(workdir / "state.db"),
+    )
+
+    with (
+        mock.patch("amazo_bot.telegram_app.load_settings", lambda: settings),
+        mock.patch("amazo_bot.telegram_app.SupabaseService", fake_supabase_service(latency, entries)),
+        mock.patch("amazo_bot.telegram_app.HTTPXRequest", lambda **kwargs: request),
+    ):
+        boot = time.perf_counter()
+        app = build_application()
+        await app.initialize()
+        await app.post_init(app)
+        polling = time.perf_counter()
+        await app.start()
+        for update_id in range(1, updates + 1):
+            await app.update_queue.put(Update.de_json(message_update(update_id, 1000 + update_id, "/balance"), app.bot))
+        while request.calls["sendMessage"] < updates or app.runtime.ready_at is None:
+            await asyncio.sleep(0.001)
+        ready = app.runtime.ready_at
+        await app.stop()
+        await app.shutdown()
+        await app.post_shutdown(app)
+
+    return {
+        "polling_ms": (polling - boot) * 1000,
+        "ready_ms": (ready - boot) * 1000,
+        "first_reply_ms": (request.first_reply_at - boot) * 1000,
+        "get_me_calls": request.calls["getMe"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rtt-ms", type=float, default=80.0, help="simulated Bot API round trip")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated Supabase round trip")
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--updates", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        result = asyncio.run(
+            run(args.rtt_ms / 1000, args.latency_ms / 1000, args.entries, args.updates, Path(workdir))
+        )
+    print(
+        f"boot -> taking updates: {result['polling_ms']:.0f} ms  "
+        f"boot -> caches warm: {result['ready_ms']:.0f} ms  "
+        f"boot -> first reply: {result['first_reply_ms']:.0f} ms  "
+        f"getMe calls for {args.updates} /balance: {result['get_me_calls']:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
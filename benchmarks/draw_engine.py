@@ -0,0 +1,82 @@
+"""Weighted winner draw at scale.
+
+Run with ``python -m benchmarks.draw_engine [--sizes 100000,1000000,5000000]``.
+Generates synthetic events (skewed referral counts, like real referral
+trees) and times ``draw_arrays`` on each, with peak traced memory of the
+draw itself. A pure-Python Efraimidis-Spirakis loop is timed on the smallest
+size for comparison, and every size is checked for same-seed reproducibility.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from amazo_bot.services.draw_service import CHUNK_SIZE, draw_arrays
+
+
+def make_event(entries: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    user_ids = np.arange(1, entries + 1, dtype=np.int64)
+    # Most users refer nobody; a long tail refers hundreds.
+    referral_counts = np.minimum(rng.zipf(2.0, entries) - 1, 10_000).astype(np.int64)
+    return user_ids, referral_counts
+
+
+def python_draw(user_ids: list[int], referral_counts: list[int], winners: int, seed: int) -> list[int]:
+    rng = random.Random(seed)
+    keyed = [
+        (math.log(1.0 - rng.random()) / (count + 1), user_id) for user_id, count in zip(user_ids, referral_counts)
+    ]
+    keyed.sort(reverse=True)
+    return [user_id for _, user_id in keyed[:winners]]
+
+
+def measure(entries: int, winners: int, chunk_size: int) -> dict[str, float]:
+    user_ids, referral_counts = make_event(entries)
+    tracemalloc.start()
+    started = time.perf_counter()
+    sampler = draw_arrays(user_ids, referral_counts, winners=winners, seed=42, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    again = draw_arrays(user_ids, referral_counts, winners=winners, seed=42, chunk_size=chunk_size // 3 + 1)
+    if sampler.result() != again.result():
+        raise AssertionError("draw is not reproducible across chunk sizes")
+    return {
+        "seconds": elapsed,
+        "peak_mb": peak / 2**20,
+        "tickets": sampler.tickets,
+        "input_mb": (user_ids.nbytes + referral_counts.nbytes) / 2**20,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="100000,1000000,5000000")
+    parser.add_argument("--winners", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    for entries in sizes:
+        result = measure(entries, args.winners, args.chunk_size)
+        print(
+            f"{entries:>10,} entries / {result['tickets']:>12,} tickets: "
+            f"{result['seconds'] * 1000:8.1f} ms  peak draw memory {result['peak_mb']:6.1f} MB "
+            f"(input arrays {result['input_mb']:.0f} MB)"
+        )
+
+    user_ids, referral_counts = make_event(sizes[0])
+    started = time.perf_counter()
+    python_draw(user_ids.tolist(), referral_counts.tolist(), args.winners, seed=42)
+    print(f"pure-Python sort, {sizes[0]:,} entries: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Local stand-in for the Telegram Bot API.
+
+Serves ``getMe``, ``getUpdates``, ``sendMessage``, ``editMessageText``,
+``answerCallbackQuery`` and answers ``True`` to anything else, so the real bot
+can poll it through ``BOT_API_URL``. Every call waits ``latency`` seconds, and
+send calls fail with a 429 ``retry_after`` at ``error_rate``.
+
+Updates come from a scenario (see ``benchmarks.scenarios``) and are released
+on its schedule once ``POST /control/start`` is called. Each update carries the
+wall-clock time it was first handed out in ``_served_at``, which the load test
+reads back to measure end-to-end latency. ``GET /stats`` reports call counts.
+
+Run on its own with ``python -m benchmarks.fake_bot_api --port 8081
+--scenario referral_storm`` and point a bot at it with
+``BOT_API_URL=http://127.0.0.1:8081``; ``benchmarks.load_test`` starts it
+for you.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter, deque
+from typing import Any
+from urllib.parse import parse_qsl
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.scenarios import SCENARIOS, Scenario
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+SEND_METHODS = frozenset({"sendMessage", "editMessageText", "answerCallbackQuery"})
+
+
+def _parse_parameters(body: bytes) -> dict[str, Any]:
+    # PTB posts form fields whose non-string values are JSON-encoded.
+    params: dict[str, Any] = {}
+    for key, raw in parse_qsl(body.decode()):
+        try:
+            params[key] = json.loads(raw)
+        except ValueError:
+            params[key] = raw
+    return params
+
+
+class FakeBotApi:
+    """Bot API state: scheduled updates, call counters and fault injection."""
+
+    def __init__(
+        self,
+        scenario: Scenario,
+        latency: float = 0.02,
+        error_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 7,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.calls: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._schedule = deque(
+            (at, {"update_id": update_id, **update})
+            for update_id, (at, update) in enumerate(scenario.updates, start=1)
+        )
+        self._released: deque[dict[str, Any]] = deque()
+        self._started_at: float | None = None
+        self._wake = asyncio.Event()
+        self._message_ids = itertools.count(1)
+
+    def start(self) -> None:
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+            self._wake.set()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": dict(self.calls),
+            "rejected_429": dict(self.rejected),
+            "unreleased": len(self._schedule),
+            "unconfirmed": len(self._released),
+        }
+
+    def _release_due(self) -> float | None:
+        # Moves due updates to the released queue; returns seconds until the next one.
+        if self._started_at is None:
+            return None
+        elapsed = time.monotonic() - self._started_at
+        while self._schedule and self._schedule[0][0] <= elapsed:
+            self._released.append(self._schedule.popleft()[1])
+        return self._schedule[0][0] - elapsed if self._schedule else None
+
+    async def get_updates(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        while True:
+            # Updates below the offset were confirmed by the bot.
+            while self._released and self._released[0]["update_id"] < offset:
+                self._released.popleft()
+            next_release = self._release_due()
+            if self._released:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            wait = remaining if next_release is None else min(remaining, next_release)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+        batch = list(itertools.islice(self._released, limit))
+        now = time.time()
+        for update in batch:
+            update.setdefault("_served_at", now)
+        return batch
+
+    def _message(self, params: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id") or 0), "type": "private"},
+            "from": BOT_USER,
+            "text": str(params.get("text", "")),
+        }
+
+    async def call(self, method: str, params: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        if method == "getUpdates":
+            updates = await self.get_updates(params)
+            await asyncio.sleep(self.latency)
+            self.calls[method] += 1
+            return 200, {"ok": True, "result": updates}
+
+        await asyncio.sleep(self.latency)
+        if method in SEND_METHODS and self.error_rate and self._rng.random() < self.error_rate:
+            self.rejected[method] += 1
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+
+        self.calls[method] += 1
+        result: Any = True
+        if method == "getMe":
+            result = BOT_USER
+        elif method in ("sendMessage", "editMessageText"):
+            result = self._message(params)
+        return 200, {"ok": True, "result": result}
+
+
+def create_app(api: FakeBotApi) -> Starlette:
+    async def bot_method(request: Request) -> JSONResponse:
+        params = _parse_parameters(await request.body())
+        status, payload = await api.call(request.path_params["method"], params)
+        return JSONResponse(payload, status_code=status)
+
+    async def control_start(request: Request) -> JSONResponse:
+        api.start()
+        return JSONResponse({"ok": True})
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse(api.stats())
+
+    return Starlette(
+        routes=[
+            Route("/control/start", control_start, methods=["POST"]),
+            Route("/stats", stats, methods=["GET"]),
+            Route("/bot{token}/{method}", bot_method, methods=["POST"]),
+        ]
+    )
+
+
+def serve(port: int, scenario_name: str, scenario_kwargs: dict[str, Any], **api_kwargs: Any) -> None:
+    scenario = SCENARIOS[scenario_name](**scenario_kwargs)
+
+    async def main() -> None:
+        api = FakeBotApi(scenario, **api_kwargs)
+        config = uvicorn.Config(create_app(api), host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="delay before every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of send calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after in injected 429s")
+    args = parser.parse_args()
+
+    serve(
+        args.port,
+        args.scenario,
+        {"users": args.users},
+        latency=args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Handler latency under concurrent users: blocking vs thread-pool data layer.
+
+Run with ``python -m benchmarks.handler_latency``. Supabase is replaced by a
+fake client whose ``execute()`` sleeps for a fixed round-trip time, so the
+numbers only reflect how the event loop copes with slow backend calls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+from typing import Any, Callable
+from unittest import mock
+
+from amazo_bot.handlers.user import UserHandlers
+from amazo_bot.runtime import BotRuntime
+from amazo_bot.services.giveaway_service import GiveawayService
+from amazo_bot.services.leaderboard_service import LeaderboardService
+from amazo_bot.services.supabase_service import SupabaseService
+from amazo_bot.services.write_behind import WriteBehindBuffer
+
+ACTIVE_EVENT = {"id": 1, "name": "Benchmark", "end_date": "2999-12-31T23:59:59Z", "is_active": True}
+HISTORY = [{"referral_count": 3, "giveaways": {"name": "Benchmark", "is_active": True}}]
+
+
+class FakeQuery:
+    def __init__(self, latency: float, data: list[dict[str, Any]]) -> None:
+        self.latency = latency
+        self.data = data
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: self
+
+    def execute(self) -> SimpleNamespace:
+        time.sleep(self.latency)
+        return SimpleNamespace(data=self.data, count=len(self.data))
+
+
+class FakeClient:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def table(self, name: str) -> FakeQuery:
+        data = [ACTIVE_EVENT] if name == "giveaways" else HISTORY
+        return FakeQuery(self.latency, data)
+
+    def rpc(self, name: str, params: dict[str, Any]) -> FakeQuery:
+        return FakeQuery(self.latency, [])
+
+
+class BlockingSupabaseService(SupabaseService):
+    """The pre-async behaviour: execute() runs inline on the event loop."""
+
+    async def _execute(self, build: Callable[[Any], Any]) -> Any:
+        return build(self.client).execute()
+
+
+def _make_update() -> SimpleNamespace:
+    async def reply_text(text: str, **kwargs: Any) -> None:
+        return None
+
+    message = SimpleNamespace(reply_text=reply_text, from_user=SimpleNamespace(id=1))
+    return SimpleNamespace(message=message, callback_query=None)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(service: SupabaseService, users: int) -> list[float]:
+    handlers = UserHandlers(
+        service,
+        GiveawayService(service),
+        LeaderboardService(service),
+        WriteBehindBuffer(service, spill_path="bench_spill.jsonl"),
+        BotRuntime(),
+    )
+    context = SimpleNamespace(args=[], user_data={})
+
+    # All users arrive at once; latency is measured from arrival, not from when
+    # the event loop finally gets round to starting the handler.
+    arrived = time.perf_counter()
+
+    async def one_user() -> float:
+        await handlers.history(_make_update(), context)
+        return time.perf_counter() - arrived
+
+    return list(await asyncio.gather(*(one_user() for _ in range(users))))
+
+
+def measure(service_cls: type[SupabaseService], users: int, latency: float, workers: int) -> dict[str, float]:
+    # The client is built lazily by the first query, so the patch has to
+    # cover the whole run, not just the constructor.
+    with mock.patch(
+        "amazo_bot.services.supabase_service.create_client",
+        lambda url, key: FakeClient(latency),
+    ):
+        service = service_cls("https://bench.invalid", "key", max_workers=workers)
+        try:
+            samples = asyncio.run(_run(service, users))
+        finally:
+            service.close()
+    return {
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    print(f"{args.users} concurrent /history calls, {args.latency_ms:.0f} ms per Supabase round trip")
+    for label, service_cls, workers in (
+        ("before (blocking)", BlockingSupabaseService, 1),
+        (f"after (pool={args.workers})", SupabaseService, args.workers),
+        (f"after (pool={args.workers * 4})", SupabaseService, args.workers * 4),
+    ):
+        result = measure(service_cls, args.users, latency, workers)
+        print(f"{label:<22} p50={result['p50_ms']:8.1f} ms  p99={result['p99_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""In-memory leaderboard index at scale.
+
+Run with ``python -m benchmarks.leaderboard_index [--entries N]``. Seeds the
+index with a skewed referral distribution, then times incremental referral
+updates, top-10 queries and rank lookups.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from amazo_bot.services.leaderboard_service import LeaderboardIndex
+
+
+def _timed(label: str, operations: int, func) -> None:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {operations:>9} ops  {elapsed:8.3f} s  {elapsed / operations * 1e6:8.2f} us/op")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    index = LeaderboardIndex()
+
+    # Referral counts follow a heavy tail: most users invite nobody, a few invite thousands.
+    counts = [int(rng.paretovariate(1.2)) - 1 for _ in range(args.entries)]
+    _timed(
+        "seed",
+        args.entries,
+        lambda: [index.set(user_id, f"user_{user_id}", count) for user_id, count in enumerate(counts, start=1)],
+    )
+
+    referrers = [rng.randint(1, args.entries) for _ in range(args.operations)]
+    _timed("add_referrals", args.operations, lambda: [index.add_referrals(user_id) for user_id in referrers])
+    _timed("top(10)", args.operations, lambda: [index.top(10) for _ in range(args.operations)])
+    lookups = [rng.randint(1, args.entries) for _ in range(args.operations)]
+    _timed("rank", args.operations, lambda: [index.rank(user_id) for user_id in lookups])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Offline load test of the whole bot against a fake Telegram Bot API.
+
+Run with ``python -m benchmarks.load_test [--scenario NAME ...] [--users N]
+[--latency-ms N] [--error-rate P] [--output baseline.json] [--compare
+old.json]``.
+
+For every scenario in ``benchmarks.scenarios`` it seeds a SQLite backend,
+starts ``benchmarks.fake_bot_api`` in its own process and polls it
+(``BOT_API_URL``) with the application from ``build_application``: real
+handlers, throttle, persistence and repository stack. One extra handler in the
+last group records when each update was done; updates the throttle dropped
+never get there and are counted from ``amazo_updates_throttled_total``. Each
+scenario runs in a fresh process, so peak RSS belongs to that scenario alone.
+
+Reported per scenario: updates/s, p50/p95/p99 latency (update handed out by
+``getUpdates`` -> its handlers finished, Bot API calls included), throttled
+updates, Bot API calls and 429s, broadcast messages/s and peak RSS. ``--output``
+writes the results as JSON to diff across releases, and ``--compare`` prints
+the change against such a file. Bot logs go to ``--log-file``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+import resource
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import httpx
+import telegram
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from amazo_bot.config import Settings
+from amazo_bot.logging_config import configure_logging
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+from amazo_bot.telegram_app import build_application
+from amazo_bot.throttle import THROTTLED_UPDATES
+from benchmarks import fake_bot_api
+from benchmarks.scenarios import ADMIN_ID, EVENT_ID, SCENARIOS, SEED_USER_BASE, Scenario
+
+SEED_BATCH = 5000
+# Metrics compared by --compare, and whether a higher value is better.
+COMPARED = {
+    "updates_per_s": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "broadcast_per_s": True,
+    "peak_rss_mb": False,
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def scenario_kwargs(name: str, args: argparse.Namespace) -> dict[str, Any]:
+    if name == "broadcast":
+        return {"users": args.recipients}
+    return {"users": args.users} if args.users else {}
+
+
+def throttled_total() -> float:
+    return THROTTLED_UPDATES.value(scope="user") + THROTTLED_UPDATES.value(scope="global")
+
+
+async def seed_backend(path: str, scenario: Scenario) -> None:
+    repository = SQLiteRepository(path)
+    for offset in range(scenario.events):
+        event_id = EVENT_ID + offset
+        entries = scenario.quiet_event_entries if offset else scenario.seed_entries
+        await repository.new_event(event_id, f"Load test {event_id}", "2999-12-31")
+        for start in range(0, entries, SEED_BATCH):
+            await repository.register_entries(
+                [
+                    {
+                        "user_id": SEED_USER_BASE + n,
+                        "event_id": event_id,
+                        "username": f"user{SEED_USER_BASE + n}",
+                        "wallet_address": "0x" + f"{n:040x}",
+                        "referred_by": None,
+                    }
+                    for n in range(start, min(entries, start + SEED_BATCH))
+                ]
+            )
+    repository.close()
+
+
+async def wait_for_server(client: httpx.AsyncClient, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            (await client.get("/stats")).raise_for_status()
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def drive(scenario: Scenario, args: argparse.Namespace, workdir: Path, api_url: str) -> dict[str, Any]:
+    settings = Settings(
+        bot_token="1:LOADTEST",
+        supabase_url="",
+        supabase_key="",
+        admin_id=ADMIN_ID,
+        storage_backend="sqlite",
+        sqlite_path=str(workdir / "amazo.db"),
+        bot_api_url=api_url,
+        broadcast_rate_per_second=args.broadcast_rate,
+        broadcast_concurrency=args.broadcast_concurrency,
+        broadcast_checkpoint_path=str(workdir / "checkpoint.json"),
+        write_spill_path=str(workdir / "spill.jsonl"),
+        state_path=str(workdir / "state.db"),
+        snapshot_dir=str(workdir / "snapshots"),
+    )
+    latencies: list[float] = []
+
+    async def record_done(update: Update, context: Any) -> None:
+        served = update.api_kwargs.get("_served_at")
+        if served is not None:
+            latencies.append(time.time() - served)
+
+    with mock.patch("amazo_bot.telegram_app.load_settings", lambda: settings):
+        app = build_application()
+    app.add_handler(TypeHandler(Update, record_done), group=101)
+
+    expected = len(scenario.updates)
+    throttled_before = throttled_total()
+    async with httpx.AsyncClient(base_url=api_url) as client:
+        await wait_for_server(client)
+        await app.initialize()
+        await app.post_init(app)
+        await app.updater.start_polling(timeout=10)
+        await app.start()
+
+        await client.post("/control/start")
+        started = time.perf_counter()
+        updates_done_at = broadcast_done_at = None
+        deadline = started + args.timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            if updates_done_at is None and len(latencies) + throttled_total() - throttled_before >= expected:
+                updates_done_at = now
+            if scenario.broadcast_recipients and broadcast_done_at is None:
+                sent = (await client.get("/stats")).json()["calls"].get("sendMessage", 0)
+                # Recipients plus the "Preparing broadcast..." reply.
+                if sent >= scenario.broadcast_recipients + 1:
+                    broadcast_done_at = time.perf_counter()
+            if updates_done_at is not None and (not scenario.broadcast_recipients or broadcast_done_at):
+                break
+        stats = (await client.get("/stats")).json()
+
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await app.post_shutdown(app)
+
+    handled = len(latencies)
+    throttled = int(throttled_total() - throttled_before)
+    elapsed = (updates_done_at or time.perf_counter()) - started
+    result: dict[str, Any] = {
+        "updates": expected,
+        "handled": handled,
+        "throttled": throttled,
+        "timed_out": updates_done_at is None or bool(scenario.broadcast_recipients and broadcast_done_at is None),
+        "duration_s": round(elapsed, 3),
+        "updates_per_s": round((handled + throttled) / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "bot_api_calls": stats["calls"],
+        "bot_api_429": stats["rejected_429"],
+    }
+    if scenario.broadcast_recipients:
+        broadcast_elapsed = (broadcast_done_at or time.perf_counter()) - started
+        result["broadcast_recipients"] = scenario.broadcast_recipients
+        result["broadcast_per_s"] = round(scenario.broadcast_recipients / broadcast_elapsed, 1)
+    return result
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> dict[str, Any]:
+    kwargs = scenario_kwargs(name, args)
+    scenario = SCENARIOS[name](**kwargs)
+    port = free_port()
+    server = multiprocessing.get_context("spawn").Process(
+        target=fake_bot_api.serve,
+        args=(port, name, kwargs),
+        kwargs={
+            "latency": args.latency_ms / 1000,
+            "error_rate": args.error_rate,
+            "retry_after": args.retry_after,
+        },
+        daemon=True,
+    )
+    server.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp)
+            asyncio.run(seed_backend(str(workdir / "amazo.db"), scenario))
+            # Left open: the log-writer thread drains into it until the process exits.
+            configure_logging(stream=open(args.log_file, "a", encoding="utf-8"))
+            result = asyncio.run(drive(scenario, args, workdir, f"http://127.0.0.1:{port}"))
+    finally:
+        server.terminate()
+        server.join()
+    # ru_maxrss is in KiB on Linux.
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+
+def _scenario_process(name: str, args: argparse.Namespace, results: Any) -> None:
+    results.put(run_scenario(name, args))
+
+
+def run_isolated(name: str, args: argparse.Namespace) -> dict[str, Any]:
+    # Fresh process per scenario: separate peak RSS and metric counters.
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_scenario_process, args=(name, args, results))
+    process.start()
+    try:
+        return results.get(timeout=args.timeout + 120)
+    finally:
+        process.join()
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    lines = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            if metric not in result or not before.get(metric):
+                continue
+            change = (result[metric] - before[metric]) / before[metric] * 100
+            better = change > 0 if higher_is_better else change < 0
+            verdict = "better" if better else "worse" if change else "same"
+            lines.append(f"{name:20} {metric:16} {before[metric]:>10} -> {result[metric]:>10} ({change:+.1f}%, {verdict})")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="repeatable; default all")
+    parser.add_argument("--users", type=int, default=None, help="users per scenario (scenario default if unset)")
+    parser.add_argument("--recipients", type=int, default=100_000, help="broadcast scenario recipients")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake Bot API delay per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of send calls answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after in injected 429s")
+    parser.add_argument("--broadcast-rate", type=float, default=5000.0, help="BROADCAST_RATE_PER_SECOND")
+    parser.add_argument("--broadcast-concurrency", type=int, default=64, help="BROADCAST_CONCURRENCY")
+    parser.add_argument("--timeout", type=float, default=1800.0, help="seconds before a scenario is cut off")
+    parser.add_argument("--log-file", default="load_test.log", help="where the bot's logs go")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --output")
+    args = parser.parse_args()
+
+    report: dict[str, Any] = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "python_telegram_bot": telegram.__version__,
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare", "log_file")
+        },
+        "scenarios": {},
+    }
+    for name in args.scenario or list(SCENARIOS):
+        result = run_isolated(name, args)
+        report["scenarios"][name] = result
+        print(
+            f"{name:20} {result['updates_per_s']:>9.1f} upd/s  p50 {result['p50_ms']:>7.1f} ms  "
+            f"p95 {result['p95_ms']:>7.1f} ms  p99 {result['p99_ms']:>7.1f} ms  "
+            f"throttled {result['throttled']:>6}  rss {result['peak_rss_mb']:>6.1f} MB"
+            + (f"  broadcast {result['broadcast_per_s']:.0f} msg/s" if "broadcast_per_s" in result else "")
+            + ("  TIMED OUT" if result["timed_out"] else ""),
+            flush=True,
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    if args.compare:
+        for line in compare(report, json.loads(Path(args.compare).read_text(encoding="utf-8"))):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""In-process Bot API stand-in shared by the tests and benchmarks.
+
+``LocalBotRequest`` plugs into ``Application.builder().request(...)`` and
+answers every call locally, optionally after a simulated round trip, so no
+network or token is needed. ``message_update`` and ``callback_update`` build
+the matching update payloads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any
+
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Test", "username": "test_bot"}
+
+
+class LocalBotRequest(BaseRequest):
+    """Answers Bot API calls locally; every call first sleeps for ``rtt`` seconds."""
+
+    def __init__(self, rtt: float = 0.0) -> None:
+        self.rtt = rtt
+        self.calls: Counter[str] = Counter()
+        self.first_reply_at: float | None = None
+
+    @property
+    def read_timeout(self) -> float | None:
+        return None
+
+    async def initialize(self) -> None:
+        return None
+
+    async def shutdown(self) -> None:
+        return None
+
+    async def do_request(self, url: str, method: str, request_data=None, **kwargs: Any) -> tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+        self.calls[endpoint] += 1
+        result: Any = True
+        if endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint == "sendMessage":
+            if self.first_reply_at is None:
+                self.first_reply_at = time.perf_counter()
+            params = request_data.parameters if request_data else {}
+            result = {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", ""),
+            }
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+def user(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict[str, Any]:
+    command = text.split(maxsplit=1)[0] if text else ""
+    entities = [{"type": "bot_command", "offset": 0, "length": len(command)}] if text.startswith("/") else []
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": user(user_id),
+            "text": text,
+            "entities": entities,
+        },
+    }
+
+
+def callback_update(update_id: int, user_id: int, data: str) -> dict[str, Any]:
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}},
+        },
+    }
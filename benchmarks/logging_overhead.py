@@ -0,0 +1,117 @@
+"""Logging cost on the event loop: synchronous handler vs the queue pipeline.
+
+Run with ``python -m benchmarks.logging_overhead [--records 20000]``. Logs a
+broadcast-style failure (``logging.exception`` with a Telegram ``Forbidden``
+raised a few frames deep) and a plain INFO line, first through a
+``StreamHandler`` that formats and writes in the calling thread (the old
+``basicConfig`` setup), then through ``LogPipeline``. Reports the time the
+caller spends per record, which is what an update handler pays, and how many
+lines the failures turned into after aggregation.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from telegram.error import Forbidden
+
+from amazo_bot.logging_config import TEXT_FORMAT, JsonFormatter, LogPipeline
+
+
+def send(user_id: int, depth: int = 8) -> None:
+    if depth:
+        send(user_id, depth - 1)
+        return
+    raise Forbidden("bot was blocked by the user")
+
+
+def log_failures(logger: logging.Logger, records: int) -> float:
+    started = time.perf_counter()
+    for user_id in range(records):
+        try:
+            send(user_id)
+        except Forbidden:
+            logger.exception("Broadcast failed for user_id=%s", user_id)
+    return time.perf_counter() - started
+
+
+def log_info(logger: logging.Logger, records: int) -> float:
+    started = time.perf_counter()
+    for update_id in range(records):
+        logger.info("Handled update_id=%s in %.1f ms", update_id, 1.5)
+    return time.perf_counter() - started
+
+
+def raise_and_catch(records: int) -> float:
+    # The cost of the failure itself, subtracted so only logging is compared.
+    started = time.perf_counter()
+    for user_id in range(records):
+        try:
+            send(user_id)
+        except Forbidden:
+            pass
+    return time.perf_counter() - started
+
+
+def make_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20_000)
+    args = parser.parse_args()
+    records = args.records
+    baseline = raise_and_catch(records)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        sync_path = os.path.join(workdir, "sync.log")
+        with open(sync_path, "w") as sink:
+            handler = logging.StreamHandler(sink)
+            handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            logger = make_logger("bench.sync", handler)
+            sync_errors = log_failures(logger, records) - baseline
+            sync_info = log_info(logger, records)
+        with open(sync_path) as sink:
+            sync_lines = sum(1 for line in sink if "Broadcast failed" in line)
+
+        queued_path = os.path.join(workdir, "queued.log")
+        with open(queued_path, "w") as sink:
+            output = logging.StreamHandler(sink)
+            output.setFormatter(JsonFormatter())
+            pipeline = LogPipeline(output)
+            pipeline.start()
+            logger = make_logger("bench.queued", pipeline.enqueue_handler)
+            queued_errors = log_failures(logger, records) - baseline
+            queued_info = log_info(logger, records)
+            drain_started = time.perf_counter()
+            pipeline.stop()
+            drain = time.perf_counter() - drain_started
+        with open(queued_path) as sink:
+            lines = sink.read().splitlines()
+
+    per_record = 1e6 / records
+    print(f"{records:,} failed sends (traceback) and {records:,} INFO lines")
+    print(
+        f"synchronous: {sync_errors * per_record:7.1f} us/exception  {sync_info * per_record:6.1f} us/info  "
+        f"{sync_lines:,} failure lines written"
+    )
+    print(
+        f"queued:      {queued_errors * per_record:7.1f} us/exception  {queued_info * per_record:6.1f} us/info  "
+        f"{sum('Broadcast failed' in line or 'Forbidden' in line for line in lines):,} failure lines written "
+        f"(log thread drained the rest in {drain * 1000:.0f} ms)"
+    )
+    summary = next((line for line in lines if '"aggregated"' in line), "")
+    print(f"summary line: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Update mixes for the load test.
+
+Each scenario is a schedule of Bot API updates, as ``(seconds after start,
+update)`` pairs without ``update_id``, plus what the backend must hold before
+the run. The fake Bot API (``benchmarks.fake_bot_api``) hands the updates out
+on that schedule and ``benchmarks.load_test`` replays them against the real
+application. Every factory takes ``users`` and a ``seed``, so runs are
+repeatable.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+ADMIN_ID = 1
+EVENT_ID = 1
+# Users who are not in the seeded event; seeded entries use ids 1000.. upwards.
+NEW_USER_BASE = 10_000_000
+SEED_USER_BASE = 1000
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class Scenario:
+    name: str
+    updates: list[tuple[float, dict[str, Any]]] = field(default_factory=list)
+    # Entries created in the active event before the run.
+    seed_entries: int = 0
+    # sendMessage calls the run waits for on top of the updates, e.g. a broadcast.
+    broadcast_recipients: int = 0
+    # Events running at once, ids EVENT_ID upwards; seed_entries go to the
+    # first and quiet_event_entries to each of the others.
+    events: int = 1
+    quiet_event_entries: int = 0
+
+
+def _user(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+
+def message(user_id: int, text: str) -> dict[str, Any]:
+    command = text.split(maxsplit=1)[0]
+    entities = [{"type": "bot_command", "offset": 0, "length": len(command)}] if text.startswith("/") else []
+    return {
+        "message": {
+            "message_id": next(_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": _user(user_id),
+            "text": text,
+            "entities": entities,
+        }
+    }
+
+
+def callback(user_id: int, data: str) -> dict[str, Any]:
+    return {
+        "callback_query": {
+            "id": str(next(_ids)),
+            "from": _user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "menu",
+            },
+        }
+    }
+
+
+def referral_storm(users: int = 2000, seed: int = 7, duration: float = 1.0) -> Scenario:
+    # A referral link goes viral: new users press /start <referrer> within a second.
+    rng = random.Random(seed)
+    referrers = max(1, users // 100)
+    updates = [
+        (rng.uniform(0, duration), message(NEW_USER_BASE + n, f"/start {SEED_USER_BASE + rng.randrange(referrers)}"))
+        for n in range(users)
+    ]
+    return Scenario("referral_storm", sorted(updates, key=lambda item: item[0]), seed_entries=referrers)
+
+
+def enter_conversations(users: int = 1000, seed: int = 7, duration: float = 2.0, think: float = 0.3) -> Scenario:
+    # /enter, accept the terms, send a wallet: three steps per user with a short pause between them.
+    rng = random.Random(seed)
+    updates = []
+    for n in range(users):
+        user_id = NEW_USER_BASE + n
+        at = rng.uniform(0, duration)
+        updates.append((at, message(user_id, "/enter")))
+        updates.append((at + think, callback(user_id, "accept_terms")))
+        updates.append((at + 2 * think, message(user_id, "0x" + f"{user_id:040x}")))
+    return Scenario("enter_conversations", sorted(updates, key=lambda item: item[0]), seed_entries=users)
+
+
+def leaderboard_spam(users: int = 200, seed: int = 7, per_user: int = 20, duration: float = 2.0) -> Scenario:
+    # Many users hammering /leaderboard and the leaderboard button; most of it should be throttled.
+    rng = random.Random(seed)
+    updates = []
+    for n in range(users):
+        user_id = SEED_USER_BASE + n
+        for _ in range(per_user):
+            update = message(user_id, "/leaderboard") if rng.random() < 0.5 else callback(user_id, "show_lb")
+            updates.append((rng.uniform(0, duration), update))
+    return Scenario("leaderboard_spam", sorted(updates, key=lambda item: item[0]), seed_entries=users)
+
+
+def broadcast(users: int = 100_000, seed: int = 7) -> Scenario:
+    # The admin broadcasts to every entrant.
+    return Scenario(
+        "broadcast",
+        [(0.0, message(ADMIN_ID, "/broadcast New giveaway starts tomorrow!"))],
+        seed_entries=users,
+        broadcast_recipients=users,
+    )
+
+
+def mixed(users: int = 2000, seed: int = 7, duration: float = 5.0) -> Scenario:
+    # A busy evening: everyone is active at once, in proportions seen around a launch.
+    rng = random.Random(seed)
+    updates: list[tuple[float, dict[str, Any]]] = []
+    for n in range(users):
+        user_id = NEW_USER_BASE + n
+        at = rng.uniform(0, duration)
+        roll = rng.random()
+        if roll < 0.35:
+            updates.append((at, message(user_id, f"/start {SEED_USER_BASE + rng.randrange(100)}")))
+        elif roll < 0.6:
+            updates.append((at, message(user_id, "/enter")))
+            updates.append((at + 0.3, callback(user_id, "accept_terms")))
+            updates.append((at + 0.6, message(user_id, "0x" + f"{user_id:040x}")))
+        elif roll < 0.8:
+            user_id = SEED_USER_BASE + n
+            for step in range(rng.randrange(1, 8)):
+                updates.append((at + 0.05 * step, message(user_id, "/leaderboard")))
+        elif roll < 0.9:
+            updates.append((at, message(SEED_USER_BASE + n, "/balance")))
+        else:
+            updates.append((at, callback(user_id, "show_faq")))
+    return Scenario("mixed", sorted(updates, key=lambda item: item[0]), seed_entries=users)
+
+
+def multi_event(
+    users: int = 2000, seed: int = 7, duration: float = 5.0, events: int = 20, hot_share: float = 0.5
+) -> Scenario:
+    # Regional campaigns side by side: one event draws half the traffic, the
+    # other 19 share the rest. Users arrive on event referral links, pick an
+    # event from the buttons and check its leaderboard or their balance.
+    rng = random.Random(seed)
+    quiet_entries = max(1, users // 20)
+    updates: list[tuple[float, dict[str, Any]]] = []
+    for n in range(users):
+        event_id = EVENT_ID if rng.random() < hot_share else EVENT_ID + rng.randrange(1, events)
+        referrers = users if event_id == EVENT_ID else quiet_entries
+        user_id = NEW_USER_BASE + n
+        at = rng.uniform(0, duration)
+        roll = rng.random()
+        if roll < 0.3:
+            updates.append((at, message(user_id, f"/start {SEED_USER_BASE + rng.randrange(referrers)}_{event_id}")))
+        elif roll < 0.6:
+            updates.append((at, callback(user_id, f"start_entry_{event_id}")))
+            updates.append((at + 0.3, callback(user_id, "accept_terms")))
+            updates.append((at + 0.6, message(user_id, "0x" + f"{user_id:040x}")))
+        elif roll < 0.85:
+            user_id = SEED_USER_BASE + rng.randrange(referrers)
+            if roll < 0.75:
+                updates.append((at, message(user_id, f"/leaderboard {event_id}")))
+            else:
+                updates.append((at, callback(user_id, f"show_lb_{event_id}")))
+        else:
+            # Seeded in every event, so /balance reports on all of them.
+            updates.append((at, message(SEED_USER_BASE + rng.randrange(quiet_entries), "/balance")))
+    return Scenario(
+        "multi_event",
+        sorted(updates, key=lambda item: item[0]),
+        seed_entries=users,
+        events=events,
+        quiet_event_entries=quiet_entries,
+    )
+
+
+SCENARIOS: dict[str, Callable[..., Scenario]] = {
+    "referral_storm": referral_storm,
+    "enter_conversations": enter_conversations,
+    "leaderboard_spam": leaderboard_spam,
+    "broadcast": broadcast,
+    "mixed": mixed,
+    "multi_event": multi_event,
+}
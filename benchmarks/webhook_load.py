@@ -0,0 +1,126 @@
+"""Webhook ingestion load test.
+
+Run with ``python -m benchmarks.webhook_load [--updates N] [--rate R]``. Starts
+the real webhook ASGI app on a local port, POSTs synthetic ``/faq`` updates at
+the target rate and reports end-to-end throughput and latency (POST sent ->
+handler finished replying). Bot API calls are answered in-process, so no
+network or token is needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+
+from telegram.ext import Application, MessageHandler, filters
+
+from amazo_bot.webhook import SECRET_HEADER, application_sink, create_server, create_web_app
+from benchmarks.local_bot_api import LocalBotRequest, message_update
+
+SECRET = "bench-secret"
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(updates: int, rate: float, port: int, connections: int) -> dict[str, float]:
+    done_at: dict[int, float] = {}
+    all_done = asyncio.Event()
+
+    async def handle(update, context) -> None:
+        await update.message.reply_text("pong")
+        done_at[update.update_id] = time.perf_counter()
+        if len(done_at) == updates:
+            all_done.set()
+
+    application = (
+        Application.builder()
+        .token("1:BENCH")
+        .request(LocalBotRequest())
+        .get_updates_request(LocalBotRequest())
+        .updater(None)
+        .build()
+    )
+    application.add_handler(MessageHandler(filters.ALL, handle))
+    web_app = create_web_app(application_sink(application), secret_token=SECRET, webhook_path="/telegram")
+    server = create_server(web_app, "127.0.0.1", port)
+
+    async with application:
+        await application.start()
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        sent_at: dict[int, float] = {}
+        pending: asyncio.Queue[int | None] = asyncio.Queue()
+
+        async def connection() -> None:
+            # A bare keep-alive HTTP/1.1 client: httpx would cost more CPU than the bot itself.
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            while (update_id := await pending.get()) is not None:
+                body = json.dumps(message_update(update_id, 1000 + update_id, "/faq")).encode()
+                sent_at[update_id] = time.perf_counter()
+                writer.write(
+                    b"POST /telegram HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                    + f"{SECRET_HEADER}: {SECRET}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+                status = await reader.readline()
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                if b" 200 " not in status:
+                    raise RuntimeError(f"webhook returned {status!r}")
+            writer.close()
+
+        clients = [asyncio.create_task(connection()) for _ in range(connections)]
+        started = time.perf_counter()
+        for update_id in range(1, updates + 1):
+            delay = started + (update_id - 1) / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            pending.put_nowait(update_id)
+        for _ in clients:
+            pending.put_nowait(None)
+        await asyncio.gather(*clients)
+        await asyncio.wait_for(all_done.wait(), timeout=120)
+
+        server.should_exit = True
+        await server_task
+        await application.stop()
+
+    latencies = [done_at[uid] - sent_at[uid] for uid in done_at]
+    elapsed = max(done_at.values()) - started
+    return {
+        "throughput": updates / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=500.0, help="target POSTs per second")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--connections", type=int, default=16)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.updates, args.rate, args.port, args.connections))
+    print(
+        f"{args.updates} updates at target {args.rate:.0f}/s: "
+        f"throughput={result['throughput']:.0f} updates/s  "
+        f"p50={result['p50_ms']:.1f} ms  p99={result['p99_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
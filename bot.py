@@ -1,8 +1,39 @@
-from amazo_bot.telegram_app import build_application
+import asyncio
+import time
+
+from amazo_bot.config import load_settings
+
+# Taken before the bot stack is imported, so the warm-up log covers imports too.
+BOOT_STARTED = time.perf_counter()
 
 
 def main() -> None:
-    app = build_application()
+    settings = load_settings()
+    if settings.workers > 1:
+        from amazo_bot.scaleout import run_scaled
+
+        run_scaled(settings)
+        return
+
+    # Imported after the settings check so a bad environment fails in milliseconds.
+    from amazo_bot.telegram_app import build_application
+
+    app = build_application(boot_started=BOOT_STARTED)
+    if settings.update_mode == "webhook":
+        from amazo_bot.webhook import serve_webhook
+
+        asyncio.run(
+            serve_webhook(
+                app,
+                webhook_url=settings.webhook_url,
+                secret_token=settings.webhook_secret,
+                webhook_path=settings.webhook_path,
+                host="0.0.0.0",
+                port=settings.port,
+                monitor=app.health_monitor,
+            )
+        )
+        return
     app.run_polling()
 
 
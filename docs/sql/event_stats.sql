@@ -0,0 +1,53 @@
+-- Per-event dashboard counters maintained incrementally, so /admin reads one row
+-- regardless of how many entries an event has.
+
+create table if not exists event_stats (
+    event_id bigint primary key references giveaways (id) on delete cascade,
+    participants bigint not null default 0,
+    referrals bigint not null default 0
+);
+
+create or replace function event_stats_on_entry_change() returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into event_stats (event_id, participants, referrals)
+        values (new.event_id, 1, coalesce(new.referral_count, 0))
+        on conflict (event_id) do update
+            set participants = event_stats.participants + 1,
+                referrals = event_stats.referrals + coalesce(new.referral_count, 0);
+    elsif tg_op = 'UPDATE' then
+        update event_stats
+            set referrals = referrals + coalesce(new.referral_count, 0) - coalesce(old.referral_count, 0)
+            where event_id = new.event_id;
+    elsif tg_op = 'DELETE' then
+        update event_stats
+            set participants = participants - 1,
+                referrals = referrals - coalesce(old.referral_count, 0)
+            where event_id = old.event_id;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists entries_event_stats on entries;
+create trigger entries_event_stats
+    after insert or update of referral_count or delete on entries
+    for each row execute function event_stats_on_entry_change();
+
+create or replace function get_event_stats(target_event_id bigint)
+returns table (participants bigint, referrals bigint, tickets bigint)
+language sql stable as $$
+    select s.participants, s.referrals, s.participants + s.referrals
+    from event_stats s
+    where s.event_id = target_event_id;
+$$;
+
+-- One-off backfill for events that existed before the trigger was installed.
+insert into event_stats (event_id, participants, referrals)
+select event_id, count(*), coalesce(sum(referral_count), 0)
+from entries
+group by event_id
+on conflict (event_id) do update
+    set participants = excluded.participants,
+        referrals = excluded.referrals;
@@ -0,0 +1,41 @@
+-- Batched registration used by the bot's write-behind buffer.
+-- Inserts many entries in one call, skips users already registered for the
+-- event, and credits each referrer once with +N for the rows actually inserted.
+-- Replaying the same batch is therefore a no-op.
+
+create unique index if not exists entries_user_event_key on entries (user_id, event_id);
+
+create or replace function register_entries(entries jsonb) returns integer
+language plpgsql as $$
+declare
+    new_rows jsonb;
+begin
+    with inserted as (
+        insert into entries (user_id, event_id, username, wallet_address, referred_by)
+        select e.user_id, e.event_id, e.username, e.wallet_address, e.referred_by
+        from jsonb_to_recordset(entries) as e(
+            user_id bigint,
+            event_id bigint,
+            username text,
+            wallet_address text,
+            referred_by bigint
+        )
+        on conflict (user_id, event_id) do nothing
+        returning event_id, referred_by
+    )
+    select coalesce(jsonb_agg(inserted), '[]'::jsonb) into new_rows from inserted;
+
+    -- Separate statement so referrers registered earlier in the same batch are visible.
+    update entries t
+        set referral_count = t.referral_count + r.n
+        from (
+            select x.referred_by, x.event_id, count(*) as n
+            from jsonb_to_recordset(new_rows) as x(event_id bigint, referred_by bigint)
+            where x.referred_by is not null
+            group by x.referred_by, x.event_id
+        ) r
+        where t.user_id = r.referred_by and t.event_id = r.event_id;
+
+    return jsonb_array_length(new_rows);
+end;
+$$;
@@ -0,0 +1,124 @@
+import asyncio
+from types import SimpleNamespace
+
+from amazo_bot.handlers.admin import AdminHandlers
+from amazo_bot.services.broadcast_service import BroadcastService
+from amazo_bot.services.draw_service import DrawEngine
+from amazo_bot.services.giveaway_service import GiveawayService
+from amazo_bot.services.resilience import BackendUnavailable
+from amazo_bot.services.snapshot_service import SnapshotService
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+
+ADMIN_ID = 1
+
+
+class FakeMessage:
+    def __init__(self, user_id: int = ADMIN_ID) -> None:
+        self.from_user = SimpleNamespace(id=user_id)
+        self.chat_id = user_id
+        self.replies: list[str] = []
+
+    async def reply_text(self, text: str, **kwargs) -> SimpleNamespace:
+        # Sending a reply is an await point, as it is against the real Bot API.
+        await asyncio.sleep(0)
+        self.replies.append(text)
+        return SimpleNamespace(message_id=len(self.replies))
+
+
+class UnreachableOnRead(SQLiteRepository):
+    # Writes go through; reading the active events fails as if the backend just dropped.
+    async def fetch_active_event_records(self):
+        raise BackendUnavailable("fetch_active_event_records", "circuit open", retry_after=30)
+
+
+def entry(user_id: int) -> dict:
+    return {"user_id": user_id, "event_id": 1, "username": f"user_{user_id}", "wallet_address": f"0x{user_id:040x}"}
+
+
+def command(handlers: AdminHandlers, name: str, text: str) -> list[str]:
+    message = FakeMessage()
+    context = SimpleNamespace(args=text.split())
+    asyncio.run(getattr(handlers, name)(SimpleNamespace(message=message, callback_query=None), context))
+    return message.replies
+
+
+def make_handlers(repository: SQLiteRepository, **services) -> AdminHandlers:
+    return AdminHandlers(
+        ADMIN_ID,
+        repository,
+        services.get("giveaway_service") or GiveawayService(repository),
+        services.get("broadcast_service"),
+        services.get("write_buffer"),
+        services.get("draw_engine"),
+        services.get("snapshot_service"),
+        None,
+    )
+
+
+def test_new_event_reports_creation_when_only_the_refresh_fails(tmp_path) -> None:
+    repository = UnreachableOnRead(str(tmp_path / "amazo.db"))
+    handlers = make_handlers(repository)
+
+    replies = command(handlers, "new_event", "5 | Launch | 2999-12-31")
+
+    assert replies == ["Event #5 created; the active list will refresh shortly."]
+    assert [event["id"] for event in asyncio.run(SQLiteRepository.fetch_active_event_records(repository))] == [5]
+    repository.close()
+
+
+def test_pick_draws_live_entries_unless_a_snapshot_is_asked_for(tmp_path) -> None:
+    repository = SQLiteRepository(str(tmp_path / "amazo.db"))
+    asyncio.run(repository.new_event(1, "Launch", "2999-12-31"))
+    asyncio.run(repository.register_entries([entry(user_id) for user_id in range(1, 6)]))
+    handlers = make_handlers(
+        repository,
+        draw_engine=DrawEngine(repository),
+        snapshot_service=SnapshotService(repository, str(tmp_path / "snapshots")),
+    )
+
+    assert command(handlers, "pick_winners", "1 --snapshot") == [
+        "Event #1 has no snapshot. Take one with /snapshot 1."
+    ]
+    command(handlers, "snapshot", "1")
+    # Entered after the snapshot was taken.
+    asyncio.run(repository.register_entries([entry(6)]))
+
+    live = command(handlers, "pick_winners", "1 42")[0]
+    assert "Drawn from 6 entries" in live and "Source: live entries" in live
+    assert "re-run with /pick 1 42)" in live
+
+    frozen = command(handlers, "pick_winners", "1 42 --snapshot")[0]
+    assert "Drawn from 5 entries" in frozen and "Snapshot: " in frozen
+    assert "re-run with /pick 1 42 --snapshot)" in frozen
+    repository.close()
+
+
+def test_concurrent_broadcast_commands_start_only_one(tmp_path) -> None:
+    repository = SQLiteRepository(str(tmp_path / "amazo.db"))
+    service = BroadcastService(repository, str(tmp_path / "checkpoint.json"))
+    handlers = make_handlers(repository, broadcast_service=service)
+    scheduled = []
+    application = SimpleNamespace(create_task=lambda coroutine, update=None: scheduled.append(coroutine))
+    first, second = FakeMessage(), FakeMessage()
+
+    def broadcast(message: FakeMessage, text: str):
+        context = SimpleNamespace(args=text.split(), application=application)
+        return handlers.broadcast(SimpleNamespace(message=message, callback_query=None), context)
+
+    async def run() -> None:
+        await asyncio.gather(broadcast(first, "hello"), broadcast(second, "hi"))
+        for coroutine in scheduled:
+            coroutine.close()
+
+    asyncio.run(run())
+
+    assert len(scheduled) == 1
+    assert first.replies == ["Preparing broadcast..."]
+    assert second.replies == ["A broadcast is already running. Wait for it to finish."]
+    assert service.is_running
+
+    # A command that gives up before scheduling hands the slot back.
+    service.release()
+    assert command(handlers, "broadcast", "--active hello") == ["No active event to target."]
+    assert service.is_running is False
+    repository.close()
@@ -0,0 +1,148 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# Budgets with headroom for a loaded CI box. Measured on one shared CPU against
+# a local server: ~0.4 s to import the bot stack, ~0.7 s from spawn to first poll.
+IMPORT_BUDGET_SECONDS = 1.5
+BOOT_BUDGET_SECONDS = 3.0
+# Not needed to reach the first getUpdates; loaded on first use instead.
+DEFERRED_MODULES = ("supabase", "numpy", "flask", "starlette", "uvicorn")
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Test", "username": "test_bot"}
+
+
+def run_python(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True, timeout=60
+    ).stdout
+
+
+class FakeUpstream(BaseHTTPRequestHandler):
+    # Bot API (POST /bot<token>/<method>) and Supabase REST (GET /rest/v1/...) in one.
+    first_poll_at: float | None = None
+    rest_calls = 0
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        method = self.path.rsplit("/", 1)[-1]
+        result: object = True
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getUpdates":
+            if FakeUpstream.first_poll_at is None:
+                FakeUpstream.first_poll_at = time.perf_counter()
+            time.sleep(0.2)
+            result = []
+        self._send({"ok": True, "result": result})
+
+    def do_GET(self) -> None:
+        FakeUpstream.rest_calls += 1
+        self._send([])
+
+    def _send(self, payload: object) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        return None
+
+
+def test_bot_stack_imports_within_budget_and_defers_heavy_modules() -> None:
+    out = run_python(
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import bot, amazo_bot.telegram_app\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(elapsed, *[name for name in {DEFERRED_MODULES!r} if name in sys.modules])\n"
+    )
+    elapsed, *loaded = out.split()
+
+    assert loaded == []
+    assert float(elapsed) < IMPORT_BUDGET_SECONDS
+
+
+def test_health_endpoint_does_not_load_the_bot_stack() -> None:
+    out = run_python(
+        "import sys, app\n"
+        "print(*[name for name in ('flask', 'telegram', 'amazo_bot') if name in sys.modules])\n"
+    )
+    assert out.strip() == ""
+
+    sys.path.insert(0, str(ROOT))
+    try:
+        import app
+    finally:
+        sys.path.remove(str(ROOT))
+    server = app.create_server(0, host="127.0.0.1")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/health", timeout=5) as response:
+            assert response.status == 200
+            assert json.loads(response.read()) == {"status": "ok"}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("backend", ["supabase", "sqlite"])
+def test_boot_to_first_poll_within_budget(tmp_path, backend: str) -> None:
+    FakeUpstream.first_poll_at = None
+    FakeUpstream.rest_calls = 0
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstream)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{upstream.server_port}"
+    env = {
+        **os.environ,
+        "BOT_TOKEN": "1:BOOT",
+        "ADMIN_ID": "1",
+        "BOT_API_URL": url,
+        "STORAGE_BACKEND": backend,
+        "SUPABASE_URL": url,
+        "SUPABASE_KEY": "header.payload.signature",
+        "SQLITE_PATH": str(tmp_path / "amazo.db"),
+        "STATE_PATH": str(tmp_path / "state.db"),
+        "WRITE_SPILL_PATH": str(tmp_path / "spill.jsonl"),
+        "BROADCAST_CHECKPOINT_PATH": str(tmp_path / "checkpoint.json"),
+        "SNAPSHOT_DIR": str(tmp_path / "snapshots"),
+        "WORKERS": "1",
+        "UPDATE_MODE": "polling",
+        "METRICS_PORT": "",
+    }
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "bot.py")],
+        cwd=tmp_path,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    def booted() -> bool:
+        # Polling started, and for Supabase the lazily built client reached the backend.
+        return FakeUpstream.first_poll_at is not None and (backend == "sqlite" or FakeUpstream.rest_calls > 0)
+
+    try:
+        deadline = started + BOOT_BUDGET_SECONDS * 5
+        while not booted() and process.poll() is None and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        _, stderr = process.communicate(timeout=30)
+        upstream.shutdown()
+        upstream.server_close()
+
+    assert booted(), stderr.decode()[-2000:]
+    boot_to_first_poll = FakeUpstream.first_poll_at - started
+    assert boot_to_first_poll < BOOT_BUDGET_SECONDS, f"boot to first poll took {boot_to_first_poll:.2f}s"
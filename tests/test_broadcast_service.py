@@ -0,0 +1,86 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from telegram.error import Forbidden, RetryAfter
+
+from amazo_bot.services.broadcast_service import BroadcastService
+
+
+class FakeUsers:
+    def __init__(self, user_ids: set[int]) -> None:
+        self.user_ids = user_ids
+
+    async def iter_recipient_ids(self, segment, after: int = 0, page_size: int = 1000):
+        remaining = sorted(uid for uid in self.user_ids if uid > after)
+        for start in range(0, len(remaining), page_size):
+            yield remaining[start : start + page_size]
+
+
+class FakeBot:
+    def __init__(self, blocked: set[int] = frozenset(), flood_once: set[int] = frozenset()) -> None:
+        self.blocked = set(blocked)
+        self.flood_once = set(flood_once)
+        self.delivered: list[int] = []
+        self.edits: list[str] = []
+
+    async def send_message(self, chat_id: int, text: str):
+        if chat_id in self.flood_once:
+            self.flood_once.discard(chat_id)
+            raise RetryAfter(0)
+        if chat_id in self.blocked:
+            raise Forbidden("bot was blocked by the user")
+        self.delivered.append(chat_id)
+        return SimpleNamespace(message_id=99)
+
+    async def edit_message_text(self, text: str, chat_id: int, message_id: int) -> None:
+        self.edits.append(text)
+
+
+def make_service(tmp_path, user_ids: set[int]) -> BroadcastService:
+    return BroadcastService(
+        FakeUsers(user_ids),
+        checkpoint_path=str(tmp_path / "checkpoint.json"),
+        rate_per_second=1000,
+        concurrency=4,
+        checkpoint_interval=0.01,
+        page_size=7,
+    )
+
+
+def test_broadcast_sends_to_everyone_and_counts_failures(tmp_path) -> None:
+    service = make_service(tmp_path, set(range(1, 51)))
+    bot = FakeBot(blocked={5, 6}, flood_once={10})
+
+    result = asyncio.run(service.start(bot, "hello", chat_id=1000, status_message_id=1))
+
+    assert (result.sent, result.failed) == (48, 2)
+    assert sorted(bot.delivered) == [uid for uid in range(1, 51) if uid not in {5, 6}]
+    assert bot.edits[-1].startswith("Broadcast done.")
+    assert not (tmp_path / "checkpoint.json").exists()
+
+
+def test_broadcast_resumes_from_checkpoint(tmp_path) -> None:
+    service = make_service(tmp_path, set(range(1, 21)))
+    checkpoint = {
+        "message": "hello",
+        "chat_id": 1000,
+        "status_message_id": 1,
+        "watermark": 10,
+        "done_above": [12, 15],
+        "sent": 12,
+        "failed": 0,
+    }
+    (tmp_path / "checkpoint.json").write_text(json.dumps(checkpoint))
+    bot = FakeBot()
+
+    result = asyncio.run(service.resume(bot))
+
+    assert sorted(bot.delivered) == [11, 13, 14, 16, 17, 18, 19, 20]
+    assert result.sent == 20
+
+
+def test_resume_without_checkpoint_is_noop(tmp_path) -> None:
+    service = make_service(tmp_path, {1, 2})
+
+    assert asyncio.run(service.resume(FakeBot())) is None
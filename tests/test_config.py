@@ -36,3 +36,92 @@ def test_load_settings_invalid_admin_id(monkeypatch: pytest.MonkeyPatch) -> None
     with pytest.raises(ValueError, match="ADMIN_ID"):
         load_settings()
 
+
+
+def test_load_settings_supabase_max_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "key")
+    monkeypatch.setenv("ADMIN_ID", "123")
+    monkeypatch.setenv("SUPABASE_MAX_WORKERS", "16")
+
+    assert load_settings().supabase_max_workers == 16
+
+    monkeypatch.setenv("SUPABASE_MAX_WORKERS", "0")
+    with pytest.raises(ValueError, match="SUPABASE_MAX_WORKERS"):
+        load_settings()
+
+
+def test_load_settings_webhook_mode_requires_url_and_secret(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "key")
+    monkeypatch.setenv("ADMIN_ID", "123")
+    monkeypatch.setenv("UPDATE_MODE", "webhook")
+    monkeypatch.delenv("WEBHOOK_URL", raising=False)
+
+    with pytest.raises(ValueError, match="WEBHOOK_URL"):
+        load_settings()
+
+    monkeypatch.setenv("WEBHOOK_URL", "https://bot.example.com")
+    monkeypatch.setenv("WEBHOOK_SECRET", "bad secret!")
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        load_settings()
+
+    monkeypatch.setenv("WEBHOOK_SECRET", "good_secret-1")
+    settings = load_settings()
+    assert (settings.update_mode, settings.webhook_path) == ("webhook", "/telegram")
+
+
+def test_load_settings_sqlite_backend_does_not_need_supabase(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+    monkeypatch.delenv("SUPABASE_KEY", raising=False)
+    monkeypatch.setenv("ADMIN_ID", "123")
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_PATH", "/tmp/amazo-test.db")
+
+    settings = load_settings()
+    assert (settings.storage_backend, settings.sqlite_path) == ("sqlite", "/tmp/amazo-test.db")
+
+    monkeypatch.setenv("STORAGE_BACKEND", "mysql")
+    with pytest.raises(ValueError, match="STORAGE_BACKEND"):
+        load_settings()
+
+
+def test_bot_api_url_points_the_bot_at_another_server(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "key")
+    monkeypatch.setenv("ADMIN_ID", "123")
+
+    assert load_settings().bot_api_base_url == "https://api.telegram.org/bot"
+
+    monkeypatch.setenv("BOT_API_URL", "http://127.0.0.1:8081/")
+    settings = load_settings()
+    assert settings.bot_api_base_url == "http://127.0.0.1:8081/bot"
+    assert settings.bot_api_file_url == "http://127.0.0.1:8081/file/bot"
+
+
+def test_numeric_settings_have_per_setting_lower_bounds(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "key")
+    monkeypatch.setenv("ADMIN_ID", "123")
+    monkeypatch.setenv("BACKEND_MAX_RETRIES", "0")
+    monkeypatch.setenv("METRICS_PORT", "0")
+    monkeypatch.setenv("READ_COALESCE_TTL", "0")
+
+    settings = load_settings()
+    assert (settings.backend_max_retries, settings.metrics_port, settings.read_coalesce_ttl) == (0, 0, 0.0)
+
+    monkeypatch.setenv("BACKEND_MAX_RETRIES", "-1")
+    with pytest.raises(ValueError, match="BACKEND_MAX_RETRIES must be at least 0"):
+        load_settings()
+    monkeypatch.delenv("BACKEND_MAX_RETRIES")
+
+    for name in ("WRITE_FLUSH_INTERVAL", "LEADERBOARD_RECONCILE_INTERVAL", "BROADCAST_RATE_PER_SECOND", "BACKEND_TIMEOUT"):
+        monkeypatch.setenv(name, "0")
+        with pytest.raises(ValueError, match=f"{name} must be greater than 0"):
+            load_settings()
+        monkeypatch.delenv(name)
@@ -0,0 +1,64 @@
+import asyncio
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from amazo_bot.services.draw_service import DrawEngine, WeightedSampler, draw_arrays
+
+
+class FakeRepository:
+    def __init__(self, counts: dict[int, int]) -> None:
+        self.counts = counts
+
+    async def iter_event_entries(self, event_id: int, page_size: int = 1000):
+        user_ids = sorted(self.counts)
+        for start in range(0, len(user_ids), 3):
+            yield [
+                {"user_id": user_id, "username": f"user_{user_id}", "referral_count": self.counts[user_id]}
+                for user_id in user_ids[start : start + 3]
+            ]
+
+    async def get_user_entry_for_event(self, user_id: int, event_id: int) -> dict:
+        return {"user_id": user_id, "username": f"user_{user_id}", "wallet_address": f"wallet_{user_id}"}
+
+
+def test_same_seed_reproduces_the_draw_regardless_of_chunking() -> None:
+    user_ids = np.arange(1, 10_001)
+    counts = user_ids % 13
+
+    first = draw_arrays(user_ids, counts, winners=5, seed=1234, chunk_size=10_000).result()
+    chunked = draw_arrays(user_ids, counts, winners=5, seed=1234, chunk_size=777).result()
+    other = draw_arrays(user_ids, counts, winners=5, seed=4321).result()
+
+    assert first == chunked
+    assert len(set(first)) == 5
+    assert first != other
+
+
+def test_single_winner_probability_follows_ticket_weights() -> None:
+    wins = Counter(draw_arrays([1, 2, 3, 4], [0, 1, 2, 3], winners=1, seed=seed).result()[0] for seed in range(8000))
+
+    for user_id, tickets in ((1, 1), (2, 2), (3, 3), (4, 4)):
+        assert wins[user_id] / 8000 == pytest.approx(tickets / 10, abs=0.02)
+
+
+def test_sampler_returns_everyone_when_fewer_entries_than_winners() -> None:
+    sampler = WeightedSampler(winners=3, seed=7)
+    sampler.add([5, 6], [0, 4])
+    sampler.add([], [])
+
+    assert sorted(sampler.result()) == [5, 6]
+    assert (sampler.entries, sampler.tickets) == (2, 6)
+
+
+def test_engine_streams_entries_and_attaches_wallets() -> None:
+    engine = DrawEngine(FakeRepository({user_id: user_id % 4 for user_id in range(1, 11)}), winners=3, chunk_size=4)
+
+    result = asyncio.run(engine.draw(event_id=1, seed=99))
+    again = asyncio.run(engine.draw(event_id=1, seed=99))
+
+    assert (result.entries, result.tickets, result.seed) == (10, 10 + sum(u % 4 for u in range(1, 11)), 99)
+    assert [w["user_id"] for w in result.winners] == [w["user_id"] for w in again.winners]
+    assert all(w["wallet_address"] == f"wallet_{w['user_id']}" for w in result.winners)
+    assert asyncio.run(engine.draw(event_id=1)).seed >= 0
@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+from amazo_bot.handlers.jobs import EventJobs, expiry_job_name
+from amazo_bot.services.leaderboard_service import LeaderboardService
+
+
+class FakeJob:
+    def __init__(self, callback, when: float, data: object, name: str) -> None:
+        self.callback = callback
+        self.when = when
+        self.data = data
+        self.name = name
+        self.removed = False
+
+    def schedule_removal(self) -> None:
+        self.removed = True
+
+
+class FakeJobQueue:
+    def __init__(self) -> None:
+        self.jobs: list[FakeJob] = []
+
+    def run_once(self, callback, when: float, data: object = None, name: str | None = None) -> FakeJob:
+        job = FakeJob(callback, when, data, name)
+        self.jobs.append(job)
+        return job
+
+    def get_jobs_by_name(self, name: str) -> list[FakeJob]:
+        return [job for job in self.jobs if job.name == name and not job.removed]
+
+
+class FakeGiveawayService:
+    def __init__(self, fail: bool = False, events: list[dict] | None = None) -> None:
+        self.fail = fail
+        self.expired: list[int] = []
+        self.events = events or []
+
+    async def get_active_events(self) -> list[dict]:
+        return self.events
+
+    async def expire_event(self, event_id: int) -> None:
+        if self.fail:
+            raise RuntimeError("backend down")
+        self.expired.append(event_id)
+
+
+def test_schedule_expiry_replaces_existing_timer() -> None:
+    queue = FakeJobQueue()
+    jobs = EventJobs(FakeGiveawayService(), LeaderboardService(None), queue)
+    event = {"id": 3, "end_date": "2999-01-01T23:59:59Z"}
+
+    jobs.schedule_expiry(event)
+    jobs.schedule_expiry(event)
+
+    live = queue.get_jobs_by_name(expiry_job_name(3))
+    assert len(live) == 1
+    assert live[0].when > 0
+
+
+def test_past_end_date_expires_immediately() -> None:
+    queue = FakeJobQueue()
+    jobs = EventJobs(FakeGiveawayService(), LeaderboardService(None), queue)
+
+    jobs.schedule_expiry({"id": 3, "end_date": "2000-01-01T23:59:59Z"})
+
+    assert queue.jobs[0].when == 0.0
+
+
+def test_expire_job_retries_on_failure() -> None:
+    queue = FakeJobQueue()
+    service = FakeGiveawayService(fail=True)
+    jobs = EventJobs(service, LeaderboardService(None), queue)
+
+    asyncio.run(jobs.expire_event(SimpleNamespace(job=SimpleNamespace(data=3))))
+
+    assert [job.data for job in queue.jobs] == [3]
+
+    service.fail = False
+    asyncio.run(jobs.expire_event(SimpleNamespace(job=SimpleNamespace(data=3))))
+
+    assert service.expired == [3]
+
+
+class FlakyLeaderboard:
+    def __init__(self, failing: int) -> None:
+        self.failing = failing
+        self.reconciled: list[int] = []
+
+    async def reconcile(self, event_id: int) -> int:
+        if event_id == self.failing:
+            raise RuntimeError("backend down")
+        self.reconciled.append(event_id)
+        return 0
+
+
+def test_reconcile_covers_every_running_event() -> None:
+    leaderboard = FlakyLeaderboard(failing=2)
+    service = FakeGiveawayService(events=[{"id": 1}, {"id": 2}, {"id": 3}])
+    jobs = EventJobs(service, leaderboard, FakeJobQueue())
+
+    asyncio.run(jobs.reconcile_leaderboard(SimpleNamespace()))
+
+    # One event failing does not hold the others back.
+    assert leaderboard.reconciled == [1, 3]
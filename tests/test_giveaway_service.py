@@ -0,0 +1,142 @@
+import asyncio
+
+from amazo_bot.services.giveaway_service import GiveawayService
+
+
+class FakeEventStore:
+    def __init__(self, *events: dict) -> None:
+        self.events = list(events)
+        self.fetches = 0
+        self.deactivated: list[int] = []
+
+    async def fetch_active_event_records(self):
+        self.fetches += 1
+        return [event for event in self.events if event["id"] not in self.deactivated]
+
+    async def set_event_active_state(self, event_id: int, is_active: bool) -> None:
+        self.deactivated.append(event_id)
+
+
+LIVE_EVENT = {"id": 7, "name": "Spring", "end_date": "2999-01-01T23:59:59Z", "is_active": True}
+
+
+def test_active_event_is_cached_within_ttl() -> None:
+    store = FakeEventStore(LIVE_EVENT)
+    service = GiveawayService(store, cache_ttl=60)
+
+    async def run() -> None:
+        for _ in range(5):
+            assert await service.get_active_event() == LIVE_EVENT
+
+    asyncio.run(run())
+
+    assert store.fetches == 1
+    assert (service.cache_hits, service.cache_misses) == (4, 1)
+
+
+def test_invalidate_forces_refetch() -> None:
+    store = FakeEventStore(LIVE_EVENT)
+    service = GiveawayService(store, cache_ttl=60)
+
+    async def run() -> None:
+        await service.get_active_event()
+        service.invalidate_active_event()
+        store.events = []
+        assert await service.get_active_event() is None
+
+    asyncio.run(run())
+
+    assert store.fetches == 2
+
+
+def test_invalidation_reaches_a_peer_cache() -> None:
+    store = FakeEventStore(LIVE_EVENT)
+    admin_worker = GiveawayService(store, cache_ttl=60)
+    other_worker = GiveawayService(store, cache_ttl=60)
+    admin_worker.on_change = other_worker.apply_change
+    new_event = {**LIVE_EVENT, "id": 8, "end_date": "2999-06-01T23:59:59Z"}
+
+    async def run() -> list[int]:
+        await other_worker.get_active_events()
+        store.events.append(new_event)
+        admin_worker.invalidate_active_event()
+        return [event["id"] for event in await other_worker.get_active_events()]
+
+    assert asyncio.run(run()) == [7, 8]
+    assert other_worker.cache_misses == 2
+
+
+def test_zero_ttl_disables_cache() -> None:
+    store = FakeEventStore(LIVE_EVENT)
+    service = GiveawayService(store, cache_ttl=0)
+
+    async def run() -> None:
+        await service.get_active_event()
+        await service.get_active_event()
+
+    asyncio.run(run())
+
+    assert store.fetches == 2
+
+
+def test_read_path_never_writes_after_end_date() -> None:
+    store = FakeEventStore({**LIVE_EVENT, "end_date": "2000-01-01T23:59:59Z"})
+    service = GiveawayService(store, cache_ttl=60)
+
+    asyncio.run(service.get_active_event())
+
+    assert store.deactivated == []
+
+
+def test_expire_event_deactivates_once_and_reloads() -> None:
+    store = FakeEventStore(LIVE_EVENT)
+    service = GiveawayService(store, cache_ttl=60)
+
+    async def run() -> None:
+        await service.get_active_event()
+        assert await service.expire_event(7) is None
+        assert await service.expire_event(7) is None
+        assert await service.get_active_event() is None
+
+    asyncio.run(run())
+
+    assert store.deactivated == [7]
+
+
+def test_on_event_loaded_fires_once_per_new_event() -> None:
+    store = FakeEventStore(LIVE_EVENT)
+    service = GiveawayService(store, cache_ttl=0)
+    loaded: list[int] = []
+    service.on_event_loaded = lambda event: loaded.append(event["id"])
+
+    async def run() -> None:
+        await service.get_active_event()
+        await service.get_active_event()
+        store.events = [{**LIVE_EVENT, "id": 8}]
+        await service.get_active_event()
+
+    asyncio.run(run())
+
+    assert loaded == [7, 8]
+
+
+def test_concurrent_events_share_one_query() -> None:
+    regional = {**LIVE_EVENT, "id": 8, "name": "Summer"}
+    store = FakeEventStore(LIVE_EVENT, regional)
+    service = GiveawayService(store, cache_ttl=60)
+    loaded: list[int] = []
+    service.on_event_loaded = lambda event: loaded.append(event["id"])
+
+    async def run() -> None:
+        assert await service.get_active_events() == [LIVE_EVENT, regional]
+        assert await service.get_active_event(8) == regional
+        assert await service.get_active_event(9) is None
+        assert await service.get_active_event() == LIVE_EVENT
+        assert await service.expire_event(7) == regional
+        assert await service.get_active_events() == [regional]
+
+    asyncio.run(run())
+
+    assert loaded == [7, 8]
+    assert store.deactivated == [7]
+    assert store.fetches == 2
@@ -1,6 +1,6 @@
 import pytest
 
-from amazo_bot.handlers.common import parse_referral_arg
+from amazo_bot.handlers.common import parse_broadcast_args, parse_event_arg, parse_perf_args, parse_referral_arg
 
 
 @pytest.mark.parametrize(
@@ -10,9 +10,63 @@ from amazo_bot.handlers.common import parse_referral_arg
         (["abc"], None),
         (["-2"], None),
         (["0"], None),
-        (["123"], 123),
+        (["123"], (123, None)),
+        (["123_7"], (123, 7)),
+        (["123_x"], None),
+        (["123_0"], None),
+        (["_7"], None),
     ],
 )
-def test_parse_referral_arg(args: list[str], expected: int | None) -> None:
+def test_parse_referral_arg(args: list[str], expected: tuple[int, int | None] | None) -> None:
     assert parse_referral_arg(args) == expected
 
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [(None, None), ("", None), ("lb", None), ("-1", None), ("0", None), ("12", 12)],
+)
+def test_parse_event_arg(value: str | None, expected: int | None) -> None:
+    assert parse_event_arg(value) == expected
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        ([], (False, None, 0, "")),
+        (["hello", "world"], (False, None, 0, "hello world")),
+        (["--active", "hi"], (True, None, 0, "hi")),
+        (["--min-refs=5", "--active", "hi", "--there"], (True, None, 5, "hi --there")),
+        (["--event=3", "hi"], (False, 3, 0, "hi")),
+    ],
+)
+def test_parse_broadcast_args(args: list[str], expected: tuple[bool, int | None, int, str]) -> None:
+    assert parse_broadcast_args(args) == expected
+
+
+@pytest.mark.parametrize(
+    "args", [["--min-refs=x", "hi"], ["--min-refs=-1", "hi"], ["--all", "hi"], ["--event=x", "hi"]]
+)
+def test_parse_broadcast_args_rejects_bad_options(args: list[str]) -> None:
+    with pytest.raises(ValueError):
+        parse_broadcast_args(args)
+
+
+@pytest.mark.parametrize(
+    ("args", "expected"),
+    [
+        ([], ("profile", 10.0)),
+        (["30"], ("profile", 30.0)),
+        (["status"], ("status", None)),
+        (["lag", "on"], ("lag", 0.1)),
+        (["slow", "ON", "250"], ("slow", 0.25)),
+        (["lag", "off"], ("lag", None)),
+    ],
+)
+def test_parse_perf_args(args: list[str], expected: tuple[str, float | None]) -> None:
+    assert parse_perf_args(args) == expected
+
+
+@pytest.mark.parametrize("args", [["0"], ["nan"], ["lag"], ["lag", "off", "5"], ["slow", "on", "-1"], ["30", "x"]])
+def test_parse_perf_args_rejects_bad_arguments(args: list[str]) -> None:
+    with pytest.raises(ValueError):
+        parse_perf_args(args)
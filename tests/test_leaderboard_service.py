@@ -0,0 +1,130 @@
+import asyncio
+import random
+
+from amazo_bot.services.leaderboard_service import LeaderboardIndex, LeaderboardService
+from amazo_bot.services.write_behind import WriteBehindBuffer
+
+
+def brute_rank(counts: dict[int, int], user_id: int) -> int:
+    return 1 + sum(1 for count in counts.values() if count > counts[user_id])
+
+
+def test_index_matches_brute_force_under_random_updates() -> None:
+    rng = random.Random(7)
+    index = LeaderboardIndex()
+    counts: dict[int, int] = {}
+    for user_id in range(1, 501):
+        counts[user_id] = rng.randint(0, 5)
+        index.set(user_id, f"user_{user_id}", counts[user_id])
+    for _ in range(5000):
+        user_id = rng.randint(1, 500)
+        amount = rng.randint(1, 40)
+        counts[user_id] += amount
+        index.add_referrals(user_id, amount)
+
+    for user_id in rng.sample(range(1, 501), 50):
+        assert index.rank(user_id) == brute_rank(counts, user_id)
+    top = index.top(10)
+    assert [row["referral_count"] for row in top] == sorted(counts.values(), reverse=True)[:10]
+
+
+def test_top_breaks_ties_by_who_got_there_first() -> None:
+    index = LeaderboardIndex()
+    for user_id in (1, 2, 3):
+        index.set(user_id, f"user_{user_id}", 0)
+    index.add_referrals(2)
+    index.add_referrals(1)
+
+    assert [row["user_id"] for row in index.top(3)] == [2, 1, 3]
+    assert index.rank(1) == index.rank(2) == 1
+    assert index.rank(3) == 3
+
+
+class FakeEntries:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.scans = 0
+        # Runs between the first and second page of a scan.
+        self.mid_scan = None
+
+    async def iter_event_entries(self, event_id: int, page_size: int = 1000):
+        self.scans += 1
+        rows = [dict(row) for row in self.rows]
+        yield rows[:1]
+        if self.mid_scan:
+            self.mid_scan()
+        yield rows[1:]
+
+
+def test_service_seeds_once_and_updates_incrementally() -> None:
+    store = FakeEntries([{"user_id": 1, "username": "a", "referral_count": 2}])
+    service = LeaderboardService(store)
+
+    async def run() -> None:
+        await service.top(5, limit=10)
+        service.record_entry(5, 2, "b")
+        service.record_referral(5, 2, amount=3)
+        rows = await service.top(5, limit=10)
+        assert [(row["username"], row["referral_count"]) for row in rows] == [("b", 3), ("a", 2)]
+        assert await service.rank(5, 1) == (2, 2)
+
+    asyncio.run(run())
+
+    assert store.scans == 1
+
+
+def test_changes_recorded_on_one_service_apply_to_a_peer() -> None:
+    store = FakeEntries([{"user_id": 1, "username": "a", "referral_count": 0}])
+    recruit_worker = LeaderboardService(store)
+    referrer_worker = LeaderboardService(store)
+    recruit_worker.on_change = referrer_worker.apply_change
+
+    async def run() -> tuple[int | None, int]:
+        await referrer_worker.get_index(5)
+        recruit_worker.record_entry(5, 2, "b")
+        recruit_worker.record_referral(5, 1)
+        return await referrer_worker.rank(5, 1)
+
+    assert asyncio.run(run()) == (1, 2)
+    assert referrer_worker._indexes[5].referral_count(1) == 1
+    # The recruit's worker had no index yet; it seeds from the database on first read.
+    assert 5 not in recruit_worker._indexes
+
+
+def test_reconcile_reports_and_fixes_drift() -> None:
+    store = FakeEntries([{"user_id": 1, "username": "a", "referral_count": 2}])
+    service = LeaderboardService(store)
+
+    async def run() -> None:
+        await service.get_index(5)
+        service.record_referral(5, 1, amount=10)
+        assert await service.reconcile(5) == 1
+        assert (await service.top(5))[0]["referral_count"] == 2
+
+    asyncio.run(run())
+
+
+def test_reconcile_keeps_entries_not_yet_written(tmp_path) -> None:
+    store = FakeEntries([{"user_id": 1, "username": "a", "referral_count": 2}, {"user_id": 4, "username": "d"}])
+    buffer = WriteBehindBuffer(store, spill_path=str(tmp_path / "spill.jsonl"))
+    service = LeaderboardService(store, pending_entries=buffer.pending_entries)
+
+    def register(user_id: int, referrer: int | None) -> None:
+        # What save_wallet does: queue the row, then update the index.
+        buffer.enqueue_entry(
+            user_id=user_id, event_id=5, username=f"u{user_id}", wallet_address="w", referred_by=referrer
+        )
+        service.record_entry(5, user_id, f"u{user_id}", referrer)
+
+    async def run() -> int:
+        await service.get_index(5)
+        register(2, referrer=1)
+        # Registers while the rebuild is between pages.
+        store.mid_scan = lambda: register(3, referrer=1)
+        return await service.reconcile(5)
+
+    assert asyncio.run(run()) == 0
+    index = service._indexes[5]
+    assert 2 in index and 3 in index
+    assert index.referral_count(1) == 4
+    assert buffer.stats.queue_depth == 2
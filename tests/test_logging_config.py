@@ -0,0 +1,123 @@
+import io
+import json
+import logging
+import threading
+import time
+
+from telegram.error import Forbidden
+
+from amazo_bot.logging_config import ErrorAggregator, JsonFormatter, LogPipeline
+
+# Caller-side cost per record, measured at ~20 us (exception) and ~15 us (info)
+# by benchmarks/logging_overhead.py; the synchronous handler paid ~450 us per
+# exception. The bounds leave headroom for slow CI machines.
+EXCEPTION_BUDGET_US = 150
+INFO_BUDGET_US = 75
+
+
+class ThreadRecordingFormatter(JsonFormatter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.threads: set[str] = set()
+
+    def format(self, record: logging.LogRecord) -> str:
+        self.threads.add(threading.current_thread().name)
+        return super().format(record)
+
+
+def make_pipeline(name: str, formatter: logging.Formatter | None = None, **aggregator_kwargs):
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(formatter or JsonFormatter())
+    pipeline = LogPipeline(output, ErrorAggregator(**aggregator_kwargs))
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [pipeline.enqueue_handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    pipeline.start()
+    return pipeline, logger, stream
+
+
+def blocked_send(user_id: int) -> None:
+    raise Forbidden("bot was blocked by the user")
+
+
+def test_json_lines_carry_extra_fields_and_errors() -> None:
+    pipeline, logger, stream = make_pipeline("test.json")
+
+    logger.info("Handled update_id=%s", 7, extra={"handler": "start"})
+    try:
+        blocked_send(1)
+    except Forbidden:
+        logger.exception("Broadcast failed for user_id=%s", 1)
+    pipeline.stop()
+
+    info, error = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert info["message"] == "Handled update_id=7"
+    assert info["level"] == "INFO"
+    assert info["logger"] == "test.json"
+    assert info["handler"] == "start"
+    assert error["error"] == "Forbidden: bot was blocked by the user"
+    assert "blocked_send" in error["traceback"]
+
+
+def test_repeated_errors_are_aggregated_into_one_summary() -> None:
+    formatter = ThreadRecordingFormatter()
+    pipeline, logger, stream = make_pipeline("test.aggregate", formatter, window=60.0)
+
+    for user_id in range(1235):
+        try:
+            blocked_send(user_id)
+        except Forbidden:
+            logger.exception("Broadcast failed for user_id=%s", user_id)
+    logger.warning("Broadcast hit flood control; pausing for %.1fs", 3.0)
+    pipeline.stop()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == [
+        "Broadcast failed for user_id=0",
+        "Broadcast hit flood control; pausing for 3.0s",
+        "1,234 × Forbidden: bot was blocked by the user",
+    ]
+    assert lines[-1]["aggregated"] == 1234
+    assert lines[-1]["example"] == "Broadcast failed for user_id=1234"
+    # Tracebacks are formatted off the calling thread.
+    assert formatter.threads == {"log-writer"}
+
+
+def test_aggregation_window_reopens() -> None:
+    aggregator = ErrorAggregator(window=10.0)
+
+    def record(created: float) -> logging.LogRecord:
+        entry = logging.LogRecord("test", logging.ERROR, __file__, 1, "Send failed", None, None)
+        entry.created = created
+        return entry
+
+    assert aggregator.admit(record(100.0)) is True
+    assert aggregator.admit(record(101.0)) is False
+    assert aggregator.due(now=105.0) == []
+    [summary] = aggregator.due(now=111.0)
+    assert summary.getMessage() == "1 × Send failed"
+    assert aggregator.admit(record(112.0)) is True
+
+
+def test_logging_overhead_per_record_is_bounded() -> None:
+    pipeline, logger, _ = make_pipeline("test.overhead")
+    records = 2000
+
+    started = time.perf_counter()
+    for user_id in range(records):
+        try:
+            blocked_send(user_id)
+        except Forbidden:
+            logger.exception("Broadcast failed for user_id=%s", user_id)
+    exception_us = (time.perf_counter() - started) * 1e6 / records
+
+    started = time.perf_counter()
+    for update_id in range(records):
+        logger.info("Handled update_id=%s", update_id)
+    info_us = (time.perf_counter() - started) * 1e6 / records
+    pipeline.stop()
+
+    assert exception_us < EXCEPTION_BUDGET_US
+    assert info_us < INFO_BUDGET_US
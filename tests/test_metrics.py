@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from telegram.request import BaseRequest
+
+from amazo_bot.metrics import (
+    HANDLER_ERRORS,
+    HANDLER_SECONDS,
+    REPOSITORY_SECONDS,
+    TELEGRAM_SECONDS,
+    InstrumentedRequest,
+    MetricsRegistry,
+    instrument_handler,
+    instrument_repository,
+)
+from amazo_bot.monitoring import HealthMonitor
+from amazo_bot.webhook import create_monitoring_app
+
+
+class FakeRepository:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.delay = delay
+        self.fail = fail
+
+    async def fetch_active_event_record(self):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("backend down")
+        return {"id": 1}
+
+    async def iter_event_entries(self, event_id: int, page_size: int = 1000):
+        for start in range(0, 5, page_size):
+            yield [{"user_id": user_id} for user_id in range(start, min(start + page_size, 5))]
+
+    def close(self) -> None:
+        return None
+
+
+class FakeRequest(BaseRequest):
+    @property
+    def read_timeout(self):
+        return 5.0
+
+    async def initialize(self) -> None:
+        return None
+
+    async def shutdown(self) -> None:
+        return None
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        return 200, b'{"ok": true, "result": true}'
+
+
+def get(web_app, path: str) -> httpx.Response:
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=web_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot.local") as client:
+            return await client.get(path)
+
+    return asyncio.run(run())
+
+
+def test_registry_renders_prometheus_text() -> None:
+    registry = MetricsRegistry()
+    calls = registry.counter("demo_calls_total", "Calls.", ("method",))
+    latency = registry.histogram("demo_seconds", "Latency.", ("method",), buckets=(0.1, 1.0))
+    registry.gauge("demo_depth", "Depth.", callback=lambda: 3)
+
+    calls.inc(method='say "hi"')
+    latency.observe(0.05, method="get")
+    latency.observe(0.5, method="get")
+    latency.observe(5.0, method="get")
+
+    text = registry.render()
+    assert "# TYPE demo_calls_total counter" in text
+    assert 'demo_calls_total{method="say \\"hi\\""} 1' in text
+    assert 'demo_seconds_bucket{method="get",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{method="get",le="1"} 2' in text
+    assert 'demo_seconds_bucket{method="get",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{method="get"} 3' in text
+    assert 'demo_seconds_sum{method="get"} 5.55' in text
+    assert "demo_depth 3" in text
+
+
+def test_instrumented_handler_times_calls_and_counts_errors() -> None:
+    async def demo_handler(update, context):
+        return "next_state"
+
+    async def broken_handler(update, context):
+        raise RuntimeError("boom")
+
+    before = HANDLER_SECONDS.count(handler="demo_handler")
+    assert asyncio.run(instrument_handler(demo_handler)(None, None)) == "next_state"
+    assert HANDLER_SECONDS.count(handler="demo_handler") == before + 1
+    assert instrument_handler(demo_handler).__name__ == "demo_handler"
+
+    errors = HANDLER_ERRORS.value(handler="broken_handler")
+    with pytest.raises(RuntimeError):
+        asyncio.run(instrument_handler(broken_handler)(None, None))
+    assert HANDLER_ERRORS.value(handler="broken_handler") == errors + 1
+
+
+def test_instrumented_repository_times_calls_and_pages() -> None:
+    repository = instrument_repository(FakeRepository())
+    calls = REPOSITORY_SECONDS.count(method="fetch_active_event_record")
+    pages = REPOSITORY_SECONDS.count(method="iter_event_entries")
+
+    async def run() -> list[list[dict]]:
+        assert await repository.fetch_active_event_record() == {"id": 1}
+        return [page async for page in repository.iter_event_entries(1, page_size=2)]
+
+    result = asyncio.run(run())
+
+    assert [len(page) for page in result] == [2, 2, 1]
+    assert REPOSITORY_SECONDS.count(method="fetch_active_event_record") == calls + 1
+    # One observation per page plus the final empty fetch.
+    assert REPOSITORY_SECONDS.count(method="iter_event_entries") == pages + 4
+    repository.close()
+
+
+def test_instrumented_request_times_by_api_method() -> None:
+    request = InstrumentedRequest(FakeRequest())
+    before = TELEGRAM_SECONDS.count(method="sendMessage")
+
+    result = asyncio.run(request.post("https://api.telegram.org/bot1:T/sendMessage"))
+
+    assert result is True
+    assert TELEGRAM_SECONDS.count(method="sendMessage") == before + 1
+
+
+def test_health_reports_backend_and_loop_lag() -> None:
+    async def run(repository: FakeRepository, **kwargs) -> HealthMonitor:
+        monitor = HealthMonitor(repository, lag_interval=0.01, **kwargs)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        return monitor
+
+    healthy = asyncio.run(run(FakeRepository()))
+    assert healthy.status()["status"] == "ok"
+    assert healthy.status()["backend"]["up"] is True
+
+    down = asyncio.run(run(FakeRepository(fail=True)))
+    assert down.status()["status"] == "degraded"
+    assert "backend down" in down.status()["backend"]["error"]
+
+    slow = asyncio.run(run(FakeRepository(delay=1.0), probe_timeout=0.01))
+    assert slow.healthy is False
+    assert "TimeoutError" in slow.status()["backend"]["error"]
+
+
+def test_health_reports_a_blocked_event_loop() -> None:
+    async def run() -> HealthMonitor:
+        monitor = HealthMonitor(FakeRepository(), lag_interval=0.01, max_lag=0.05)
+        monitor.start()
+        await asyncio.sleep(0.03)
+        time.sleep(0.2)  # A handler blocking the loop.
+        await asyncio.sleep(0.001)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+
+    assert monitor.loop_lag >= 0.15
+    assert monitor.status()["status"] == "degraded"
+    assert monitor.status()["event_loop"]["max_lag_ms"] >= 150
+
+
+def test_monitoring_app_serves_health_and_metrics() -> None:
+    monitor = HealthMonitor(FakeRepository(fail=True))
+    web_app = create_monitoring_app(monitor)
+
+    assert get(web_app, "/health").status_code == 503
+    assert get(web_app, "/health").json()["status"] == "starting"
+
+    asyncio.run(monitor.probe_backend())
+    assert get(web_app, "/health").status_code == 503
+    monitor.repository = FakeRepository()
+    asyncio.run(monitor.probe_backend())
+    assert get(web_app, "/health").status_code == 200
+
+    metrics = get(web_app, "/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert "amazo_backend_up 1" in metrics.text
+    assert "# TYPE amazo_handler_duration_seconds histogram" in metrics.text
@@ -0,0 +1,199 @@
+import asyncio
+import sqlite3
+import time
+from typing import Any
+
+from telegram import Update
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ConversationHandler, TypeHandler
+from amazo_bot.persistence import SQLitePersistence
+from benchmarks.local_bot_api import LocalBotRequest, callback_update, message_update
+
+TERMS, WALLET = 0, 1
+
+
+def command(app: Application, update_id: int, user_id: int, text: str) -> Update:
+    return Update.de_json(message_update(update_id, user_id, text), app.bot)
+
+
+def accept(app: Application, update_id: int, user_id: int) -> Update:
+    return Update.de_json(callback_update(update_id, user_id, "accept_terms"), app.bot)
+
+
+def make_app(persistence: SQLitePersistence, seen: list[tuple[int, Any]]) -> Application:
+    async def start(update, context) -> None:
+        if context.args:
+            context.user_data["referred_by"] = int(context.args[0])
+
+    async def enter(update, context) -> int:
+        context.user_data["current_event_id"] = 7
+        return TERMS
+
+    async def terms(update, context) -> int:
+        seen.append((update.effective_user.id, dict(context.user_data)))
+        return WALLET
+
+    async def touch(update, context) -> None:
+        return None
+
+    app = (
+        Application.builder()
+        .token("1:TEST")
+        .request(LocalBotRequest())
+        .updater(None)
+        .persistence(persistence)
+        .build()
+    )
+    app.add_handler(TypeHandler(Update, touch), group=-1)
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(
+        ConversationHandler(
+            entry_points=[CommandHandler("enter", enter)],
+            states={TERMS: [CallbackQueryHandler(terms, pattern="^accept_terms$")]},
+            fallbacks=[],
+            name="enter",
+            persistent=True,
+        )
+    )
+    return app
+
+
+def test_conversations_and_referrals_survive_a_restart(tmp_path) -> None:
+    path = str(tmp_path / "state.db")
+    seen: list[tuple[int, Any]] = []
+
+    async def before_restart() -> None:
+        app = make_app(SQLitePersistence(path), seen)
+        async with app:
+            await app.process_update(command(app, 1, 42, "/start 9"))
+            await app.process_update(command(app, 2, 42, "/enter"))
+
+    async def after_restart() -> None:
+        app = make_app(SQLitePersistence(path), seen)
+        async with app:
+            await app.process_update(accept(app, 3, 42))
+
+    asyncio.run(before_restart())
+    asyncio.run(after_restart())
+
+    assert seen == [(42, {"referred_by": 9, "current_event_id": 7})]
+
+
+def test_changes_are_written_in_batches(tmp_path) -> None:
+    path = str(tmp_path / "state.db")
+    persistence = SQLitePersistence(path, update_interval=3600)
+
+    async def run() -> tuple[int, int]:
+        app = make_app(persistence, [])
+        async with app:
+            for user_id in range(100):
+                await app.process_update(command(app, user_id, user_id, "/start 9"))
+            rows_before = sqlite3.connect(path).execute("select count(*) from user_data").fetchone()[0]
+            await app.update_persistence()
+            await persistence.wait_written()
+            rows_after = sqlite3.connect(path).execute("select count(*) from user_data").fetchone()[0]
+        return rows_before, rows_after
+
+    assert asyncio.run(run()) == (0, 100)
+
+
+def test_idle_and_excess_users_leave_memory_but_not_disk(tmp_path) -> None:
+    persistence = SQLitePersistence(str(tmp_path / "state.db"), idle_ttl=3600, max_users=10)
+    seen: list[tuple[int, Any]] = []
+
+    async def run() -> None:
+        app = make_app(persistence, seen)
+        async with app:
+            for user_id in range(100, 150):
+                await app.process_update(command(app, user_id, user_id, "/start 9"))
+            await app.update_persistence()
+
+            assert persistence.evict(app) == 40
+            await app.update_persistence()
+            assert persistence.resident_users == len(app.user_data) == 10
+
+            # A returning user gets their state back from disk.
+            await app.process_update(command(app, 1000, 100, "/enter"))
+            await app.process_update(accept(app, 1001, 100))
+
+            loop_now = asyncio.get_running_loop().time()
+            assert persistence.evict(app, now=loop_now + 10**9) == 11
+            assert len(app.user_data) == 0
+
+    asyncio.run(run())
+
+    assert seen == [(100, {"referred_by": 9, "current_event_id": 7})]
+
+
+def test_user_returning_before_the_drop_is_persisted_keeps_changes(tmp_path) -> None:
+    persistence = SQLitePersistence(str(tmp_path / "state.db"), idle_ttl=0)
+    seen: list[tuple[int, Any]] = []
+
+    async def run() -> None:
+        app = make_app(persistence, seen)
+        async with app:
+            await app.process_update(command(app, 1, 5, "/start 9"))
+            await app.update_persistence()
+            persistence.evict(app)
+            # Back before PTB handed the drop over: PTB skips this update.
+            await app.process_update(command(app, 2, 5, "/enter"))
+            await app.update_persistence()
+            persistence.evict(app)
+            await app.update_persistence()
+            await app.process_update(accept(app, 3, 5))
+
+    asyncio.run(run())
+
+    assert seen == [(5, {"referred_by": 9, "current_event_id": 7})]
+
+
+def test_expired_conversations_are_not_restored(tmp_path) -> None:
+    path = str(tmp_path / "state.db")
+    seen: list[tuple[int, Any]] = []
+
+    async def before_restart() -> None:
+        app = make_app(SQLitePersistence(path), seen)
+        async with app:
+            await app.process_update(command(app, 1, 42, "/enter"))
+
+    asyncio.run(before_restart())
+    with sqlite3.connect(path) as conn:
+        conn.execute("update conversations set updated_at = updated_at - 700")
+
+    async def after_restart() -> None:
+        app = make_app(SQLitePersistence(path, conversation_ttl=600), seen)
+        async with app:
+            await app.process_update(accept(app, 2, 42))
+
+    asyncio.run(after_restart())
+
+    assert seen == []
+
+
+def test_a_slow_disk_does_not_block_the_event_loop(tmp_path) -> None:
+    persistence = SQLitePersistence(str(tmp_path / "state.db"))
+    load_user = persistence._load_user
+
+    def slow_load_user(user_id: int):
+        time.sleep(0.3)
+        return load_user(user_id)
+
+    persistence._load_user = slow_load_user
+
+    async def run() -> int:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        app = make_app(persistence, [])
+        async with app:
+            ticker = asyncio.create_task(tick())
+            await app.process_update(command(app, 1, 42, "/start 9"))
+            ticker.cancel()
+        return ticks
+
+    # The user's row is read on the database thread while the loop keeps running.
+    assert asyncio.run(run()) >= 10
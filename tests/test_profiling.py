@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from types import SimpleNamespace
+
+from amazo_bot.handlers.admin import AdminHandlers
+from amazo_bot.profiling import EVENT_LOOP_STALLS, LoopProfiler
+
+
+def block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_profile_reports_what_the_loop_was_running() -> None:
+    profiler = LoopProfiler(interval=0.005)
+
+    async def run():
+        async def busy() -> None:
+            await asyncio.sleep(0.2)
+            spin(0.5)
+
+        task = asyncio.create_task(busy())
+        report = await profiler.profile(1.0)
+        await task
+        return report
+
+    report = asyncio.run(run())
+
+    assert report.samples > 50
+    assert 0.2 < report.busy_share < 0.9
+    hottest, own, total = report.top(1)[0]
+    assert hottest.startswith("spin (") and own == total
+    assert any("spin (" in line and line.rsplit(" ", 1)[1].isdigit() for line in report.collapsed().splitlines())
+    assert "spin (" in report.summary()
+    assert not profiler.is_profiling
+
+
+def test_stall_watch_logs_the_blocking_stack(caplog) -> None:
+    profiler = LoopProfiler()
+    stalls_before = EVENT_LOOP_STALLS.value()
+
+    async def run() -> None:
+        profiler.watch_stalls(0.05)
+        await asyncio.sleep(0.1)
+        block_the_loop(0.3)
+        await asyncio.sleep(0.1)
+        await profiler.close()
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(run())
+
+    stalls = [record.getMessage() for record in caplog.records if "Event loop blocked" in record.getMessage()]
+    assert len(stalls) == 1 and "block_the_loop" in stalls[0]
+    assert EVENT_LOOP_STALLS.value() == stalls_before + 1
+    assert profiler.stall_threshold is None
+
+
+def test_slow_callback_detection_toggles_asyncio_debug() -> None:
+    profiler = LoopProfiler()
+
+    async def run() -> list[bool]:
+        loop = asyncio.get_running_loop()
+        profiler.watch_slow_callbacks(0.2)
+        on = loop.get_debug() and loop.slow_callback_duration == 0.2
+        profiler.watch_slow_callbacks(None)
+        return [on, loop.get_debug()]
+
+    assert asyncio.run(run()) == [True, False]
+    assert "Slow callbacks: off" in profiler.status()
+
+
+class FakeMessage:
+    def __init__(self, user_id: int) -> None:
+        self.from_user = SimpleNamespace(id=user_id)
+        self.chat_id = user_id
+        self.replies: list[str] = []
+
+    async def reply_text(self, text: str, **kwargs) -> None:
+        self.replies.append(text)
+
+
+def make_admin_handlers(profiler: LoopProfiler) -> AdminHandlers:
+    return AdminHandlers(1, None, None, None, None, None, None, profiler)
+
+
+def test_perf_is_admin_only() -> None:
+    profiler = LoopProfiler()
+    handlers = make_admin_handlers(profiler)
+    stranger, admin = FakeMessage(2), FakeMessage(1)
+
+    async def run() -> None:
+        context = SimpleNamespace(args=["lag", "on", "250"])
+        await handlers.perf(SimpleNamespace(message=stranger, callback_query=None), context)
+        assert profiler.stall_threshold is None
+        await handlers.perf(SimpleNamespace(message=admin, callback_query=None), context)
+        assert profiler.stall_threshold == 0.25
+        await profiler.close()
+
+    asyncio.run(run())
+
+    assert stranger.replies == []
+    assert "Stall watch: on, 250 ms" in admin.replies[0]
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+from amazo_bot.services.rate_limit import TokenBucket
+
+
+def test_try_acquire_respects_capacity() -> None:
+    bucket = TokenBucket(rate=1, capacity=3)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_acquire_paces_to_rate() -> None:
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    async def run() -> float:
+        started = time.perf_counter()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) >= 0.09
+
+
+def test_pause_blocks_all_tokens() -> None:
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(60)
+
+    assert bucket.try_acquire() is False
@@ -0,0 +1,296 @@
+import asyncio
+import functools
+import sqlite3
+import time
+
+import pytest
+
+from amazo_bot.handlers.common import with_stale_note
+from amazo_bot.services.giveaway_service import GiveawayService
+from amazo_bot.services.leaderboard_service import LeaderboardService
+from amazo_bot.services.resilience import (
+    BackendUnavailable,
+    CircuitBreaker,
+    RetryBudget,
+    make_resilient,
+    stale_since,
+)
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+
+
+class FaultInjector:
+    # Wraps a real repository and injects faults: "down" raises a connection
+    # error, "hang" never answers, "timeout" raises asyncio.TimeoutError, and
+    # "fail_next" fails that many calls first.
+
+    def __init__(self, repository) -> None:
+        self.repository = repository
+        self.mode = "ok"
+        self.fail_next = 0
+        self.calls = 0
+
+    async def _fault(self) -> None:
+        self.calls += 1
+        if self.fail_next:
+            self.fail_next -= 1
+            raise ConnectionError("connection reset")
+        if self.mode == "down":
+            raise ConnectionError("connection refused")
+        if self.mode == "hang":
+            await asyncio.sleep(3600)
+        if self.mode == "timeout":
+            raise asyncio.TimeoutError()
+
+    def __getattr__(self, name):
+        attr = getattr(self.repository, name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            await self._fault()
+            return await attr(*args, **kwargs)
+
+        return call
+
+    async def iter_event_entries(self, *args, **kwargs):
+        async for page in self.repository.iter_event_entries(*args, **kwargs):
+            await self._fault()
+            yield page
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("amazo_bot.services.resilience.backoff_delay", lambda attempt: 0.0)
+
+
+def make(tmp_path, **kwargs):
+    backend = SQLiteRepository(str(tmp_path / "amazo.db"))
+    faults = FaultInjector(backend)
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=3, reset_timeout=0.1))
+    return backend, faults, make_resilient(faults, **kwargs)
+
+
+def seed(backend) -> None:
+    async def run():
+        await backend.new_event(1, "Launch", "2999-12-31")
+        await backend.register_entries(
+            [
+                {"user_id": 10, "event_id": 1, "username": "ann", "wallet_address": "w" * 40, "referred_by": None},
+                {"user_id": 11, "event_id": 1, "username": "bob", "wallet_address": "w" * 40, "referred_by": 10},
+            ]
+        )
+
+    asyncio.run(run())
+
+
+def test_transient_failures_are_retried(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=2)
+    seed(backend)
+    faults.fail_next = 2
+
+    event = asyncio.run(repository.fetch_active_event_record())
+
+    assert event["id"] == 1
+    assert faults.calls == 3
+    assert repository.breaker.state == "closed"
+    backend.close()
+
+
+def test_hanging_backend_times_out(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, timeout=0.02, max_retries=1)
+    faults.mode = "hang"
+
+    started = time.perf_counter()
+    with pytest.raises(BackendUnavailable, match="gave up after 2 attempts"):
+        asyncio.run(repository.get_event_stats(1))
+
+    assert time.perf_counter() - started < 1.0
+    assert faults.calls == 2
+    backend.close()
+
+
+def test_asyncio_timeouts_count_as_transient(tmp_path) -> None:
+    # On Python 3.10 wait_for raises asyncio.TimeoutError, which is not the builtin TimeoutError.
+    backend, faults, repository = make(tmp_path, max_retries=1)
+    seed(backend)
+
+    async def run():
+        fresh = await repository.get_event_stats(1)
+        faults.mode = "timeout"
+        return fresh, await repository.get_event_stats(1), stale_since()
+
+    fresh, fallback, marker = asyncio.run(run())
+
+    assert fallback == fresh and marker is not None
+    assert faults.calls == 1 + 2
+    assert repository.breaker.failures == 2
+    backend.close()
+
+
+def test_circuit_opens_fails_fast_and_recovers(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=0)
+    seed(backend)
+    faults.mode = "down"
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(BackendUnavailable):
+                await repository.get_user_history(10)
+        assert repository.breaker.state == "open"
+
+        calls = faults.calls
+        with pytest.raises(BackendUnavailable) as excinfo:
+            await repository.register_entry(12, 1, "cat", "w" * 40, None)
+        assert excinfo.value.reason == "circuit open"
+        assert excinfo.value.retry_after > 0
+        assert faults.calls == calls
+
+        faults.mode = "ok"
+        await asyncio.sleep(0.11)
+        history = await repository.get_user_history(10)
+        assert repository.breaker.state == "closed"
+        return history
+
+    assert len(asyncio.run(run())) == 1
+    backend.close()
+
+
+def test_half_open_failure_reopens(tmp_path) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+    time.sleep(0.06)
+    assert breaker.allow() is True
+    assert breaker.allow() is False  # Only one trial call at a time.
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_retry_budget_bounds_extra_load(tmp_path) -> None:
+    backend, faults, repository = make(
+        tmp_path,
+        max_retries=3,
+        breaker=CircuitBreaker(failure_threshold=1000),
+        budget=RetryBudget(ratio=0.1, reserve=2),
+    )
+    faults.mode = "down"
+
+    async def run():
+        for user_id in range(20):
+            with pytest.raises(BackendUnavailable):
+                await repository.get_user_history(user_id)
+
+    asyncio.run(run())
+
+    # 20 first attempts, 2 reserve retries and 0.1 per call earned: far below 20 * 4.
+    assert faults.calls <= 20 + 2 + 2
+    backend.close()
+
+
+def test_reads_fall_back_to_last_known_value(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=1)
+    seed(backend)
+
+    async def fresh():
+        history = await repository.get_user_history(user_id=10)
+        return history, stale_since()
+
+    history, marker = asyncio.run(fresh())
+    assert marker is None
+
+    faults.mode = "down"
+
+    async def during_outage():
+        history = await repository.get_user_history(10)
+        return history, stale_since(), with_stale_note("History")
+
+    stale_history, marker, text = asyncio.run(during_outage())
+    assert stale_history == history
+    assert marker is not None and marker <= time.time()
+    assert "not reachable" in text
+
+    with pytest.raises(BackendUnavailable):
+        asyncio.run(repository.get_user_history(11))
+    backend.close()
+
+
+def test_busy_event_does_not_evict_quiet_event_fallbacks(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=0, stale_capacity=5)
+    seed(backend)
+
+    async def run():
+        quiet = await repository.get_event_stats(event_id=1)
+        for user_id in range(100, 120):
+            await repository.get_user_entry_for_event(user_id=user_id, event_id=2)
+        faults.mode = "down"
+        return quiet, await repository.get_event_stats(event_id=1), stale_since()
+
+    quiet, fallback, marker = asyncio.run(run())
+
+    assert fallback == quiet and fallback.participants == 2
+    assert marker is not None
+    backend.close()
+
+
+def test_active_event_stays_stale_in_the_service_cache(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=0)
+    seed(backend)
+    service = GiveawayService(repository, cache_ttl=60.0)
+
+    async def run():
+        await service.refresh_active_event()
+        faults.mode = "down"
+        await service.refresh_active_event()
+
+        async def handler():
+            event = await service.get_active_event()
+            return event, stale_since()
+
+        return await asyncio.create_task(handler())
+
+    event, marker = asyncio.run(run())
+
+    assert event["id"] == 1
+    assert marker is not None
+    backend.close()
+
+
+def test_leaderboard_keeps_last_index_when_reconcile_fails(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=0)
+    seed(backend)
+    leaderboard = LeaderboardService(repository)
+
+    async def run():
+        await leaderboard.get_index(1)
+        faults.mode = "down"
+        with pytest.raises(BackendUnavailable):
+            await leaderboard.reconcile(1)
+
+        async def handler():
+            return await leaderboard.top(1), stale_since()
+
+        return await asyncio.create_task(handler())
+
+    top, marker = asyncio.run(run())
+
+    assert [row["user_id"] for row in top] == [10, 11]
+    assert marker is not None
+    backend.close()
+
+
+def test_caller_errors_are_not_retried_or_held_against_the_backend(tmp_path) -> None:
+    backend, faults, repository = make(tmp_path, max_retries=2)
+    seed(backend)
+
+    async def run():
+        for _ in range(5):
+            with pytest.raises(sqlite3.IntegrityError):
+                await repository.register_entry(10, 1, "ann", "w" * 40, None)
+
+    asyncio.run(run())
+
+    assert faults.calls == 5
+    assert repository.breaker.state == "closed"
+    backend.close()
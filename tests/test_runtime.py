@@ -0,0 +1,27 @@
+import asyncio
+
+from amazo_bot.runtime import BotRuntime
+
+
+def test_referral_link_uses_cached_bot_username() -> None:
+    runtime = BotRuntime()
+    runtime.set_bot_username("amazo_bot")
+
+    assert runtime.referral_link(42) == "https://t.me/amazo_bot?start=42"
+    assert runtime.referral_link(42, 7) == "https://t.me/amazo_bot?start=42_7"
+
+
+def test_warm_up_phases_and_first_update_are_timed() -> None:
+    runtime = BotRuntime()
+    with runtime.phase("active_event"):
+        pass
+    runtime.mark_ready()
+    assert "active_event" in runtime.warm_up_phases_ms
+    assert runtime.cold_start_ms is None
+
+    asyncio.run(runtime.record_update_served(None, None))
+    first = runtime.cold_start_ms
+    asyncio.run(runtime.record_update_served(None, None))
+
+    assert first is not None and first >= runtime.boot_to_ready_ms
+    assert runtime.cold_start_ms == first
@@ -0,0 +1,245 @@
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import httpx
+import uvicorn
+from telegram.ext import Application, MessageHandler, filters
+
+from amazo_bot.scaleout import ConsistentHashRing, UpdateDispatcher, update_partition_key
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+from benchmarks.fake_bot_api import FakeBotApi, create_app
+from benchmarks.local_bot_api import LocalBotRequest, message_update
+from benchmarks.scenarios import NEW_USER_BASE, enter_conversations
+
+ROOT = Path(__file__).resolve().parent.parent
+HANDLER_SECONDS = 0.01
+
+
+def build_test_worker(worker_id: int, run_singletons: bool, done: multiprocessing.Queue) -> Application:
+    async def handle(update, context) -> None:
+        # A handler that blocks its process, like a sync DB call or CPU-bound work.
+        time.sleep(HANDLER_SECONDS)
+        done.put((worker_id, update.effective_user.id, int(update.message.text)))
+
+    app = (
+        Application.builder()
+        .token("1:TEST")
+        .request(LocalBotRequest())
+        .get_updates_request(LocalBotRequest())
+        .updater(None)
+        .build()
+    )
+    app.add_handler(MessageHandler(filters.ALL, handle))
+    return app
+
+
+class PeerApplication(Application):
+    __slots__ = ("peer_services",)
+
+
+class RecordingService:
+    def __init__(self, worker_id: int, done: multiprocessing.Queue) -> None:
+        self.worker_id = worker_id
+        self.done = done
+        self.on_change = None
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        self.done.put(("applied", self.worker_id, change["from"]))
+
+
+def build_peer_worker(worker_id: int, run_singletons: bool, done: multiprocessing.Queue) -> Application:
+    service = RecordingService(worker_id, done)
+
+    async def handle(update, context) -> None:
+        if update.message.text == "crash":
+            os._exit(1)
+        if update.message.text == "publish":
+            service.on_change({"op": "test", "from": worker_id})
+        done.put((worker_id, update.effective_user.id, update.message.text))
+
+    app = (
+        Application.builder()
+        .application_class(PeerApplication)
+        .token("1:TEST")
+        .request(LocalBotRequest())
+        .get_updates_request(LocalBotRequest())
+        .updater(None)
+        .build()
+    )
+    app.peer_services = (service,)
+    app.add_handler(MessageHandler(filters.ALL, handle))
+    return app
+
+
+def make_update(update_id: int, user_id: int, seq: int | str) -> dict[str, Any]:
+    return message_update(update_id, user_id, str(seq))
+
+
+def run_load(workers: int, users: int, per_user: int) -> tuple[float, list[tuple[int, int, int]]]:
+    done = multiprocessing.get_context("spawn").Queue()
+    dispatcher = UpdateDispatcher(workers, app_factory=build_test_worker, factory_args=(done,))
+    dispatcher.start()
+    try:
+        started = time.perf_counter()
+        update_id = 0
+        for seq in range(per_user):
+            for user_id in range(1, users + 1):
+                update_id += 1
+                dispatcher.dispatch(make_update(update_id, user_id, seq))
+        results = [done.get(timeout=60) for _ in range(update_id)]
+        elapsed = time.perf_counter() - started
+    finally:
+        dispatcher.stop()
+    return elapsed, results
+
+
+def test_ring_is_stable_and_balanced() -> None:
+    ring = ConsistentHashRing(4)
+    assert [ring.node_for(user) for user in range(100)] == [ConsistentHashRing(4).node_for(u) for u in range(100)]
+
+    load = Counter(ring.node_for(user) for user in range(10_000))
+    assert set(load) == {0, 1, 2, 3}
+    assert max(load.values()) < 1.3 * 10_000 / 4
+
+    # Growing the pool only moves users onto the new worker.
+    grown = ConsistentHashRing(5)
+    moved = [user for user in range(10_000) if grown.node_for(user) != ring.node_for(user)]
+    assert all(grown.node_for(user) == 4 for user in moved)
+    assert len(moved) < 0.3 * 10_000
+
+
+def test_partition_key_uses_the_acting_user() -> None:
+    assert update_partition_key(make_update(1, 77, 0)) == 77
+    callback = {"update_id": 2, "callback_query": {"id": "q", "from": {"id": 88}, "chat_instance": "c"}}
+    assert update_partition_key(callback) == 88
+    channel_post = {"update_id": 3, "channel_post": {"message_id": 1, "chat": {"id": -100}}}
+    assert update_partition_key(channel_post) == -100
+    assert update_partition_key({"update_id": 4}) == 4
+
+
+def test_updates_for_one_user_stay_ordered_on_one_worker() -> None:
+    _, results = run_load(workers=3, users=12, per_user=5)
+
+    seen: dict[int, list[int]] = {}
+    owner: dict[int, set[int]] = {}
+    for worker_id, user_id, seq in results:
+        seen.setdefault(user_id, []).append(seq)
+        owner.setdefault(user_id, set()).add(worker_id)
+    assert all(seqs == list(range(5)) for seqs in seen.values())
+    assert all(len(workers) == 1 for workers in owner.values())
+
+
+def test_throughput_scales_with_workers() -> None:
+    single, _ = run_load(workers=1, users=200, per_user=1)
+    four, _ = run_load(workers=4, users=200, per_user=1)
+
+    assert single / four > 3.0
+
+
+def test_cache_changes_reach_every_other_worker() -> None:
+    done = multiprocessing.get_context("spawn").Queue()
+    dispatcher = UpdateDispatcher(3, app_factory=build_peer_worker, factory_args=(done,))
+    dispatcher.start()
+    try:
+        source = dispatcher.dispatch(make_update(1, 7, "publish"))
+        results = {done.get(timeout=30) for _ in range(3)}
+    finally:
+        dispatcher.stop()
+
+    others = {worker_id for worker_id in range(3) if worker_id != source}
+    assert results == {(source, 7, "publish")} | {("applied", worker_id, source) for worker_id in others}
+
+
+def test_dead_worker_is_restarted() -> None:
+    done = multiprocessing.get_context("spawn").Queue()
+    dispatcher = UpdateDispatcher(2, app_factory=build_peer_worker, factory_args=(done,))
+    dispatcher.start()
+    try:
+        owner = dispatcher.dispatch(make_update(1, 7, "crash"))
+        deadline = time.monotonic() + 30
+        while dispatcher.restarts[owner] == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert dispatcher.restarts == [int(worker_id == owner) for worker_id in range(2)]
+
+        # The replacement takes the user's next updates once it has booted.
+        dispatcher.dispatch(make_update(2, 7, "hello"))
+        assert done.get(timeout=60) == (owner, 7, "hello")
+    finally:
+        dispatcher.stop()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_sigterm_flushes_buffered_entries(tmp_path) -> None:
+    repository = SQLiteRepository(str(tmp_path / "amazo.db"))
+    asyncio.run(repository.new_event(1, "Launch", "2999-12-31"))
+    repository.close()
+
+    # One user walks through /enter, the terms and a wallet.
+    api = FakeBotApi(enter_conversations(users=1, duration=0.0, think=0.1), latency=0.0)
+    api.start()
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(api),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+            lifespan="off",
+            # The bot leaves a long poll open when it stops.
+            timeout_graceful_shutdown=1,
+        )
+    )
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+
+    env = {
+        **os.environ,
+        "BOT_TOKEN": "1:TEST",
+        "ADMIN_ID": "999",
+        "WORKERS": "2",
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": str(tmp_path / "amazo.db"),
+        "BOT_API_URL": f"http://127.0.0.1:{port}",
+        # Nothing reaches the database before shutdown unless the buffer is flushed then.
+        "WRITE_FLUSH_INTERVAL": "600",
+        "WRITE_SPILL_PATH": str(tmp_path / "spill.jsonl"),
+        "STATE_PATH": str(tmp_path / "state.db"),
+        "BROADCAST_CHECKPOINT_PATH": str(tmp_path / "broadcast.json"),
+        "LOG_FORMAT": "text",
+    }
+    bot = subprocess.Popen([sys.executable, "bot.py"], cwd=ROOT, env=env, start_new_session=True)
+    try:
+        deadline = time.monotonic() + 60
+        # Two replies: the terms, then "Successfully registered".
+        while httpx.get(f"http://127.0.0.1:{port}/stats").json()["calls"].get("sendMessage", 0) < 2:
+            assert time.monotonic() < deadline and bot.poll() is None
+            time.sleep(0.1)
+        bot.send_signal(signal.SIGTERM)
+        assert bot.wait(timeout=60) == 0
+    finally:
+        # Workers left behind by a front that died without stopping them.
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(bot.pid, signal.SIGKILL)
+        server.should_exit = True
+        server_thread.join()
+
+    repository = SQLiteRepository(str(tmp_path / "amazo.db"))
+    entry = asyncio.run(repository.get_user_entry_for_event(user_id=NEW_USER_BASE, event_id=1))
+    repository.close()
+    assert entry is not None and entry["wallet_address"] == "0x" + f"{NEW_USER_BASE:040x}"
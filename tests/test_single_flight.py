@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from amazo_bot.services.repository import EventStats
+from amazo_bot.services.single_flight import COALESCED_READS, SingleFlight, coalesce_reads
+
+BURST = 500
+
+
+class SlowRepository:
+    def __init__(self, latency: float = 0.05) -> None:
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+        self.participants = 10
+        self.fail = False
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def fetch_active_event_record(self):
+        self._count("fetch_active_event_record")
+        await asyncio.sleep(self.latency)
+        return {"id": 1, "name": "Launch"}
+
+    async def get_event_stats(self, event_id: int) -> EventStats:
+        self._count("get_event_stats")
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("backend down")
+        return EventStats(participants=self.participants, referrals=event_id)
+
+    async def get_user_entry_for_event(self, user_id: int, event_id: int):
+        self._count("get_user_entry_for_event")
+        await asyncio.sleep(self.latency)
+        return {"user_id": user_id, "event_id": event_id}
+
+    async def register_entries(self, entries):
+        self._count("register_entries")
+        self.participants += len(entries)
+        return len(entries)
+
+    def close(self) -> None:
+        return None
+
+
+def test_burst_of_identical_reads_hits_the_backend_once() -> None:
+    backend = SlowRepository()
+    repository = coalesce_reads(backend, ttl=1.0)
+    before = COALESCED_READS.value(method="get_event_stats", source="inflight")
+
+    async def burst():
+        return await asyncio.gather(
+            *(repository.get_event_stats(event_id=7) for _ in range(BURST // 2)),
+            *(repository.get_event_stats(7) for _ in range(BURST // 2)),
+            repository.fetch_active_event_record(),
+        )
+
+    results = asyncio.run(burst())
+
+    assert backend.calls == {"get_event_stats": 1, "fetch_active_event_record": 1}
+    assert all(result == EventStats(participants=10, referrals=7) for result in results[:BURST])
+    assert COALESCED_READS.value(method="get_event_stats", source="inflight") == before + BURST - 1
+    assert repository.single_flight.shared == BURST - 1
+
+
+def test_different_arguments_are_not_shared() -> None:
+    backend = SlowRepository()
+    repository = coalesce_reads(backend)
+
+    async def run():
+        return await asyncio.gather(
+            repository.get_user_entry_for_event(user_id=1, event_id=1),
+            repository.get_user_entry_for_event(user_id=2, event_id=1),
+            repository.get_user_entry_for_event(1, event_id=1),
+        )
+
+    first, second, third = asyncio.run(run())
+
+    assert backend.calls == {"get_user_entry_for_event": 2}
+    assert first["user_id"] == third["user_id"] == 1
+    assert second["user_id"] == 2
+
+
+def test_results_expire_and_writes_invalidate() -> None:
+    backend = SlowRepository(latency=0.0)
+    repository = coalesce_reads(backend, ttl=0.05)
+
+    async def run():
+        await repository.get_event_stats(1)
+        await repository.get_event_stats(1)
+        assert backend.calls["get_event_stats"] == 1
+        await asyncio.sleep(0.06)
+        await repository.get_event_stats(1)
+        assert backend.calls["get_event_stats"] == 2
+
+        await repository.register_entries([{"user_id": 5, "event_id": 1}])
+        stats = await repository.get_event_stats(1)
+        assert backend.calls["get_event_stats"] == 3
+        return stats
+
+    assert asyncio.run(run()).participants == 11
+    assert repository.single_flight.cached == 1
+
+
+def test_write_during_a_read_keeps_the_stale_result_out_of_the_cache() -> None:
+    backend = SlowRepository(latency=0.05)
+    repository = coalesce_reads(backend, ttl=10.0)
+
+    async def run():
+        read = asyncio.ensure_future(repository.get_event_stats(1))
+        await asyncio.sleep(0.01)
+        await repository.register_entries([{"user_id": 5, "event_id": 1}])
+        await read
+        return await repository.get_event_stats(1)
+
+    assert asyncio.run(run()).participants == 11
+    assert backend.calls["get_event_stats"] == 2
+
+
+def test_failures_are_shared_but_not_cached() -> None:
+    backend = SlowRepository()
+    backend.fail = True
+    repository = coalesce_reads(backend, ttl=10.0)
+
+    async def run():
+        results = await asyncio.gather(*(repository.get_event_stats(1) for _ in range(10)), return_exceptions=True)
+        assert all(isinstance(result, ConnectionError) for result in results)
+        backend.fail = False
+        return await repository.get_event_stats(1)
+
+    assert asyncio.run(run()).participants == 10
+    assert backend.calls["get_event_stats"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call() -> None:
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "value"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", fetch))
+        follower = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == ("value", "inflight")
+    assert calls == 1
@@ -0,0 +1,129 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from amazo_bot.services.draw_service import DrawEngine
+from amazo_bot.handlers.admin import snapshot_source
+from amazo_bot.services.snapshot_service import DrawSnapshot, SnapshotIntegrityError, SnapshotService
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+
+
+def make_repo(tmp_path, users: int = 25) -> SQLiteRepository:
+    repo = SQLiteRepository(str(tmp_path / "amazo.db"))
+    asyncio.run(repo.new_event(1, "Launch", "2999-12-31"))
+    rows = [
+        {
+            "user_id": user_id,
+            "event_id": 1,
+            "username": f"user_{user_id}",
+            "wallet_address": f"0x{user_id:040x}",
+            "referred_by": user_id // 5 if user_id >= 5 else None,
+        }
+        for user_id in range(1, users + 1)
+    ]
+    asyncio.run(repo.register_entries(rows))
+    return repo
+
+
+def test_snapshot_freezes_columns_with_a_content_hash(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    service = SnapshotService(repo, str(tmp_path / "snapshots"), page_size=4)
+
+    snapshot = asyncio.run(service.create(1))
+
+    assert snapshot.entries == 25
+    assert isinstance(snapshot.user_ids, np.memmap)
+    assert snapshot.user_ids.tolist() == list(range(1, 26))
+    assert snapshot.find(3) == {
+        "user_id": 3,
+        "referral_count": 5,
+        "wallet_address": f"0x{3:040x}",
+        "username": "user_3",
+    }
+    assert snapshot.find(99) is None
+    stats = snapshot.stats()
+    assert (stats.entries, stats.referrals, stats.tickets, stats.max_referrals) == (25, 21, 46, 5)
+    assert snapshot.verify()
+    assert snapshot.path.name.startswith("event_1_" + snapshot.sha256[:16])
+
+    # Identical entries produce an identical file hash.
+    assert asyncio.run(service.create(1)).sha256 == snapshot.sha256
+    repo.close()
+
+
+def test_tampered_snapshot_fails_verification(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    snapshot = asyncio.run(SnapshotService(repo, str(tmp_path / "snapshots")).create(1))
+    repo.close()
+
+    data = bytearray(snapshot.path.read_bytes())
+    data[-100] ^= 0xFF
+    tampered = tmp_path / "tampered.snap"
+    tampered.write_bytes(bytes(data))
+
+    assert not DrawSnapshot(tampered).verify()
+
+
+def test_latest_refuses_a_damaged_snapshot(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    service = SnapshotService(repo, str(tmp_path / "snapshots"))
+    older = asyncio.run(service.create(1))
+    late = {"user_id": 99, "event_id": 1, "username": "late", "wallet_address": f"0x{99:040x}", "referred_by": None}
+    asyncio.run(repo.register_entries([late]))
+    newest = asyncio.run(service.create(1))
+    repo.close()
+    os.utime(older.path, ns=(1, 1))
+    assert service.latest(1).sha256 == newest.sha256
+
+    data = bytearray(newest.path.read_bytes())
+    data[-100] ^= 0xFF
+    newest.path.write_bytes(bytes(data))
+
+    # Neither the older snapshot nor live entries stand in for it.
+    with pytest.raises(SnapshotIntegrityError):
+        service.latest(1)
+
+
+def test_snapshot_source_shows_its_age(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    snapshot = asyncio.run(SnapshotService(repo, str(tmp_path / "snapshots")).create(1))
+    repo.close()
+    taken = datetime.now(timezone.utc) - timedelta(hours=3, minutes=5, seconds=30)
+    snapshot.created_at = taken.isoformat(timespec="seconds")
+
+    assert snapshot_source(snapshot).endswith("(3 h 5 min ago)")
+    assert snapshot.sha256 in snapshot_source(snapshot)
+
+
+def test_snapshot_draw_matches_live_draw_without_queries(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    service = SnapshotService(repo, str(tmp_path / "snapshots"))
+    engine = DrawEngine(repo, winners=3)
+    asyncio.run(service.create(1))
+    live = asyncio.run(engine.draw(1, seed=2024))
+    repo.close()
+
+    # The repository is closed: the snapshot draw must not need it.
+    snapshot = service.latest(1)
+    frozen = engine.draw_snapshot(snapshot, seed=2024)
+
+    assert [w["user_id"] for w in frozen.winners] == [w["user_id"] for w in live.winners]
+    assert [w["wallet_address"] for w in frozen.winners] == [w["wallet_address"] for w in live.winners]
+    assert (frozen.entries, frozen.tickets) == (live.entries, live.tickets)
+    assert frozen.snapshot_sha256 == snapshot.sha256
+
+
+def test_empty_event_snapshot(tmp_path) -> None:
+    repo = SQLiteRepository(":memory:")
+    service = SnapshotService(repo, str(tmp_path / "snapshots"))
+
+    snapshot = asyncio.run(service.create(7))
+
+    assert snapshot.entries == 0 and snapshot.verify()
+    assert snapshot.stats().tickets == 0
+    assert DrawEngine(repo).draw_snapshot(snapshot, seed=1).winners == []
+    assert service.latest(8) is None
+    repo.close()
@@ -0,0 +1,119 @@
+import asyncio
+from collections import Counter
+
+from amazo_bot.services.repository import RecipientSegment
+from amazo_bot.services.sqlite_repository import WINNER_COUNT, SQLiteRepository
+
+
+def entry(user_id: int, event_id: int = 1, referred_by: int | None = None) -> dict:
+    return {
+        "user_id": user_id,
+        "event_id": event_id,
+        "username": f"user_{user_id}",
+        "wallet_address": "x" * 40,
+        "referred_by": referred_by,
+    }
+
+
+def collect(agen) -> list:
+    async def run() -> list:
+        return [item async for item in agen]
+
+    return asyncio.run(run())
+
+
+def make_repo(tmp_path) -> SQLiteRepository:
+    repo = SQLiteRepository(str(tmp_path / "amazo.db"))
+    asyncio.run(repo.new_event(1, "Launch", "2999-12-31"))
+    return repo
+
+
+def test_active_event_lifecycle(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+
+    event = asyncio.run(repo.get_active_event())
+    assert event == {"id": 1, "name": "Launch", "end_date": "2999-12-31T23:59:59Z", "is_active": True}
+
+    asyncio.run(repo.deactivate_all_events())
+    assert asyncio.run(repo.get_active_event()) is None
+    asyncio.run(repo.set_event_active_state(1, True))
+    assert asyncio.run(repo.fetch_active_event_record())["id"] == 1
+    repo.close()
+
+
+def test_events_run_side_by_side(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    asyncio.run(repo.new_event(2, "Europe", "2999-06-30"))
+    asyncio.run(repo.new_event(3, "Asia", "2999-12-31"))
+
+    # Soonest to end first.
+    assert [event["id"] for event in asyncio.run(repo.fetch_active_event_records())] == [2, 1, 3]
+    asyncio.run(repo.set_event_active_state(2, False))
+    assert [event["id"] for event in asyncio.run(repo.fetch_active_event_records())] == [1, 3]
+    repo.close()
+
+
+def test_register_entries_is_idempotent_and_coalesces_referrals(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    batch = [entry(1), entry(2, referred_by=1), entry(3, referred_by=1), entry(4, referred_by=2)]
+
+    assert asyncio.run(repo.register_entries(batch)) == 4
+    assert asyncio.run(repo.register_entries(batch)) == 0
+
+    assert asyncio.run(repo.get_user_entry_for_event(1, 1))["referral_count"] == 2
+    assert asyncio.run(repo.get_user_entry_for_event(2, 1))["referral_count"] == 1
+    stats = asyncio.run(repo.get_event_stats(1))
+    assert (stats.participants, stats.referrals, stats.tickets) == (4, 3, 7)
+
+    asyncio.run(repo.increment_referral(3, 1))
+    assert asyncio.run(repo.get_event_stats(1)).referrals == 4
+    repo.close()
+
+
+def test_data_survives_reopen_and_history_joins_events(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    asyncio.run(repo.register_entry(7, 1, "user_7", "x" * 40, None))
+    repo.close()
+
+    repo = SQLiteRepository(str(tmp_path / "amazo.db"))
+    history = asyncio.run(repo.get_user_history(7))
+    assert history == [{"referral_count": 0, "giveaways": {"name": "Launch", "is_active": True}}]
+    repo.close()
+
+
+def test_keyset_iterators_page_and_dedupe(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    asyncio.run(repo.new_event(2, "Second", "2999-12-31"))
+    asyncio.run(repo.register_entries([entry(user_id) for user_id in range(1, 8)]))
+    asyncio.run(repo.register_entries([entry(user_id, event_id=2) for user_id in range(5, 10)]))
+    asyncio.run(repo.register_entries([entry(20, event_id=2, referred_by=9), entry(21, event_id=2, referred_by=9)]))
+
+    pages = collect(repo.iter_event_entries(1, page_size=3))
+    assert [[row["user_id"] for row in page] for page in pages] == [[1, 2, 3], [4, 5, 6], [7]]
+
+    ids = [user_id for chunk in collect(repo.iter_recipient_ids(page_size=4)) for user_id in chunk]
+    assert ids == [1, 2, 3, 4, 5, 6, 7, 8, 9, 20, 21]
+    resumed = [user_id for chunk in collect(repo.iter_recipient_ids(after=8)) for user_id in chunk]
+    assert resumed == [9, 20, 21]
+    segment = RecipientSegment(event_id=2, min_referrals=2)
+    assert collect(repo.iter_recipient_ids(segment)) == [[9]]
+    repo.close()
+
+
+def test_pick_winners_is_weighted_by_tickets(tmp_path) -> None:
+    repo = make_repo(tmp_path)
+    rows = [entry(user_id) for user_id in range(1, 11)]
+    rows += [entry(100 + n, referred_by=1) for n in range(30)]
+    asyncio.run(repo.register_entries(rows))
+
+    wins: Counter[int] = Counter()
+    for _ in range(200):
+        winners = asyncio.run(repo.pick_winners(1))
+        assert len({winner["user_id"] for winner in winners}) == WINNER_COUNT
+        wins.update(winner["user_id"] for winner in winners)
+
+    # User 1 holds 31 of 71 tickets; everyone else holds one.
+    assert wins[1] == max(wins.values())
+    assert wins[1] > 150
+    assert asyncio.run(repo.pick_winners(99)) == []
+    repo.close()
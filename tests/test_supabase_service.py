@@ -0,0 +1,198 @@
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from amazo_bot.services.supabase_service import RecipientSegment, SupabaseService
+
+
+class SlowQuery:
+    def __init__(self, latency: float, data: list) -> None:
+        self.latency = latency
+        self.data = data
+        self.thread_name = ""
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.thread_name = threading.current_thread().name
+        time.sleep(self.latency)
+        return SimpleNamespace(data=self.data, count=len(self.data))
+
+
+class SlowClient:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.queries: list[SlowQuery] = []
+
+    def table(self, name: str) -> SlowQuery:
+        query = SlowQuery(self.latency, [{"username": "alice", "referral_count": 3}])
+        self.queries.append(query)
+        return query
+
+    def rpc(self, name: str, params: dict) -> SlowQuery:
+        return self.table(name)
+
+
+@pytest.fixture
+def slow_service(monkeypatch: pytest.MonkeyPatch) -> SupabaseService:
+    monkeypatch.setattr(
+        "amazo_bot.services.supabase_service.create_client",
+        lambda url, key: SlowClient(latency=0.05),
+    )
+    service = SupabaseService("https://example.supabase.co", "key", max_workers=4)
+    yield service
+    service.close()
+
+
+def test_execute_runs_off_the_event_loop(slow_service: SupabaseService) -> None:
+    rows = asyncio.run(slow_service.get_user_history(user_id=1))
+
+    assert rows == [{"username": "alice", "referral_count": 3}]
+    assert slow_service.client.queries[0].thread_name.startswith("supabase")
+
+
+def test_concurrent_calls_overlap(slow_service: SupabaseService) -> None:
+    async def run() -> float:
+        started = time.perf_counter()
+        await asyncio.gather(*(slow_service.get_user_history(user_id=1) for _ in range(4)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 0.15
+
+
+class PagedEntriesQuery:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.filters: list = []
+        self.cursor = 0
+        self.page_size = 0
+
+    def select(self, columns: str) -> "PagedEntriesQuery":
+        return self
+
+    def gt(self, column: str, value: int) -> "PagedEntriesQuery":
+        self.cursor = value
+        return self
+
+    def eq(self, column: str, value: int) -> "PagedEntriesQuery":
+        self.filters.append(lambda row: row[column] == value)
+        return self
+
+    def gte(self, column: str, value: int) -> "PagedEntriesQuery":
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def order(self, column: str) -> "PagedEntriesQuery":
+        return self
+
+    def limit(self, count: int) -> "PagedEntriesQuery":
+        self.page_size = count
+        return self
+
+    def execute(self):
+        start = bisect.bisect_right(self.rows, self.cursor, key=lambda row: row["user_id"])
+        page = []
+        for row in itertools.islice(self.rows, start, None):
+            if all(check(row) for check in self.filters):
+                page.append({"user_id": row["user_id"]})
+                if len(page) == self.page_size:
+                    break
+        return SimpleNamespace(data=page, count=None)
+
+
+class PagedClient:
+    def __init__(self, rows: list[dict]) -> None:
+        self.rows = rows
+        self.pages = 0
+
+    def table(self, name: str) -> PagedEntriesQuery:
+        self.pages += 1
+        return PagedEntriesQuery(self.rows)
+
+
+def synthetic_entries(users: int, events: int) -> list[dict]:
+    # Every third user joined every event, so the table holds well over 100k rows.
+    rows = []
+    for user_id in range(1, users + 1):
+        for event_id in range(1, events + 1):
+            if event_id == 1 or user_id % 3 == 0:
+                rows.append({"user_id": user_id, "event_id": event_id, "referral_count": user_id % 7})
+    return rows
+
+
+def collect(service: SupabaseService, **kwargs) -> list[list[int]]:
+    async def run() -> list[list[int]]:
+        return [chunk async for chunk in service.iter_recipient_ids(**kwargs)]
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def paged_service(monkeypatch: pytest.MonkeyPatch) -> SupabaseService:
+    rows = synthetic_entries(users=60_000, events=4)
+    assert len(rows) > 100_000
+    monkeypatch.setattr(
+        "amazo_bot.services.supabase_service.create_client",
+        lambda url, key: PagedClient(rows),
+    )
+    service = SupabaseService("https://example.supabase.co", "key")
+    yield service
+    service.close()
+
+
+def test_iter_recipient_ids_streams_distinct_users(paged_service: SupabaseService) -> None:
+    chunks = collect(paged_service, page_size=1000)
+
+    flat = [uid for chunk in chunks for uid in chunk]
+    assert flat == list(range(1, 60_001))
+    assert max(len(chunk) for chunk in chunks) <= 1000
+
+
+def test_iter_recipient_ids_applies_segment_filters(paged_service: SupabaseService) -> None:
+    segment = RecipientSegment(event_id=2, min_referrals=5)
+
+    flat = [uid for chunk in collect(paged_service, segment=segment, page_size=500) for uid in chunk]
+
+    assert flat == [uid for uid in range(1, 60_001) if uid % 3 == 0 and uid % 7 >= 5]
+
+
+def test_iter_recipient_ids_resumes_after_cursor(paged_service: SupabaseService) -> None:
+    flat = [uid for chunk in collect(paged_service, after=59_990) for uid in chunk]
+
+    assert flat == list(range(59_991, 60_001))
+
+
+class StatsClient:
+    def __init__(self, data) -> None:
+        self.data = data
+        self.calls: list[tuple[str, dict]] = []
+
+    def rpc(self, name: str, params: dict) -> SlowQuery:
+        self.calls.append((name, params))
+        return SlowQuery(0, self.data)
+
+
+@pytest.mark.parametrize(
+    ("data", "expected"),
+    [
+        ([{"participants": 40, "referrals": 15, "tickets": 55}], (40, 15, 55)),
+        ({"participants": 2, "referrals": 0, "tickets": 2}, (2, 0, 2)),
+        ([], (0, 0, 0)),
+    ],
+)
+def test_get_event_stats_is_one_rpc(monkeypatch: pytest.MonkeyPatch, data, expected) -> None:
+    client = StatsClient(data)
+    monkeypatch.setattr("amazo_bot.services.supabase_service.create_client", lambda url, key: client)
+    service = SupabaseService("https://example.supabase.co", "key")
+
+    stats = asyncio.run(service.get_event_stats(event_id=9))
+    service.close()
+
+    assert (stats.participants, stats.referrals, stats.tickets) == expected
+    assert client.calls == [("get_event_stats", {"target_event_id": 9})]
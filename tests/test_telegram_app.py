@@ -1,22 +1,28 @@
 from telegram.ext import CommandHandler, ConversationHandler
 
 from amazo_bot.config import Settings
-from amazo_bot.telegram_app import build_application
+from amazo_bot.metrics import InstrumentedRequest
+from amazo_bot.persistence import SQLitePersistence
+from amazo_bot.telegram_app import AmazoApplication, build_application
+from amazo_bot.update_processor import PerUserUpdateProcessor
 
 
 class DummySupabaseService:
-    def __init__(self, supabase_url: str, supabase_key: str) -> None:
+    def __init__(self, supabase_url: str, supabase_key: str, max_workers: int = 8) -> None:
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
 
-    def fetch_active_event_record(self):
+    async def fetch_active_event_record(self):
         return None
 
-    def set_event_active_state(self, event_id: int, is_active: bool) -> None:
+    async def set_event_active_state(self, event_id: int, is_active: bool) -> None:
+        return None
+
+    def close(self) -> None:
         return None
 
 
-def test_build_application_registers_expected_command_handlers(monkeypatch) -> None:
+def test_build_application_registers_expected_command_handlers(monkeypatch, tmp_path) -> None:
     monkeypatch.setattr(
         "amazo_bot.telegram_app.load_settings",
         lambda: Settings(
@@ -24,6 +30,7 @@ def test_build_application_registers_expected_command_handlers(monkeypatch) -> N
             supabase_url="https://example.supabase.co",
             supabase_key="key",
             admin_id=1,
+            state_path=str(tmp_path / "state.db"),
         ),
     )
     monkeypatch.setattr("amazo_bot.telegram_app.SupabaseService", DummySupabaseService)
@@ -32,15 +39,24 @@ def test_build_application_registers_expected_command_handlers(monkeypatch) -> N
 
     commands = set()
     enter_registered = False
+    conversation = None
     for handlers in app.handlers.values():
         for handler in handlers:
             if isinstance(handler, CommandHandler):
                 commands.update(handler.commands)
             if isinstance(handler, ConversationHandler):
+                conversation = handler
                 for entry in handler.entry_points:
                     if isinstance(entry, CommandHandler) and "enter" in entry.commands:
                         enter_registered = True
 
     assert {"start", "balance", "leaderboard", "history", "help", "faq"}.issubset(commands)
-    assert {"admin", "new_event", "pick", "broadcast"}.issubset(commands)
+    assert {"admin", "new_event", "pick", "snapshot", "broadcast", "perf"}.issubset(commands)
     assert enter_registered is True
+    assert isinstance(app.update_processor, PerUserUpdateProcessor)
+    assert app.update_processor.limit == 64
+    assert isinstance(app, AmazoApplication)
+    assert isinstance(app.bot.request, InstrumentedRequest)
+    assert app.health_monitor.backend_up is None
+    assert isinstance(app.persistence, SQLitePersistence)
+    assert conversation.persistent and conversation.conversation_timeout == 600.0
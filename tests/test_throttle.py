@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from telegram import Update
+from telegram.ext import Application, CommandHandler, TypeHandler
+
+from amazo_bot.config import load_settings
+from amazo_bot.throttle import THROTTLED_UPDATES, UpdateThrottle
+from benchmarks.local_bot_api import LocalBotRequest, callback_update, message_update
+
+ADMIN_ID = 999
+
+
+def command(update_id: int, user_id: int, text: str, bot=None) -> Update:
+    return Update.de_json(message_update(update_id, user_id, text), bot)
+
+
+def button(data: str) -> Update:
+    return Update.de_json(callback_update(1, 5, data), None)
+
+
+def test_costs_come_from_command_or_callback_data() -> None:
+    throttle = UpdateThrottle(costs={"faq": 0.25})
+
+    assert throttle.cost(command(1, 5, "/history@test_bot")) == 3.0
+    assert throttle.cost(command(2, 5, "/FAQ")) == 0.25
+    assert throttle.cost(command(3, 5, "/unknown")) == 1.0
+    assert throttle.cost(button("show_lb")) == 2.0
+    # An event's button costs what the plain one does.
+    assert throttle.cost(button("start_entry_12")) == 3.0
+
+
+def test_user_bucket_refills_and_is_separate_per_user() -> None:
+    throttle = UpdateThrottle(user_rate=1.0, user_burst=6.0, global_rate=0)
+
+    assert [throttle.admit(1, 3.0, now=0.0) for _ in range(3)] == [True, True, False]
+    assert throttle.admit(2, 3.0, now=0.0) is True
+    assert throttle.admit(1, 3.0, now=2.0) is False
+    assert throttle.admit(1, 3.0, now=3.0) is True
+
+
+def test_global_bucket_caps_many_users() -> None:
+    throttle = UpdateThrottle(user_rate=1.0, user_burst=10.0, global_rate=10.0, global_burst=20.0)
+    before = THROTTLED_UPDATES.value(scope="global")
+
+    admitted = sum(throttle.admit(user_id, 1.0, now=0.0) for user_id in range(100))
+
+    assert admitted == 20
+    assert THROTTLED_UPDATES.value(scope="global") == before + 80
+    # A global rejection does not charge the user.
+    assert throttle.admit(50, 10.0, now=10.0) is True
+
+
+def test_idle_buckets_are_evicted_and_size_is_bounded() -> None:
+    throttle = UpdateThrottle(user_rate=1.0, user_burst=5.0, global_rate=0, max_users=1000)
+
+    for user_id in range(1000):
+        throttle.admit(user_id, 1.0, now=0.0)
+    assert throttle.tracked_users == 1000
+
+    # Past the refill time every earlier bucket would be full again.
+    throttle.admit(5000, 1.0, now=6.0)
+    assert throttle.tracked_users == 1
+
+    for user_id in range(3000):
+        throttle.admit(user_id, 1.0, now=7.0)
+    assert throttle.tracked_users == 1000
+
+
+def test_throttled_updates_never_reach_handlers() -> None:
+    handled: list[tuple[int, str]] = []
+    throttle = UpdateThrottle(user_rate=0.001, user_burst=5.0, global_rate=0, exempt=(ADMIN_ID,))
+
+    async def handler(update, context) -> None:
+        handled.append((update.effective_user.id, update.message.text))
+
+    app = Application.builder().token("1:TEST").request(LocalBotRequest()).updater(None).build()
+    app.add_handler(TypeHandler(Update, throttle.check), group=-1)
+    app.add_handler(CommandHandler(["history", "faq"], handler))
+
+    async def run() -> None:
+        async with app:
+            for update_id in range(20):
+                await app.process_update(command(update_id, 7, "/history", app.bot))
+            await app.process_update(command(100, 7, "/faq", app.bot))
+            await app.process_update(command(101, 8, "/history", app.bot))
+            for update_id in range(200, 220):
+                await app.process_update(command(update_id, ADMIN_ID, "/history", app.bot))
+
+    asyncio.run(run())
+
+    assert handled.count((7, "/history")) == 1
+    assert (7, "/faq") in handled
+    assert (8, "/history") in handled
+    assert handled.count((ADMIN_ID, "/history")) == 20
+
+
+def test_throttle_costs_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "token")
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "key")
+    monkeypatch.setenv("ADMIN_ID", "123")
+    monkeypatch.setenv("THROTTLE_COSTS", "/History=4, faq=0.5")
+
+    assert load_settings().throttle_costs == {"history": 4.0, "faq": 0.5}
+
+    monkeypatch.setenv("THROTTLE_COSTS", "history")
+    with pytest.raises(ValueError, match="THROTTLE_COSTS"):
+        load_settings()
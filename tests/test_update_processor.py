@@ -0,0 +1,139 @@
+import asyncio
+import random
+import time
+
+from telegram import Update
+from telegram.ext import (
+    Application,
+    CallbackQueryHandler,
+    CommandHandler,
+    ConversationHandler,
+    MessageHandler,
+    filters,
+)
+
+from amazo_bot.handlers.user import TERMS, WALLET
+from amazo_bot.update_processor import PerUserUpdateProcessor, update_ordering_key
+from benchmarks.local_bot_api import LocalBotRequest, callback_update, message_update
+
+USERS = 1000
+GROUP_SIZE = 4
+STEP_SECONDS = 0.005
+
+
+def run_conversations(processor: PerUserUpdateProcessor) -> tuple[float, dict[int, list[str]]]:
+    steps: dict[int, list[str]] = {}
+    finished = asyncio.Event()
+    rng = random.Random(7)
+
+    async def step(update: Update, name: str) -> None:
+        # Uneven handler latency so a user's later updates would overtake earlier ones
+        # if they were not serialized.
+        await asyncio.sleep(rng.uniform(0, 2 * STEP_SECONDS))
+        steps.setdefault(update.effective_user.id, []).append(name)
+
+    async def enter(update, context) -> int:
+        await step(update, "enter")
+        return TERMS
+
+    async def accept(update, context) -> int:
+        await step(update, "terms")
+        return WALLET
+
+    async def wallet(update, context) -> int:
+        await step(update, "wallet")
+        if sum(len(names) for names in steps.values()) == 3 * USERS:
+            finished.set()
+        return ConversationHandler.END
+
+    app = (
+        Application.builder()
+        .token("1:TEST")
+        .request(LocalBotRequest())
+        .get_updates_request(LocalBotRequest())
+        .updater(None)
+        .concurrent_updates(processor)
+        .build()
+    )
+    app.add_handler(
+        ConversationHandler(
+            entry_points=[CommandHandler("enter", enter)],
+            states={
+                TERMS: [CallbackQueryHandler(accept, pattern="^accept_terms$")],
+                WALLET: [MessageHandler(filters.TEXT & ~filters.COMMAND, wallet)],
+            },
+            fallbacks=[],
+        )
+    )
+
+    async def run() -> float:
+        async with app:
+            await app.start()
+            started = time.perf_counter()
+            update_id = 0
+            # Every update is queued up front: groups of users step through the
+            # conversation side by side, so each user's steps arrive close together.
+            for group in range(100, 100 + USERS, GROUP_SIZE):
+                for build in (
+                    lambda uid, user: message_update(uid, user, "/enter"),
+                    lambda uid, user: callback_update(uid, user, "accept_terms"),
+                    lambda uid, user: message_update(uid, user, "0x" + "a" * 40),
+                ):
+                    for user_id in range(group, group + GROUP_SIZE):
+                        update_id += 1
+                        app.update_queue.put_nowait(Update.de_json(build(update_id, user_id), app.bot))
+            await asyncio.wait_for(finished.wait(), timeout=60)
+            elapsed = time.perf_counter() - started
+            await app.stop()
+        return elapsed
+
+    return asyncio.run(run()), steps
+
+
+def test_interleaved_conversations_keep_per_user_order() -> None:
+    processor = PerUserUpdateProcessor(256)
+    elapsed, steps = run_conversations(processor)
+
+    assert len(steps) == USERS
+    assert all(names == ["enter", "terms", "wallet"] for names in steps.values())
+    assert processor.active_keys == 0
+    # Strictly sequential processing would take at least USERS * 3 * STEP_SECONDS on average.
+    assert elapsed < USERS * 3 * STEP_SECONDS / 5
+
+
+def test_ordering_key_prefers_user_then_chat() -> None:
+    update = Update.de_json(message_update(1, 55, "hi"), None)
+    assert update_ordering_key(update) == 55
+
+    channel_post = Update.de_json(
+        {"update_id": 2, "channel_post": {"message_id": 1, "date": 0, "chat": {"id": -100, "type": "channel"}}},
+        None,
+    )
+    assert update_ordering_key(channel_post) == -100
+    assert update_ordering_key(object()) is None
+
+
+def test_backlogged_user_does_not_hold_every_slot() -> None:
+    processor = PerUserUpdateProcessor(4)
+    done: dict[int, float] = {}
+
+    async def handle(user_id: int, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+        done[user_id] = time.perf_counter()
+
+    async def run() -> float:
+        started = time.perf_counter()
+        # Five slow updates from one user are queued before another user's update.
+        busy = [
+            processor.process_update(Update.de_json(message_update(n, 7, "/leaderboard"), None), handle(7, 0.2))
+            for n in range(1, 6)
+        ]
+        other = processor.process_update(Update.de_json(message_update(6, 8, "/faq"), None), handle(8, 0.0))
+        await asyncio.gather(*busy, other)
+        return started
+
+    started = asyncio.run(run())
+
+    assert done[8] - started < 0.1
+    assert done[7] - started >= 5 * 0.2
+    assert processor.active_keys == 0
@@ -0,0 +1,136 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.ext import ConversationHandler
+
+from amazo_bot.handlers.user import TERMS, UserHandlers
+from amazo_bot.runtime import BotRuntime
+from amazo_bot.services.giveaway_service import GiveawayService
+from amazo_bot.services.leaderboard_service import LeaderboardService
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+
+REFERRER = 10
+NEWCOMER = 20
+WALLET = "0x" + "a" * 40
+
+
+class FakeMessage:
+    def __init__(self, user_id: int, text: str = "") -> None:
+        self.from_user = SimpleNamespace(id=user_id, first_name="User", username=f"user{user_id}")
+        self.text = text
+        self.replies: list[tuple[str, object]] = []
+
+    async def reply_text(self, text: str, reply_markup=None, **kwargs) -> None:
+        self.replies.append((text, reply_markup))
+
+
+class FakeWriteBuffer:
+    def __init__(self) -> None:
+        self.entries: list[dict] = []
+
+    def enqueue_entry(self, **entry) -> None:
+        self.entries.append(entry)
+
+
+def command(message: FakeMessage) -> SimpleNamespace:
+    return SimpleNamespace(message=message, callback_query=None)
+
+
+def button(message: FakeMessage, data: str) -> SimpleNamespace:
+    async def answer() -> None:
+        return None
+
+    return SimpleNamespace(message=None, callback_query=SimpleNamespace(data=data, message=message, answer=answer))
+
+
+def buttons(markup) -> list[str]:
+    return [key.callback_data for row in markup.inline_keyboard for key in row]
+
+
+def make_handlers(tmp_path) -> tuple[UserHandlers, FakeWriteBuffer, SQLiteRepository]:
+    repository = SQLiteRepository(str(tmp_path / "amazo.db"))
+
+    async def seed() -> None:
+        await repository.new_event(1, "Europe", "2999-06-30")
+        await repository.new_event(2, "Asia", "2999-12-31")
+        entry = {"user_id": REFERRER, "username": "ref", "wallet_address": WALLET, "referred_by": None}
+        await repository.register_entries([{**entry, "event_id": event_id} for event_id in (1, 2)])
+
+    asyncio.run(seed())
+    runtime = BotRuntime()
+    runtime.set_bot_username("amazo_bot")
+    buffer = FakeWriteBuffer()
+    handlers = UserHandlers(repository, GiveawayService(repository), LeaderboardService(repository), buffer, runtime)
+    return handlers, buffer, repository
+
+
+def test_enter_asks_which_event_when_several_run(tmp_path) -> None:
+    handlers, _, repository = make_handlers(tmp_path)
+    message = FakeMessage(NEWCOMER)
+    context = SimpleNamespace(args=[], user_data={})
+
+    async def run() -> list[int]:
+        states = [await handlers.enter_giveaway(command(message), context)]
+        states.append(await handlers.enter_giveaway(button(message, "start_entry_2"), context))
+        return states
+
+    assert asyncio.run(run()) == [ConversationHandler.END, TERMS]
+    assert buttons(message.replies[0][1]) == ["start_entry_1", "start_entry_2"]
+    assert message.replies[1][0].startswith("Entering: Asia")
+    assert context.user_data["current_event_id"] == 2
+    repository.close()
+
+
+def test_referral_link_counts_only_for_its_event(tmp_path) -> None:
+    handlers, buffer, repository = make_handlers(tmp_path)
+
+    async def join(event_id: int) -> str:
+        message = FakeMessage(NEWCOMER)
+        context = SimpleNamespace(args=[f"{REFERRER}_2"], user_data={})
+        await handlers.start(command(message), context)
+        assert buttons(message.replies[0][1]) == ["start_entry_2", "show_faq", "show_lb_2"]
+        context.args = None
+        await handlers.enter_giveaway(button(message, f"start_entry_{event_id}"), context)
+        wallet = FakeMessage(NEWCOMER, WALLET)
+        await handlers.save_wallet(command(wallet), context)
+        return wallet.replies[0][0]
+
+    asyncio.run(join(1))
+    reply = asyncio.run(join(2))
+
+    assert [(entry["event_id"], entry["referred_by"]) for entry in buffer.entries] == [(1, None), (2, REFERRER)]
+    assert reply.endswith(f"https://t.me/amazo_bot?start={NEWCOMER}_2")
+    repository.close()
+
+
+def test_leaderboard_takes_an_event_id(tmp_path) -> None:
+    handlers, _, repository = make_handlers(tmp_path)
+    message = FakeMessage(REFERRER)
+
+    asyncio.run(handlers.leaderboard(command(message), SimpleNamespace(args=["2"])))
+    asyncio.run(handlers.leaderboard(command(message), SimpleNamespace(args=["9"])))
+
+    assert message.replies[0][0].startswith("Top referrers: Asia")
+    text, markup = message.replies[1]
+    assert text.startswith("Event #9 is not running.")
+    assert buttons(markup) == ["show_lb_1", "show_lb_2"]
+    repository.close()
+
+
+def test_balance_shows_a_registration_still_being_saved(tmp_path) -> None:
+    handlers, buffer, repository = make_handlers(tmp_path)
+    context = SimpleNamespace(args=[], user_data={})
+
+    async def run() -> str:
+        await handlers.enter_giveaway(button(FakeMessage(NEWCOMER), "start_entry_1"), context)
+        await handlers.save_wallet(command(FakeMessage(NEWCOMER, WALLET)), context)
+        message = FakeMessage(NEWCOMER)
+        await handlers.balance(command(message), SimpleNamespace(args=["1"]))
+        return message.replies[0][0]
+
+    reply = asyncio.run(run())
+
+    # The fake buffer never writes, so the database has no row yet.
+    assert len(buffer.entries) == 1
+    assert reply.startswith("Event: Europe (#1)\nWallet: registration pending\nReferrals: 0")
+    repository.close()
@@ -0,0 +1,62 @@
+import asyncio
+
+import httpx
+from telegram.ext import Application
+
+from amazo_bot.webhook import SECRET_HEADER, application_sink, create_web_app
+
+UPDATE = {
+    "update_id": 42,
+    "message": {
+        "message_id": 1,
+        "date": 0,
+        "chat": {"id": 7, "type": "private"},
+        "from": {"id": 7, "is_bot": False, "first_name": "Ann"},
+        "text": "/faq",
+    },
+}
+
+
+def post(web_app, path: str, **kwargs) -> httpx.Response:
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=web_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot.local") as client:
+            return await client.post(path, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_webhook_enqueues_verified_updates() -> None:
+    application = Application.builder().token("123:TEST").updater(None).build()
+    web_app = create_web_app(application_sink(application), secret_token="s3cret", webhook_path="/telegram")
+
+    response = post(web_app, "/telegram", json=UPDATE, headers={SECRET_HEADER: "s3cret"})
+
+    assert response.status_code == 200
+    update = application.update_queue.get_nowait()
+    assert update.update_id == 42
+    assert update.message.text == "/faq"
+
+
+def test_webhook_rejects_wrong_secret() -> None:
+    application = Application.builder().token("123:TEST").updater(None).build()
+    web_app = create_web_app(application_sink(application), secret_token="s3cret", webhook_path="/telegram")
+
+    response = post(web_app, "/telegram", json=UPDATE, headers={SECRET_HEADER: "nope"})
+
+    assert response.status_code == 403
+    assert application.update_queue.empty()
+
+
+def test_health_shares_the_webhook_port() -> None:
+    application = Application.builder().token("123:TEST").updater(None).build()
+    web_app = create_web_app(application_sink(application), secret_token="s3cret", webhook_path="/telegram")
+
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=web_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot.local") as client:
+            return await client.get("/health")
+
+    response = asyncio.run(run())
+
+    assert response.json() == {"status": "ok"}
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+from amazo_bot.services.sqlite_repository import SQLiteRepository
+from amazo_bot.services.write_behind import WriteBehindBuffer
+
+
+class FakeBackend:
+    def __init__(self, fail: bool = False, unknown_events: tuple[int, ...] = ()) -> None:
+        self.fail = fail
+        self.unknown_events = unknown_events
+        self.batches: list[list[dict]] = []
+
+    async def register_entries(self, entries: list[dict]) -> int:
+        if self.fail:
+            raise ConnectionError("supabase unavailable")
+        if any(entry["event_id"] in self.unknown_events for entry in entries):
+            raise ValueError("foreign key violation")
+        self.batches.append(list(entries))
+        return len(entries)
+
+
+def enqueue(buffer: WriteBehindBuffer, user_id: int, referred_by: int | None = None, event_id: int = 1) -> None:
+    buffer.enqueue_entry(
+        user_id=user_id,
+        event_id=event_id,
+        username=f"user_{user_id}",
+        wallet_address="x" * 40,
+        referred_by=referred_by,
+    )
+
+
+def test_flush_batches_entries_and_coalesces_referrers(tmp_path) -> None:
+    backend = FakeBackend()
+    buffer = WriteBehindBuffer(backend, spill_path=str(tmp_path / "spill.jsonl"), max_batch=3)
+    for user_id in range(10, 17):
+        enqueue(buffer, user_id, referred_by=1 if user_id % 2 else 2)
+
+    assert buffer.stats.queue_depth == 7
+    assert asyncio.run(buffer.flush()) == 7
+
+    assert [len(batch) for batch in backend.batches] == [3, 3, 1]
+    assert buffer.stats.referrals_flushed == 7
+    assert buffer.stats.referrer_updates == 2
+    assert buffer.stats.queue_depth == 0
+
+
+def test_failed_flush_spills_and_replays(tmp_path) -> None:
+    spill = tmp_path / "spill.jsonl"
+    backend = FakeBackend(fail=True)
+    buffer = WriteBehindBuffer(backend, spill_path=str(spill))
+    enqueue(buffer, 10)
+
+    assert asyncio.run(buffer.flush()) == 0
+    assert spill.exists()
+
+    enqueue(buffer, 11)
+    backend.fail = False
+    assert asyncio.run(buffer.flush(force=True)) == 2
+
+    assert [row["user_id"] for row in backend.batches[0]] == [10, 11]
+    assert not spill.exists()
+
+
+def test_spill_survives_restart(tmp_path) -> None:
+    spill = tmp_path / "spill.jsonl"
+    first = WriteBehindBuffer(FakeBackend(fail=True), spill_path=str(spill))
+    enqueue(first, 10)
+    asyncio.run(first.flush())
+
+    backend = FakeBackend()
+    second = WriteBehindBuffer(backend, spill_path=str(spill))
+
+    assert asyncio.run(second.flush()) == 1
+    assert backend.batches[0][0]["user_id"] == 10
+
+
+def test_close_flushes_pending_writes(tmp_path) -> None:
+    backend = FakeBackend()
+    buffer = WriteBehindBuffer(backend, spill_path=str(tmp_path / "spill.jsonl"), flush_interval=60)
+
+    async def run() -> None:
+        buffer.start()
+        enqueue(buffer, 10)
+        await buffer.close()
+
+    asyncio.run(run())
+
+    assert backend.batches == [[backend.batches[0][0]]]
+    assert backend.batches[0][0]["user_id"] == 10
+
+
+def test_rejected_rows_are_quarantined_not_retried(tmp_path) -> None:
+    spill = tmp_path / "spill.jsonl"
+    backend = FakeBackend(unknown_events=(0,))
+    buffer = WriteBehindBuffer(backend, spill_path=str(spill), max_batch=4)
+    for user_id in range(10, 17):
+        enqueue(buffer, user_id, event_id=0 if user_id == 12 else 1)
+
+    assert asyncio.run(buffer.flush()) == 6
+
+    assert sorted(row["user_id"] for batch in backend.batches for row in batch) == [10, 11, 13, 14, 15, 16]
+    assert not spill.exists()
+    assert buffer.stats.rejected_entries == 1
+    quarantined = [row for line in open(buffer.rejected_path) for row in json.loads(line)]
+    assert [row["user_id"] for row in quarantined] == [12]
+
+    enqueue(buffer, 17)
+    assert asyncio.run(buffer.flush()) == 1
+
+
+def test_bad_row_does_not_block_later_registrations_on_sqlite(tmp_path) -> None:
+    repository = SQLiteRepository(str(tmp_path / "amazo.db"))
+    asyncio.run(repository.new_event(1, "Launch", "2999-12-31"))
+    buffer = WriteBehindBuffer(repository, spill_path=str(tmp_path / "spill.jsonl"))
+
+    async def run() -> None:
+        # event_id 0 does not exist: the foreign key refuses the row.
+        enqueue(buffer, 10, event_id=0)
+        await buffer.flush()
+        for user_id in range(11, 16):
+            enqueue(buffer, user_id)
+            await buffer.flush()
+
+    asyncio.run(run())
+
+    assert asyncio.run(repository.get_event_stats(1)).participants == 5
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert buffer.stats.rejected_entries == 1
+    repository.close()